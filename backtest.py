@@ -0,0 +1,214 @@
+# walk-forward backtest of the daily scoring pipeline over cached daily bars
+# indicators are computed once over the whole time axis (warm, instead of re-slicing a 50-day window per day)
+import numpy as np
+import pandas as pd
+import finance_info
+import high_freq_check
+import main_high_freq
+from utils import indicators as ind
+from utils import ohlcv_store
+
+# 分档 -> 目标仓位（NaN 表示维持原仓位）
+GRADE_POSITIONS = {
+    "强烈买入": 1.0,
+    "买入": 0.5,
+    "持有": np.nan,
+    "卖出": 0.0,
+    "强烈卖出": 0.0,
+}
+PANEL_COLUMNS = {'open': '开盘', 'high': '最高', 'low': '最低', 'close': '收盘', 'volume': '成交量'}
+
+
+def _day(day):
+    return int(pd.Timestamp(str(day)).strftime('%Y%m%d'))
+
+
+def _ffill(values):
+    # 沿时间轴前向填充，左侧NaN保留
+    T = values.shape[1]
+    idx = np.where(np.isnan(values), 0, np.arange(T))
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    filled = np.take_along_axis(values, idx, axis=1)
+    return filled
+
+
+def load_panel(symbol_list, start, end, fetch=True):
+    """
+    从本地日线库读取多只股票并按日期并集对齐
+
+    参数:
+    symbol_list (list): 股票代码
+    start, end: 日期区间
+    fetch (bool): 为True时先增量更新本地日线（会联网），否则只读已缓存数据
+
+    返回:
+    (np.ndarray, dict): 日期(YYYYMMDD整数)，列名 -> (股票数, 交易日) 数组；
+    停牌日价格沿用前收盘、成交量为0，上市前为NaN
+    """
+    store = ohlcv_store.get_store()
+    first, last = _day(start), _day(end)
+    bars = [store.update(symbol, first) if fetch else store.bars(symbol) for symbol in symbol_list]
+    bars = [b[(b['date'] >= first) & (b['date'] <= last)] for b in bars]
+    dates = np.unique(np.concatenate([b['date'] for b in bars])) if bars else np.empty(0, dtype=np.int32)
+
+    panel = {col: np.full((len(symbol_list), len(dates)), np.nan) for col in PANEL_COLUMNS.values()}
+    for i, b in enumerate(bars):
+        pos = np.searchsorted(dates, b['date'])
+        for name, col in PANEL_COLUMNS.items():
+            panel[col][i, pos] = b[name]
+
+    close = _ffill(panel['收盘'])
+    suspended = np.isnan(panel['收盘']) & ~np.isnan(close)
+    for col in ('开盘', '最高', '最低'):
+        panel[col] = np.where(suspended, close, panel[col])
+    panel['成交量'] = np.where(suspended, 0.0, panel['成交量'])
+    panel['收盘'] = close
+    return dates, panel
+
+
+def indicator_series(panel, period):
+    """
+    fin_ind 与 high_freq 各指标在整条时间轴上的序列（按上市起点分组计算）
+
+    返回:
+    dict: 指标名 -> (股票数, 交易日) 数组
+    """
+    def compute(high, low, close, volume):
+        return {**finance_info.fin_ind_series(high, low, close, volume, period),
+                **high_freq_check.high_freq_series(high, low, close, volume, period)}
+
+    return ind.by_start(compute, panel['收盘'], panel['最高'], panel['最低'], panel['收盘'], panel['成交量'])
+
+
+def signals_from_series(series, tech_series, weights=None, cuts=(0.6, 0.2), tech_weights=None):
+    # 由指标序列计算每日信号，参数扫描时指标序列按周期复用
+    coefficient, grade = main_high_freq.calculate_investment_coefficient_array(series, weights, cuts)
+    technical = finance_info.technical_score(tech_series, tech_weights)
+    # 指标未预热完成的交易日不给出信号
+    warm = ~np.isnan(coefficient) & ~np.isnan(series['MACD_signal']) & ~np.isnan(series['ADX'])
+    warm &= ~np.isnan(tech_series['MACD_signal']) & ~np.isnan(tech_series['ADX'])
+    return {
+        'coefficient': np.where(warm, coefficient, np.nan),
+        'grade': np.where(warm, grade, np.nan),
+        'technical': np.where(warm, technical, np.nan),
+    }
+
+
+def daily_signals(panel, period=17, tech_period=14, weights=None, cuts=(0.6, 0.2), tech_weights=None):
+    """
+    每个交易日收盘时的评分（整条时间轴一次计算）
+
+    参数:
+    panel (dict): load_panel 返回的面板
+    period (int): main_high_freq 的指标周期
+    tech_period (int): finance_info.quantization 的指标周期（main.py 中为14）
+    weights (dict, optional): main_high_freq.INDICATOR_WEIGHTS
+    cuts (tuple): 分档阈值（强, 弱）
+    tech_weights (dict, optional): finance_info.TECHNICAL_WEIGHTS
+
+    返回:
+    dict: 'coefficient' 投资系数、'grade' 分档序号（对应 main_high_freq.GRADES，预热期为NaN）、
+    'technical' 技术面得分，均为 (股票数, 交易日) 数组
+    """
+    series = indicator_series(panel, period)
+    tech_series = series if tech_period == period else indicator_series(panel, tech_period)
+    return signals_from_series(series, tech_series, weights, cuts, tech_weights)
+
+
+def target_weights(signals, signal='grade', top_k=10, fundamental=None, blend=0.3):
+    # 信号 -> 每日目标权重
+    if signal == 'grade':
+        return grade_weights(signals['grade'])
+    score = signals['technical']
+    if fundamental is not None:
+        score = blend * np.asarray(fundamental, dtype=float)[:, np.newaxis] + (1 - blend) * score
+    return top_k_weights(score, top_k)
+
+
+def grade_weights(grade):
+    # 分档 -> 目标仓位，等权分配到每只股票
+    positions = np.array([GRADE_POSITIONS[g] for g in main_high_freq.GRADES])
+    target = np.full(grade.shape, np.nan)
+    known = ~np.isnan(grade)
+    target[known] = positions[grade[known].astype(int)]
+    target = np.nan_to_num(_ffill(target), nan=0.0)
+    return target / grade.shape[0]
+
+
+def top_k_weights(score, top_k):
+    # 每日选得分最高的 top_k 只等权持有
+    ranked = np.where(np.isnan(score), -np.inf, score)
+    order = np.argsort(-ranked, axis=0, kind='stable')[:top_k]
+    chosen = np.zeros(score.shape, dtype=bool)
+    np.put_along_axis(chosen, order, True, axis=0)
+    chosen &= ~np.isnan(score)
+    return chosen / top_k
+
+
+def evaluate(dates, close, weights, cost=0.0015, first_day=None):
+    """
+    按收盘调仓、次日生效计算组合表现
+
+    参数:
+    close (np.ndarray): (股票数, 交易日) 收盘价
+    weights (np.ndarray): 每日收盘后的目标权重
+    cost (float): 单边交易成本（按换手计）
+    first_day: 评估起始日期，之前为预热期
+
+    返回:
+    dict: 总收益、年化收益、夏普、最大回撤、日均换手、胜率、净值序列
+    """
+    start = 0 if first_day is None else int(np.searchsorted(dates, _day(first_day)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.nan_to_num(close[:, 1:] / close[:, :-1] - 1)
+    held = weights[:, start:-1]
+    pnl = held * returns[:, start:]
+    turnover = np.abs(np.diff(weights[:, start:], axis=1, prepend=0.0)).sum(axis=0)
+    daily = pnl.sum(axis=0) - cost * turnover[:-1]
+
+    equity = np.cumprod(1 + daily)
+    days = len(daily)
+    if days == 0:
+        return {'days': 0}
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+    invested = held > 0
+    std = daily.std()
+    return {
+        'days': days,
+        'total_return': equity[-1] - 1,
+        'annual_return': equity[-1] ** (252 / days) - 1,
+        'sharpe': daily.mean() / std * np.sqrt(252) if std > 0 else np.nan,
+        'max_drawdown': drawdown.min(),
+        'turnover': turnover.mean(),
+        'hit_rate': (pnl[invested] > 0).mean() if invested.any() else np.nan,
+        'equity': pd.Series(equity, index=pd.to_datetime(dates[start + 1:].astype(str))),
+    }
+
+
+def run(symbol_list, start, end, warmup_days=120, signal='grade', top_k=10, period=17, tech_period=14,
+        weights=None, cuts=(0.6, 0.2), tech_weights=None, fundamental=None, blend=0.3, cost=0.0015, fetch=True):
+    """
+    回测入口
+
+    参数:
+    signal (str): 'grade' 按 calculate_investment_coefficient 分档调仓；
+        'score' 每日持有综合得分最高的 top_k 只（blend*基本面 + (1-blend)*技术面，同 main.py 的 0.3/0.7）
+    fundamental (array-like, optional): 每只股票的基本面得分（finance_qualification_assessment），为None时只用技术面
+    其余参数见 daily_signals / evaluate
+
+    返回:
+    dict: evaluate 的结果
+    """
+    load_start = pd.Timestamp(str(start)) - pd.Timedelta(days=warmup_days)
+    dates, panel = load_panel(symbol_list, load_start, end, fetch=fetch)
+    signals = daily_signals(panel, period, tech_period, weights, cuts, tech_weights)
+    target = target_weights(signals, signal, top_k, fundamental, blend)
+    return evaluate(dates, panel['收盘'], target, cost, first_day=start)
+
+
+if __name__ == '__main__':
+    symbol_list = ['603163', '300750', '002997', '300724', '300870', '002466', '002460', '002008', '301162', '002353']
+    report = run(symbol_list, '20210101', pd.Timestamp.now().strftime('%Y%m%d'))
+    for key, value in report.items():
+        if key != 'equity':
+            print(key, value)
@@ -0,0 +1,620 @@
+# offline benchmarks of the scoring hot paths on deterministic synthetic bars / spot snapshots
+# every benchmark also fingerprints its output and compares it with benchmark_golden.json, so a speedup cannot change scores
+import argparse
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+import finance_info
+import finance_qualification_assessment
+import high_freq_check
+import main_high_freq
+from utils import minute_store
+from utils import ohlcv_store
+from utils import spot_provider
+from utils import trade_info
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_PATH = os.path.join(ROOT, 'benchmark_golden.json')
+RESULTS_DIR = os.path.join(ROOT, 'data', 'benchmarks')
+
+SIZES = (10, 500, 5000)
+SEED = 20250719
+HISTORY = 400  # 合成日线的长度（自然日，每天一根，结果与运行日期和时刻无关）
+DAYS_AGO = 50  # 与 main.py / main_high_freq 一致
+PERIOD = 14  # main.py
+HIGH_FREQ_PERIOD = 17  # main_high_freq
+INDUSTRY_BENCHMARKS = {'inventory_turnover': 5.5}  # finance_qualification_assessment.quantization
+EXCHANGES = ('sh', 'sz', 'bj')
+MINUTE_DAYS = (20250714, 20250715, 20250716, 20250717, 20250718)  # 合成1分钟K线的交易日（固定日期）
+MINUTE_NOW = datetime(2025, 7, 18, 15, 30)
+TIMEFRAMES = (5, 15, 30, 60)
+# 总分恰好落在 TREND_CUTS 上的健康评分行：(总分, 其余指标的档位分, asset_turnover 的档位分, free_cash_flow, fcfe)，
+# operating_cash_flow_ratio 解出使总分相等
+BOUNDARY_HEALTH = ((85, 90, 90, 0, 0), (70, 70, 70, 1000, -1000), (55, 50, 70, 1000, 0), (40, 30, 90, 1000, -1000))
+# fin_ind 全表模式与 latest_only / 面板模式共有的字段
+FIN_IND_FIELDS = [f for f in finance_info.FinIndLatest._fields if f != '前收盘']
+
+
+# ---------------------------------------------------------------- synthetic data
+
+def symbols(n):
+    # 前 n 个合成代码，较小规模是较大规模的前缀
+    return [f'{i:06d}' for i in range(n)]
+
+
+def synthetic_bars(i, days=HISTORY):
+    """
+    第 i 只合成股票的日线（按日期升序，最后一根为昨日）
+
+    返回:
+    pd.DataFrame: 列名与 ak.stock_zh_a_hist 一致
+    """
+    rng = np.random.default_rng([SEED, i])
+    close = 10 * (1 + i % 50) * np.exp(np.cumsum(rng.normal(0.0002, 0.02, days)))
+    open_ = close * (1 + rng.normal(0, 0.005, days))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, days)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, days)))
+    volume = rng.uniform(1e5, 1e7, days).round()
+    yesterday = date.today() - timedelta(days=1)
+    return pd.DataFrame({
+        '日期': [yesterday - timedelta(days=days - 1 - k) for k in range(days)],
+        '开盘': open_,
+        '收盘': close,
+        '最高': high,
+        '最低': low,
+        '成交量': volume,
+        '成交额': volume * close,
+        '换手率': rng.uniform(0.1, 10, days),
+    })
+
+
+def synthetic_spot(n):
+    # ak.stock_zh_a_spot 格式的快照，价格接在合成日线之后
+    rows = []
+    for i in range(n):
+        last = synthetic_bars(i).iloc[-1]
+        rng = np.random.default_rng([SEED, i, 1])
+        price = last['收盘'] * (1 + rng.normal(0, 0.02))
+        open_ = last['收盘'] * (1 + rng.normal(0, 0.005))
+        volume = float(round(rng.uniform(1e5, 1e7)))
+        rows.append({
+            '代码': EXCHANGES[i % 3] + f'{i:06d}',
+            '名称': f'合成{i}',
+            '最新价': price,
+            '涨跌额': price - last['收盘'],
+            '涨跌幅': (price / last['收盘'] - 1) * 100,
+            '昨收': last['收盘'],
+            '今开': open_,
+            '最高': max(price, open_) * (1 + abs(rng.normal(0, 0.005))),
+            '最低': min(price, open_) * (1 - abs(rng.normal(0, 0.005))),
+            '成交量': volume,
+            '成交额': volume * price,
+        })
+    return pd.DataFrame(rows)
+
+
+_minute_times = None
+
+
+def _minute_clock():
+    # 每个交易日 9:30 集合竞价 + 240 根1分钟K线的时刻字符串（所有合成股票共用）
+    global _minute_times
+    if _minute_times is None:
+        hhmm = np.concatenate([[930], minute_store.slot_time(np.arange(minute_store.MINUTES))])
+        _minute_times = np.array([f'{str(d)[:4]}-{str(d)[4:6]}-{str(d)[6:]} {t // 100:02d}:{t % 100:02d}:00'
+                                  for d in MINUTE_DAYS for t in hhmm])
+    return _minute_times
+
+
+def synthetic_minutes(i):
+    """
+    第 i 只合成股票在 MINUTE_DAYS 的1分钟K线（含9:30集合竞价），成交量为开盘、收盘放大的U形分时分布；
+    每7只股票中有一只在第二个交易日停牌
+
+    返回:
+    pd.DataFrame: 列名与 ak.stock_zh_a_hist_min_em 一致
+    """
+    rng = np.random.default_rng([SEED, i, 3])
+    per_day = minute_store.MINUTES + 1
+    n = len(MINUTE_DAYS) * per_day
+    close = 10 * (1 + i % 50) * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.0005, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.0005, n)))
+    k = np.arange(per_day)
+    shape = 1 + 3 * np.exp(-k / 15) + 2 * np.exp(-(per_day - 1 - k) / 15)
+    volume = (np.tile(shape, len(MINUTE_DAYS)) * rng.uniform(500, 1500, n)).round()
+    df = pd.DataFrame({
+        '时间': _minute_clock(),
+        '开盘': open_,
+        '收盘': close,
+        '最高': high,
+        '最低': low,
+        '成交量': volume,
+        '成交额': volume * close * 100,
+        '均价': close,
+    })
+    if i % 7 == 3:
+        df = df.iloc[np.r_[0:per_day, 2 * per_day:n]]
+    return df
+
+
+def synthetic_financial_data(n):
+    # get_company_fin_info 格式，每只股票一行（ebitda 与真实接口一样为0）
+    rng = np.random.default_rng([SEED, 2])
+    total_assets = rng.lognormal(23, 1.5, n)
+    total_liabilities = total_assets * rng.uniform(0.1, 0.95, n)
+    current_liabilities = total_liabilities * rng.uniform(0.3, 0.9, n)
+    revenue = total_assets * rng.uniform(0.1, 2.0, n)
+    net_income = revenue * rng.normal(0.08, 0.1, n)
+    frames = []
+    for k in range(n):
+        frames.append(pd.DataFrame({
+            'total_assets': total_assets[k],
+            'total_liabilities': total_liabilities[k],
+            'total_equity': total_assets[k] - total_liabilities[k],
+            'current_assets': current_liabilities[k] * rng.uniform(0.3, 4.0),
+            'current_liabilities': current_liabilities[k],
+            'net_income': net_income[k],
+            'revenue': revenue[k],
+            'ebitda': 0,
+            'cash': current_liabilities[k] * rng.uniform(0.05, 2.0),
+            'interest_expense': revenue[k] * rng.normal(0.01, 0.02),
+            'operating_cash_flow': net_income[k] * rng.uniform(-0.5, 2.0),
+            'shares_outstanding': total_assets[k] / rng.uniform(2, 40),
+        }, index=[0]))
+    return frames
+
+
+def _tier_value(metric, score, inventory_avg):
+    # 得分为 score（90/70/50/30）的指标值
+    fqa = finance_qualification_assessment
+    tier = list(fqa.TIER_SCORES).index(score) if score in fqa.TIER_SCORES else 3
+    if metric in fqa.LOWER_BETTER:
+        cuts = fqa.LOWER_BETTER[metric]
+        return cuts[tier] - 0.01 if tier < 3 else cuts[-1] + 0.01
+    if metric in fqa.HIGHER_BETTER:
+        cuts = fqa.HIGHER_BETTER[metric]
+        return cuts[tier] + 0.01 if tier < 3 else cuts[-1] - 0.01
+    bands = fqa.BANDS[metric] if metric in fqa.BANDS else fqa.INVENTORY_BANDS * inventory_avg
+    return bands[tier][0] if tier < 3 else bands[-1][1] + 0.01
+
+
+def boundary_health_metrics():
+    """
+    总分恰好等于 85/70/55/40 的指标行，检查批量评分与逐个评分在分档边界上一致
+
+    返回:
+    list: 每行一个单行 DataFrame（与 _calculate_financial_metrics 的结果同列名）
+    """
+    fqa = finance_qualification_assessment
+    inventory_avg = INDUSTRY_BENCHMARKS['inventory_turnover']
+    frames = []
+    for total, score, turnover, free_cash_flow, fcfe in BOUNDARY_HEALTH:
+        row = {metric: _tier_value(metric, turnover if metric == 'asset_turnover' else score, inventory_avg)
+               for metric in fqa.HEALTH_WEIGHTS if metric not in fqa.CASH_FLOW}
+        row['free_cash_flow'] = float(free_cash_flow)
+        row['fcfe'] = float(fcfe)
+
+        def weighted(value):
+            # 与 calculate_financial_health_score 相同顺序累加
+            row['operating_cash_flow_ratio'] = value
+            result = 0
+            for metric, weight in fqa.HEALTH_WEIGHTS.items():
+                result = result + float(fqa._score_metric(metric, np.array([row[metric]]), inventory_avg)[0]) * weight
+            return result
+
+        # 得分 80 + value / 10 是线性的，先解出近似值再逐个浮点数调整到恰好相等
+        value = 10 + 10 * (total - weighted(10.0)) / fqa.HEALTH_WEIGHTS['operating_cash_flow_ratio']
+        for _ in range(100000):
+            current = weighted(value)
+            if current == total:
+                break
+            value = np.nextafter(value, np.inf if current < total else -np.inf)
+        else:
+            raise RuntimeError(f'no exact health total {total}')
+        frames.append(pd.DataFrame(row, index=[0]))
+    return frames
+
+
+def _fetch_bars(symbol, period='daily', start_date=None, end_date=None, adjust='qfq'):
+    # 替代 ak.stock_zh_a_hist，不联网
+    df = synthetic_bars(int(symbol))
+    days = pd.to_datetime(df['日期'])
+    return df[(days >= pd.Timestamp(str(start_date))) & (days <= pd.Timestamp(str(end_date)))]
+
+
+def _fetch_minutes(symbol, start_date=None, end_date=None, period='1', adjust=''):
+    # 替代 ak.stock_zh_a_hist_min_em，不联网
+    df = synthetic_minutes(int(symbol))
+    return df[(df['时间'] >= str(start_date)) & (df['时间'] <= str(end_date))]
+
+
+class Fixture:
+    """
+    n 只合成股票：本地日线库（临时目录）、行情快照、交易数据和财务数据
+
+    构造时把 ohlcv_store / spot_provider 切换到合成数据源，close() 时恢复
+    """
+
+    def __init__(self, n):
+        self.symbols = symbols(n)
+        self.spot = synthetic_spot(n)
+        self.index = spot_provider.SpotIndex(self.spot)
+        self._tmp = tempfile.TemporaryDirectory()
+        self._store, self._provider = ohlcv_store.get_store(), spot_provider.get_provider()
+        ohlcv_store.set_store(ohlcv_store.OHLCVStore(root=self._tmp.name, history_days=HISTORY - 2, fetch=_fetch_bars))
+        spot_provider.set_provider(spot_provider.SpotProvider(ttl=float('inf'), fetch=lambda: self.spot))
+
+        # 预先落盘，计时只包含本地读取
+        start = (date.today() - timedelta(days=DAYS_AGO)).strftime('%Y%m%d')
+        for symbol in self.symbols:
+            ohlcv_store.get_store().update(symbol, start)
+        today = date.today().strftime('%Y%m%d')
+        self.trade = [trade_info.get_trade_info(symbol, start, today) for symbol in self.symbols]
+        self.financial = synthetic_financial_data(n)
+
+    def minute_panel(self):
+        # 合成1分钟K线落盘（临时目录）后读取整个面板
+        store = minute_store.MinuteStore(root=os.path.join(self._tmp.name, 'minute'), fetch=_fetch_minutes)
+        return store.panel(self.symbols, days=len(MINUTE_DAYS), now=MINUTE_NOW)
+
+    def close(self):
+        ohlcv_store.set_store(self._store)
+        spot_provider.set_provider(self._provider)
+        self._tmp.cleanup()
+
+
+# ---------------------------------------------------------------- benchmarks
+# 每个函数返回 (数值列表, 文本列表)，用于与 golden 结果比对
+
+def bench_fin_ind(fx):
+    values = []
+    for df in fx.trade:
+        _, latest = finance_info.fin_ind(df, PERIOD)
+        values.extend(latest[FIN_IND_FIELDS].to_numpy(dtype=float))
+    return values, []
+
+
+def bench_fin_ind_latest(fx):
+    values = []
+    for df in fx.trade:
+        latest = finance_info.fin_ind(df, PERIOD, latest_only=True)
+        values.extend(latest[f] for f in FIN_IND_FIELDS)
+    return values, []
+
+
+def bench_fin_ind_panel(fx):
+    panel = finance_info.build_panel(fx.trade)
+    latest = finance_info.fin_ind_panel(panel['开盘'], panel['最高'], panel['最低'], panel['收盘'], panel['成交量'],
+                                        PERIOD, fx.symbols)
+    return latest[FIN_IND_FIELDS].to_numpy().ravel(), []
+
+
+def bench_quantization(fx):
+    # 包含从本地日线库读取和拼接快照（get_trade_info）
+    return [finance_info.quantization(symbol, PERIOD, DAYS_AGO) for symbol in fx.symbols], []
+
+
+def bench_high_freq(fx):
+    columns = ['MFI', 'BIAS', 'ATR', 'Volume_Change_Rate', 'ROC']
+    values = []
+    for symbol in fx.symbols:
+        values.extend(high_freq_check.high_freq(symbol, HIGH_FREQ_PERIOD, DAYS_AGO, fx.index)[columns].to_numpy(dtype=float))
+    return values, []
+
+
+def bench_high_freq_stream(fx):
+    # 流式版本必须与 high_freq 输出一致（共用 golden），每次从已收盘日线重新初始化
+    columns = ['MFI', 'BIAS', 'ATR', 'Volume_Change_Rate', 'ROC']
+    high_freq_check._streams.clear()
+    values = []
+    for symbol in fx.symbols:
+        values.extend(high_freq_check.high_freq_stream(symbol, HIGH_FREQ_PERIOD, DAYS_AGO, fx.index)[columns]
+                      .to_numpy(dtype=float))
+    return values, []
+
+
+def _indicators(fx):
+    # calculate_investment_coefficient 的输入（与 main_high_freq 相同的两组指标）
+    stable = [finance_info.fin_ind(df, HIGH_FREQ_PERIOD, latest_only=True).to_dict() for df in fx.trade]
+    realtime = [high_freq_check.high_freq(s, HIGH_FREQ_PERIOD, DAYS_AGO, fx.index).to_dict() for s in fx.symbols]
+    return stable, realtime
+
+
+def bench_minute_resample(fx):
+    # 合成各周期K线，并计算分时成交量分布和按分时归一的成交量
+    values = []
+    for minutes in TIMEFRAMES:
+        bars = fx.minutes.resample(minutes)
+        values.extend(bars[field].ravel() for field in minute_store.FIELDS)
+        values.append(bars.relative_volume().ravel())
+        values.append(bars.volume_curve(before=MINUTE_DAYS[-1]).ravel())
+    return np.concatenate(values), []
+
+
+def bench_high_freq_timeframe(fx):
+    values = []
+    for minutes in TIMEFRAMES:
+        series = high_freq_check.high_freq_timeframe(fx.minutes, minutes, HIGH_FREQ_PERIOD)
+        values.extend(series[name].ravel() for name in ('MFI', 'BIAS', 'ATR', 'Volume_Change_Rate'))
+    return np.concatenate(values), []
+
+
+def bench_investment_coefficient(fx):
+    values, grades = [], []
+    for stable, realtime in zip(*fx.indicators):
+        coefficient, grade = main_high_freq.calculate_investment_coefficient(stable, realtime)
+        values.append(coefficient)
+        grades.append(grade)
+    return values, grades
+
+
+def bench_investment_coefficient_array(fx):
+    merged = [{**stable, **realtime} for stable, realtime in zip(*fx.indicators)]
+    keys = [key for key in list(main_high_freq.INDICATOR_WEIGHTS) + ['收盘'] if key in merged[0]]
+    columns = {key: np.array([m[key] for m in merged], dtype=float) for key in keys}
+    coefficient, grade = main_high_freq.calculate_investment_coefficient_array(columns)
+    return coefficient, [main_high_freq.GRADES[g] for g in grade]
+
+
+def bench_financial_health_score(fx):
+    values, trends = [], []
+    for metrics in fx.metrics:
+        result = finance_qualification_assessment.calculate_financial_health_score(metrics, INDUSTRY_BENCHMARKS)
+        values.append(result['总分'])
+        trends.append(result['投资趋势'])
+    return values, trends
+
+
+def bench_financial_health_score_batch(fx):
+    result = finance_qualification_assessment.calculate_financial_health_score_batch(fx.batch_metrics,
+                                                                                     INDUSTRY_BENCHMARKS)
+    return result['总分'].to_numpy(), list(result['投资趋势'])
+
+
+BENCHMARKS = {
+    'fin_ind': bench_fin_ind,
+    'fin_ind_latest': bench_fin_ind_latest,
+    'fin_ind_panel': bench_fin_ind_panel,
+    'finance_info.quantization': bench_quantization,
+    'high_freq': bench_high_freq,
+    'high_freq_stream': bench_high_freq_stream,
+    'minute_resample': bench_minute_resample,
+    'high_freq_timeframe': bench_high_freq_timeframe,
+    'calculate_investment_coefficient': bench_investment_coefficient,
+    'calculate_investment_coefficient_array': bench_investment_coefficient_array,
+    'calculate_financial_health_score': bench_financial_health_score,
+    'calculate_financial_health_score_batch': bench_financial_health_score_batch,
+}
+# 标量版与批量版输出相同，golden 共用
+GOLDEN_ALIASES = {
+    'high_freq_stream': 'high_freq',
+    'fin_ind_latest': 'fin_ind',
+    'fin_ind_panel': 'fin_ind',
+    'calculate_investment_coefficient_array': 'calculate_investment_coefficient',
+    'calculate_financial_health_score_batch': 'calculate_financial_health_score',
+}
+
+
+# ---------------------------------------------------------------- golden results
+
+def fingerprint(values, texts):
+    """
+    输出摘要：数值部分记录个数、NaN个数、和、平方和、按位置加权和；文本部分记录md5
+    """
+    arr = np.asarray(values, dtype=float).ravel()
+    finite = np.where(np.isfinite(arr), arr, 0.0)
+    return {
+        'n': int(arr.size),
+        'nan': int(np.isnan(arr).sum()),
+        'sum': float(finite.sum()),
+        'sumsq': float((finite * finite).sum()),
+        'wsum': float((finite * np.arange(1, arr.size + 1)).sum()),
+        'text': hashlib.md5('\n'.join(map(str, texts)).encode('utf-8')).hexdigest(),
+    }
+
+
+def matches(result, golden, rtol=1e-7):
+    if result['n'] != golden['n'] or result['nan'] != golden['nan'] or result['text'] != golden['text']:
+        return False
+    return all(np.isclose(result[k], golden[k], rtol=rtol, atol=1e-9) for k in ('sum', 'sumsq', 'wsum'))
+
+
+def load_golden(path=GOLDEN_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ---------------------------------------------------------------- runner
+
+def run(sizes=SIZES, names=None, repeat=3, update_golden=False, out_dir=RESULTS_DIR):
+    """
+    运行基准测试
+
+    参数:
+    sizes (tuple): 合成股票数量
+    names (list, optional): 只运行 BENCHMARKS 中的部分项目
+    repeat (int): 每项重复次数，取最短耗时
+    update_golden (bool): 用本次输出覆盖 golden 结果（确认数值变化是预期的之后使用）
+    out_dir (str, optional): 结果JSON目录，为None时不写文件
+
+    返回:
+    dict: 环境信息与每个 (规模, 项目) 的耗时和 golden 比对结果
+    """
+    names = list(BENCHMARKS) if names is None else names
+    golden = load_golden()
+    report = {
+        'commit': _commit(),
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'results': [],
+    }
+
+    for n in sizes:
+        fx = Fixture(n)
+        try:
+            fx.indicators = _indicators(fx)
+            fx.metrics = [finance_qualification_assessment._calculate_financial_metrics(None, df)
+                          for df in fx.financial]
+            batch = pd.concat(fx.financial, ignore_index=True)
+            batch.index = fx.symbols
+            fx.batch_metrics = finance_qualification_assessment._calculate_financial_metrics(None, batch)
+            boundary = boundary_health_metrics()
+            fx.metrics += boundary
+            fx.batch_metrics = pd.concat([fx.batch_metrics] + boundary)
+            if {'minute_resample', 'high_freq_timeframe'} & set(names):
+                fx.minutes = fx.minute_panel()
+
+            for name in names:
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    output = BENCHMARKS[name](fx)
+                    timings.append(time.perf_counter() - start)
+                result = fingerprint(*output)
+                key = f'{GOLDEN_ALIASES.get(name, name)}@{n}'
+                if update_golden and name not in GOLDEN_ALIASES:
+                    golden[key] = result
+                status = 'missing' if key not in golden else ('ok' if matches(result, golden[key]) else 'mismatch')
+                report['results'].append({
+                    'name': name,
+                    'symbols': n,
+                    'seconds': min(timings),
+                    'mean_seconds': float(np.mean(timings)),
+                    'us_per_symbol': min(timings) / n * 1e6,
+                    'golden': status,
+                    'fingerprint': result,
+                })
+                print(f'{name:<40}{n:>6}{min(timings):>12.4f}s{min(timings) / n * 1e6:>12.1f}us/symbol  {status}')
+        finally:
+            fx.close()
+
+    if update_golden:
+        with open(GOLDEN_PATH, 'w', encoding='utf-8') as f:
+            json.dump(golden, f, ensure_ascii=False, indent=1, sort_keys=True)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+        name = time.strftime('%Y%m%d-%H%M%S') + (f'-{report["commit"]}' if report['commit'] else '') + '.json'
+        with open(os.path.join(out_dir, name), 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+    return report
+
+
+# ---------------------------------------------------------------- startup
+
+# 各入口在开始工作前导入的模块
+STARTUP_MODULES = {
+    'main': ['finance_qualification_assessment', 'finance_info', 'env_info', 'select_symbol', 'initial_bank', 'breaker',
+             'info_cluster', 'communication_to_moblie', 'main_high_freq', 'utils.spot_provider', 'utils.data_source',
+             'utils.notify', 'utils.metrics', 'utils.pipeline', 'utils.trade_info'],
+    'main_monitor': ['main_monitor'],
+    'backtest': ['backtest'],
+}
+# 只应在用到时才导入的依赖（utils.lazy）
+HEAVY_MODULES = ('akshare', 'talib', 'selenium', 'pypushdeer', 'requests', 'pandas')
+
+
+def import_profile(modules, top=8):
+    """
+    在新的解释器中用 -X importtime 导入 modules
+
+    返回:
+    dict: wall 进程总耗时（含解释器启动），imports 导入耗时，slowest 耗时最多的模块，heavy 被导入的重依赖
+    """
+    code = (f'import sys; import {", ".join(modules)}; '
+            f'print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))')
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    # 每行: import time: self [us] | cumulative | 模块名（缩进表示被谁导入）
+    cumulative = {}
+    total = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cum, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        if depth == 0 and (name in modules or name.split('.')[0] in modules):
+            total += int(cum)
+        if depth <= 1:
+            cumulative[name] = max(cumulative.get(name, 0), int(cum))
+    slowest = sorted(cumulative.items(), key=lambda item: -item[1])[:top]
+    heavy = proc.stdout.strip().splitlines()[-1] if proc.stdout.strip() else ''
+    return {
+        'wall': wall,
+        'imports': total / 1e6,
+        'slowest': [(name, us / 1e6) for name, us in slowest],
+        'heavy': [m for m in heavy.split(',') if m],
+    }
+
+
+def startup(entries=None, repeat=5, out_dir=RESULTS_DIR):
+    """
+    入口的启动耗时（第一次运行包含磁盘缓存预热，取最短）
+
+    参数:
+    entries (list, optional): STARTUP_MODULES 中的入口
+    repeat (int): 每个入口的运行次数
+
+    返回:
+    dict: 入口 -> 最短的 import_profile 结果
+    """
+    entries = list(STARTUP_MODULES) if entries is None else entries
+    report = {'commit': _commit(), 'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+              'python': platform.python_version(), 'results': {}}
+    for entry in entries:
+        runs = [import_profile(STARTUP_MODULES[entry]) for _ in range(repeat)]
+        best = min(runs, key=lambda r: r['wall'])
+        report['results'][entry] = best
+        print(f"{entry:<16}{best['wall']:>8.3f}s wall{best['imports']:>8.3f}s imports  "
+              f"heavy: {', '.join(best['heavy']) or '-'}")
+        for name, seconds in best['slowest']:
+            print(f'    {name:<40}{seconds:>8.3f}s')
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+        name = 'startup-' + time.strftime('%Y%m%d-%H%M%S') + (f'-{report["commit"]}' if report['commit'] else '')
+        with open(os.path.join(out_dir, name + '.json'), 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='offline benchmarks of the scoring hot paths')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--update-golden', action='store_true')
+    parser.add_argument('--startup', nargs='*', choices=list(STARTUP_MODULES), default=None,
+                        help='measure entry point import time instead (-X importtime)')
+    args = parser.parse_args()
+    if args.startup is not None:
+        startup(args.startup or None, max(args.repeat, 1))
+        sys.exit(0)
+    report = run(args.sizes, args.only, args.repeat, args.update_golden)
+    failed = [r for r in report['results'] if r['golden'] == 'mismatch']
+    sys.exit(1 if failed else 0)
@@ -3,9 +3,228 @@
 # 2. 3 days loss: stop one day and restart by manual function
 # 3. 0.5-1% loss in one symbol:
 # 4. beyond 2 times base in one symbol: sell 50% when return
+# Breaker keeps the rolling state (start-of-day equity, losing-day counter, per-symbol flags) between checks,
+# so every ledger/snapshot update costs O(positions); the state is saved to disk and survives restarts
+import json
+import os
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+import numpy as np
+from utils import spot_provider
 
-def bank_breaking(my_bank):
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'breaker', 'state.json')
+LOT = 100  # A股一手
+
+# kind: 'halt' 当日停止交易 / 'pause' 连续亏损暂停（需手动 resume）/ 'sell' 卖出 qty 股
+Action = namedtuple('Action', ['kind', 'symbol', 'qty', 'rule', 'reason'])
+
+
+def _half(qty):
+    # 卖出一半，按整手取整；不足两手时全部卖出
+    half = np.floor(qty / 2 / LOT) * LOT
+    return np.where(half > 0, half, qty)
+
+
+class Breaker:
+    """
+    熔断规则
+
+    参数:
+    daily_loss (float): 当日总亏损达到开盘权益的该比例时当日停止交易（规则1）
+    losing_days (int): 连续亏损天数达到后暂停交易，resume() 手动恢复（规则2）
+    pause_days (int): 暂停的最少交易日数
+    symbol_reduce (float): 单只股票浮亏达到开盘权益的该比例时卖出一半（规则3）
+    symbol_stop (float): 单只股票浮亏达到开盘权益的该比例时全部卖出（规则3）
+    take_profit (float): 持仓市值达到成本的该倍数时卖出一半（规则4，每次建仓只触发一次）
+    path (str | None): 状态文件，None 时不保存
+    """
+
+    def __init__(self, daily_loss=0.02, losing_days=3, pause_days=1, symbol_reduce=0.005, symbol_stop=0.01,
+                 take_profit=2.0, path=DEFAULT_PATH):
+        self.daily_loss = daily_loss
+        self.losing_days = losing_days
+        self.pause_days = pause_days
+        self.symbol_reduce = symbol_reduce
+        self.symbol_stop = symbol_stop
+        self.take_profit = take_profit
+        self.path = path
+        self.day = None
+        self.day_start = None  # 当日开盘权益（上一交易日最后一次检查的权益）
+        self.equity = None  # 最近一次检查的权益
+        self.losses = 0  # 连续亏损天数
+        self.halted = False
+        self.paused = False
+        self.paused_on = None
+        self.acted = set()  # 当日已发出的 (规则, 代码)，同一信号每天只发一次
+        self.profit_taken = set()  # 已止盈的代码，清仓后重置
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    # ------------------------------------------------------------ state
+
+    def _new_day(self, day):
+        if self.day is not None and self.equity is not None:
+            # 结算上一交易日
+            if self.equity < self.day_start:
+                self.losses += 1
+            else:
+                self.losses = 0
+        self.day = day
+        self.day_start = self.equity
+        self.halted = False
+        self.acted = set()
+
+    def can_trade(self, day=None):
+        day = day or date.today()
+        if self.halted and day == self.day:
+            return False
+        return not self.paused
+
+    def resume(self):
+        # 规则2的手动恢复，至少暂停 pause_days 个交易日
+        if self.paused and self.paused_on is not None:
+            earliest = self.paused_on
+            for _ in range(self.pause_days):
+                earliest += timedelta(days=1)
+                while earliest.weekday() >= 5:
+                    earliest += timedelta(days=1)
+            if date.today() < earliest:
+                raise RuntimeError(f'paused since {self.paused_on}, can resume from {earliest}')
+        self.paused = False
+        self.paused_on = None
+        self.losses = 0
+        self.save()
+
+    # ------------------------------------------------------------ rules
+
+    def check(self, bank, data_spot=None, now=None):
+        """
+        用账本的当前估值检查全部规则
+
+        参数:
+        bank (initial_bank.Bank): 账本
+        data_spot (SpotIndex, optional): 给出时先用该快照估值
+        now (datetime, optional): 默认当前时间
+
+        返回:
+        list: 新触发的 Action（同一信号当天只返回一次）
+        """
+        now = now or datetime.now()
+        if data_spot is not None:
+            bank.mark(data_spot)
+        value = bank.market_value
+        equity = bank.cash + float(value.sum())
+        rolled = self.day != now.date()
+        if rolled:
+            if self.equity is None:
+                self.equity = equity
+            self._new_day(now.date())
+        self.equity = equity
+        base = self.day_start if self.day_start and self.day_start > 0 else equity
+
+        actions = []
+        # 规则2：连续亏损（在新交易日结算后判断）
+        if self.losses >= self.losing_days and not self.paused:
+            self.paused, self.paused_on = True, now.date()
+            actions.append(Action('pause', None, 0, 'losing_days',
+                                  f'{self.losses} losing days in a row, trading paused until resume()'))
+        # 规则1：当日总亏损
+        daily = equity - base
+        if base > 0 and daily <= -self.daily_loss * base and not self.halted:
+            self.halted = True
+            actions.append(Action('halt', None, 0, 'daily_loss',
+                                  f'daily loss {daily:.2f} ({daily / base:.2%}) reached {self.daily_loss:.2%}'))
+
+        # 规则3、4：逐只股票（向量化）
+        qty = bank.qty
+        held = qty > 0
+        codes = bank.codes
+        self.profit_taken &= set(codes[held])
+        if base > 0 and held.any():
+            loss = -bank.unrealized / base
+            stop = held & (loss >= self.symbol_stop)
+            reduce = held & (loss >= self.symbol_reduce) & ~stop
+            with np.errstate(divide='ignore', invalid='ignore'):
+                profit = held & (value >= self.take_profit * bank.cost) & (bank.cost > 0)
+            half = _half(qty)
+            for rule, mask, amount in (('symbol_stop', stop, qty), ('symbol_reduce', reduce, half),
+                                       ('take_profit', profit & ~stop & ~reduce, half)):
+                for i in np.flatnonzero(mask):
+                    symbol = codes[i]
+                    if (rule, symbol) in self.acted or (rule == 'take_profit' and symbol in self.profit_taken):
+                        continue
+                    self.acted.add((rule, symbol))
+                    if rule == 'take_profit':
+                        self.profit_taken.add(symbol)
+                        reason = f'value {value[i]:.2f} >= {self.take_profit:g}x cost {bank.cost[i]:.2f}'
+                    else:
+                        reason = f'unrealized {-loss[i] * base:.2f} ({loss[i]:.2%} of day start equity)'
+                    actions.append(Action('sell', symbol, float(amount[i]), rule, reason))
+        if actions or rolled:
+            self.save()
+        return actions
+
+    # ------------------------------------------------------------ persistence
+
+    def state(self):
+        return {
+            'day': self.day.isoformat() if self.day else None,
+            'day_start': self.day_start,
+            'equity': self.equity,
+            'losses': self.losses,
+            'halted': self.halted,
+            'paused': self.paused,
+            'paused_on': self.paused_on.isoformat() if self.paused_on else None,
+            'acted': sorted(self.acted),
+            'profit_taken': sorted(self.profit_taken),
+        }
+
+    def save(self):
+        # 每次触发新信号时保存，另外在收盘后或退出前调用一次以保存当日权益
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.state(), f, ensure_ascii=False)
+        os.replace(self.path + '.tmp', self.path)
+
+    def load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        self.day = date.fromisoformat(state['day']) if state['day'] else None
+        self.day_start = state['day_start']
+        self.equity = state['equity']
+        self.losses = state['losses']
+        self.halted = state['halted']
+        self.paused = state['paused']
+        self.paused_on = date.fromisoformat(state['paused_on']) if state['paused_on'] else None
+        self.acted = {tuple(item) for item in state['acted']}
+        self.profit_taken = set(state['profit_taken'])
+
+
+_breaker = None
+
+
+def get_breaker():
+    global _breaker
+    if _breaker is None:
+        _breaker = Breaker()
+    return _breaker
+
+
+def set_breaker(breaker):
+    global _breaker
+    _breaker = breaker
+
+
+def bank_breaking(my_bank, data_spot=None):
     # if in banking
-    # if my_bank
-    print('0')
-    return 0
\ No newline at end of file
+    # 持仓按快照估值后检查规则，返回 Action 列表
+    if data_spot is None and my_bank.symbol_num:
+        data_spot = spot_provider.get_index()
+    breaker = get_breaker()
+    actions = breaker.check(my_bank, data_spot)
+    breaker.save()
+    for action in actions:
+        print(f'breaker {action.kind} {action.symbol or ""} {action.qty:g} [{action.rule}] {action.reason}')
+    return actions
@@ -1,12 +1,11 @@
-from pypushdeer import PushDeer
+from utils import notify
 
 
-def communication(my_bank, result):
-    pushdeer = PushDeer(pushkey="PDU36046TfIe7SgbaLY1OWrvHnyBF6mMcudbGcVaW")
+def communication(my_bank, result, can_trade=True):
+    # 后台推送，不阻塞主流程；熔断（当日停止或暂停交易）时不推送选股结果
+    if not can_trade:
+        notify.send('ding', '\ntrading halted by the circuit breaker, no new positions', text='breaker')
+        return
     message = my_bank.symbol_code
-    mess_str = ''
-    idx = 0
-    for i in message:
-        mess_str = mess_str + '\n' +i + ' - ' + str(result[idx])
-        idx = idx + 1
-    pushdeer.send_text(text='Message', desp=mess_str)
\ No newline at end of file
+    mess_str = ''.join('\n' + i + ' - ' + str(r) for i, r in zip(message, result))
+    notify.send('ding', mess_str)
\ No newline at end of file
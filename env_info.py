@@ -3,6 +3,14 @@ from utils import llm_quantization
 import utils.prompt as prompt
 import utils.llm as llm
 import numpy as np
+import json
+import os
+import re
+from datetime import date
+
+BATCH_SIZE = 10  # 每个prompt包含的股票数
+CACHE_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'env')
+ANSWER_PATTERN = re.compile(r'(\d{6})\s*[:：]\s*(\d+(?:\.\d+)?)')
 
 def quantization(symbol, is_test=False):
     if is_test is True:
@@ -10,8 +18,88 @@ def quantization(symbol, is_test=False):
         result = 90
     else:
         prompt_f = prompt.prompt_content_env(symbol)
-        result = llm.llm_ans(prompt_f)
-        # result sort
-        result = result.split(' ')[1::]
-        result = sum(np.double(result))/len(result)
+        result = _parse(llm.llm_ans(prompt_f))
     return result
+
+
+def _parse(result):
+    # "ANS 80 75 90" -> 平均分
+    result = result.split(' ')[1::]
+    return sum(np.double(result))/len(result)
+
+
+def quantization_list(symbol_list, is_test=False):
+    # 多只股票同时提问（utils.llm 会话池中每只股票一个标签页），总耗时接近最慢的一个回答
+    if is_test is True:
+        return [90 for _ in symbol_list]
+    answers = llm.llm_ans_many([prompt.prompt_content_env(symbol) for symbol in symbol_list])
+    return [np.nan if answer is None else _parse(answer) for answer in answers]
+
+
+def _cache_path(day=None):
+    return os.path.join(CACHE_ROOT, (day or date.today()).strftime('%Y%m%d') + '.json')
+
+
+def _load_scores(day=None):
+    path = _cache_path(day)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_scores(scores):
+    path = _cache_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(scores, f, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+def parse_batch(answer, symbol_list):
+    """
+    解析 "ANS 600000:80 000001:75" 形式的回答，只保留请求中的代码和0-100之间的分数
+
+    返回:
+    dict: 代码 -> 分数
+    """
+    wanted = set(symbol_list)
+    scores = {}
+    for code, score in ANSWER_PATTERN.findall(answer):
+        score = float(score)
+        if code in wanted and 0 <= score <= 100:
+            scores[code] = score
+    return scores
+
+
+def quantization_batch(symbol_list, is_test=False, batch_size=BATCH_SIZE, retries=2):
+    """
+    多只股票合并到一个prompt中评分，LLM往返次数从 N 降到约 N/batch_size，各批次在会话池的不同标签页中同时提问
+
+    参数:
+    symbol_list (list): 股票代码
+    batch_size (int): 每个prompt的股票数
+    retries (int): 回答中缺失或无效的代码重新提问的轮数，每轮批次大小减半
+
+    返回:
+    list: 与 symbol_list 顺序一致的分数，多次重试后仍缺失的为NaN；当天的分数缓存在 data/env/日期.json
+    """
+    if is_test is True:
+        return [90 for _ in symbol_list]
+    scores = _load_scores()
+    for attempt in range(retries + 1):
+        missing = list(dict.fromkeys(s for s in symbol_list if s not in scores))
+        if not missing:
+            break
+        # 较小的批次更不容易漏答
+        size = max(batch_size >> attempt, 1)
+        batches = [missing[i:i + size] for i in range(0, len(missing), size)]
+        prompts = [prompt.prompt_content_env_batch(batch) for batch in batches]
+        # 重试时不用回答缓存，避免拿回同一个无效回答
+        answers = llm.llm_ans_many(prompts, use_cache=attempt == 0)
+        for batch, answer in zip(batches, answers):
+            # 超时的批次为None，其中的代码留给下一轮更小的批次
+            if answer is not None:
+                scores.update(parse_batch(answer, batch))
+        _save_scores(scores)
+    return [scores.get(symbol, np.nan) for symbol in symbol_list]
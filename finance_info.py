@@ -1,21 +1,98 @@
-import talib as ta
+from utils import lazy
 from utils import trade_info
 from datetime import date, timedelta
-import pandas as pd
 import numpy as np
+from typing import NamedTuple
 import utils.llm_quantization as llm_q
+from utils import indicators as ind
+
+ta = lazy.module('talib')
+pd = lazy.module('pandas')
+
+
+class FinIndLatest(NamedTuple):
+    """fin_ind 的最新值记录（latest_only 模式），支持 record['RSI'] 形式访问"""
+    收盘: float
+    前收盘: float
+    RSI: float
+    MA_ratio: float
+    MACD: float
+    MACD_signal: float
+    MACD_hist: float
+    MACD_hist_diff: float
+    MOM: float
+    ADX: float
+    BB_upper: float
+    BB_middle: float
+    BB_lower: float
+    BB_position: float
+    WR: float
+    CCI: float
+    OBV: float
+    OBV_change: float
+    MA_20: float
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+    def to_dict(self):
+        return self._asdict()
+
+
+def _fin_ind_latest(trade_df, period):
+    # 只计算最新值：不复制DataFrame、不广播整列，直接在numpy数组上调用TA-Lib
+    close = trade_df['收盘'].to_numpy(dtype=float)
+    high = trade_df['最高'].to_numpy(dtype=float)
+    low = trade_df['最低'].to_numpy(dtype=float)
+    volume = trade_df['成交量'].to_numpy(dtype=float)
+    price = close[-1]
+
+    ma = ta.MA(close, timeperiod=period, matype=0)[-1]
+    macd, macd_signal, macd_hist = ta.MACD(close, fastperiod=12, slowperiod=26, signalperiod=9)
+    current_hist = np.clip((macd[-1] - macd_signal[-1]) * 5 + 50, 0, 100)
+    prev_hist = np.clip((macd[-2] - macd_signal[-2]) * 5 + 50, 0, 100)
+    upper, middle, lower = ta.BBANDS(close, timeperiod=period + 6, nbdevup=2, nbdevdn=2, matype=0)
+    width = upper[-1] - lower[-1]
+    obv = ta.OBV(close, volume)
+    ma_20 = ta.MA(close, timeperiod=20, matype=0)
+
+    return FinIndLatest(
+        收盘=price,
+        前收盘=close[-2],
+        RSI=ta.RSI(close, timeperiod=period)[-1],
+        MA_ratio=price / ma if ma != 0 else np.nan,
+        MACD=macd[-1],
+        MACD_signal=macd_signal[-1],
+        MACD_hist=macd_hist[-1],
+        MACD_hist_diff=current_hist - prev_hist,
+        MOM=ta.MOM(close, timeperiod=period)[-1],
+        ADX=ta.ADX(high, low, close, timeperiod=period)[-1],
+        BB_upper=upper[-1],
+        BB_middle=middle[-1],
+        BB_lower=lower[-1],
+        BB_position=(price - lower[-1]) / width if width != 0 else np.nan,
+        WR=ta.WILLR(high, low, close, timeperiod=period)[-1],
+        CCI=ta.CCI(high, low, close, timeperiod=period)[-1],
+        OBV=obv[-1],
+        OBV_change=(obv[-1] - obv[-5]) / obv[-5] if obv[-5] != 0 else np.nan,
+        MA_20=ma_20[-1],
+    )
 
 
-def fin_ind(trade_df, period=15):
+def fin_ind(trade_df, period=15, latest_only=False):
     """
     计算多种技术指标
 
     参数:
     trade_df (pd.DataFrame): 交易数据，应包含['open', 'high', 'low', 'close', 'volume']列
     period (int): 计算指标的周期，默认为15日
+    latest_only (bool): 为True时只返回最新值记录 FinIndLatest，不构造全表
 
     返回:
     pd.DataFrame: 包含原始数据和计算出的技术指标的DataFrame
+    （latest_only=True 时返回 FinIndLatest）
     """
     # 确保数据包含所需的列
     required_columns = ['开盘', '最高', '最低', '收盘', '成交量']
@@ -23,6 +100,9 @@ def fin_ind(trade_df, period=15):
         missing = [col for col in required_columns if col not in trade_df.columns]
         raise ValueError(f"输入数据缺少必要的列: {', '.join(missing)}")
 
+    if latest_only:
+        return _fin_ind_latest(trade_df, period)
+
     # 复制原始数据，避免修改原数据
     df = trade_df.copy()
     # fin_ind_data = pd.DataFrame()
@@ -88,46 +168,158 @@ def fin_ind(trade_df, period=15):
     return df, latest_data
 
 
-def bank_cal(symbol, period, days_ago):
-    # today
+# quantization 默认权重 - 根据技术分析理论分配权重
+TECHNICAL_WEIGHTS = {
+    'RSI': 15,  # 趋势强度和超买超卖
+    'MA_ratio': 10,  # 价格与均线关系
+    'MACD': 15,  # 趋势方向和动量
+    'ADX': 10,  # 趋势强度
+    'BB_position': 10,  # 布林带位置
+    'WR': 10,  # 超买超卖
+    'CCI': 10,  # 趋势转折点
+    'OBV_change': 20  # 成交量与价格关系
+}
+
+
+def fin_ind_series(high, low, close, volume, period=15):
+    """
+    fin_ind 各指标的完整时间序列（面板，每行一只股票，按日期升序，不含NaN）
+
+    返回:
+    dict: 指标名 -> (股票数, 交易日) 数组，字段与 FinIndLatest 一致
+    """
+    nan = np.full(close.shape, np.nan)
+    prev_close = np.concatenate([nan[:, :1], close[:, :-1]], axis=1)
+    ma = ind.sma(close, period)
+    macd, macd_signal, macd_hist = ind.macd(close, 12, 26, 9)
+    hist = np.clip((macd - macd_signal) * 5 + 50, 0, 100)
+    hist_diff = np.concatenate([nan[:, :1], hist[:, 1:] - hist[:, :-1]], axis=1)
+    upper, middle, lower = ind.bbands(close, period + 6, 2, 2)
+    width = upper - lower
+    obv = ind.obv(close, volume)
+    obv_prev = np.concatenate([nan[:, :4], obv[:, :-4]], axis=1)[:, :close.shape[1]]
+    ma_20 = ind.sma(close, 20)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            '收盘': close,
+            '前收盘': prev_close,
+            'RSI': ind.rsi(close, period),
+            'MA_ratio': np.where(ma != 0, close / ma, nan),
+            'MACD': macd,
+            'MACD_signal': macd_signal,
+            'MACD_hist': macd_hist,
+            'MACD_hist_diff': hist_diff,
+            'MOM': ind.mom(close, period),
+            'ADX': ind.adx(high, low, close, period),
+            'BB_upper': upper,
+            'BB_middle': middle,
+            'BB_lower': lower,
+            'BB_position': np.where(width != 0, (close - lower) / width, nan),
+            'WR': ind.willr(high, low, close, period),
+            'CCI': ind.cci(high, low, close, period),
+            'OBV': obv,
+            'OBV_change': np.where(obv_prev != 0, (obv - obv_prev) / obv_prev, nan),
+            'MA_20': ma_20,
+        }
+
+
+def fin_ind_panel(open_, high, low, close, volume, period=15, symbols=None):
+    """
+    面板模式：一次计算多只股票的技术指标，数值与 fin_ind 返回的 latest_data 一致
+
+    参数:
+    open_, high, low, close, volume (np.ndarray): (股票数, 交易日) 二维数组，按日期升序、右对齐，
+        上市较晚的股票左侧以NaN填充
+    period (int): 计算指标的周期，默认为15日
+    symbols (list, optional): 股票代码，作为结果的索引
+
+    返回:
+    pd.DataFrame: 每行一只股票的最新指标；数据不足的行为NaN
+    """
+    high, low, close, volume = (np.asarray(a, dtype=float) for a in (high, low, close, volume))
+    # TA-Lib 从首个有效值开始计算，按上市起点分组后各组内无NaN
+    series = ind.by_start(lambda h, l, c, v: fin_ind_series(h, l, c, v, period), close, high, low, close, volume)
+    index = symbols if symbols is not None else range(close.shape[0])
+    return pd.DataFrame({name: values[:, -1] for name, values in series.items()}, index=index)
+
+
+def build_panel(frames, columns=('开盘', '最高', '最低', '收盘', '成交量')):
+    """
+    将多只股票的交易数据（get_trade_info 结果，最后一行均为当日）右对齐拼成二维数组
+
+    返回:
+    dict: 列名 -> (股票数, 交易日) 数组，较短的序列左侧以NaN填充
+    """
+    days = max((len(f) for f in frames), default=0)
+    panel = {col: np.full((len(frames), days), np.nan) for col in columns}
+    for i, frame in enumerate(frames):
+        for col in columns:
+            panel[col][i, days - len(frame):] = frame[col].to_numpy(dtype=float)
+    return panel
+
+
+def bank_cal_panel(symbol_list, period, days_ago):
+    # 面板版 bank_cal：多只股票一次计算
     time = date.today()
     time_s = time.strftime("%Y%m%d")
-    time_ago = time-timedelta(days=days_ago)
-    time_ago_s = time_ago.strftime("%Y%m%d")
-    fin_info = trade_info.get_trade_info(symbol,time_ago_s,time_s)
+    time_ago_s = (time - timedelta(days=days_ago)).strftime("%Y%m%d")
+    frames = [trade_info.get_trade_info(symbol, time_ago_s, time_s) for symbol in symbol_list]
+    panel = build_panel(frames)
+    return fin_ind_panel(panel['开盘'], panel['最高'], panel['最低'], panel['收盘'], panel['成交量'],
+                         period=period, symbols=list(symbol_list))
+
+
+def bank_cal(symbol, period, days_ago, latest_only=False, trade_df=None):
+    # trade_df: get_trade_info result fetched by the caller (main.py technical stage, main_monitor)
+    if trade_df is None:
+        # today
+        time = date.today()
+        time_s = time.strftime("%Y%m%d")
+        time_ago = time-timedelta(days=days_ago)
+        time_ago_s = time_ago.strftime("%Y%m%d")
+        fin_info = trade_info.get_trade_info(symbol,time_ago_s,time_s)
+    else:
+        fin_info = trade_df
 
     # finance calculate
+    if latest_only:
+        return fin_ind(fin_info, period=period, latest_only=True)
     df, fin_index = fin_ind(fin_info, period=period)
 
     return df, fin_index
 
 
-def quantization(symbol, period, days_ago, weights=None):
-    df, banking_ind = bank_cal(symbol,period,days_ago)
+def quantization(symbol, period, days_ago, weights=None, trade_df=None):
+    banking_ind = bank_cal(symbol, period, days_ago, latest_only=True, trade_df=trade_df)
+    return technical_score(banking_ind, weights)[()]
+
 
+def technical_score(banking_ind, weights=None):
+    """
+    quantization 的评分部分，banking_ind 的各字段可为标量或同形状的numpy数组（回测/参数扫描用）
+
+    参数:
+    banking_ind: FinIndLatest 或 {指标名: 值/数组}，需包含 RSI, MA_ratio, MACD, MACD_signal, ADX, BB_position,
+        WR, CCI, OBV_change, MACD_hist_diff, 收盘, 前收盘, MA_20
+    weights (dict, optional): 各指标权重
+
+    返回:
+    np.ndarray: 技术面得分（标量输入时为0维数组）
+    """
     # quantization standard
     # 默认权重 - 根据技术分析理论分配权重
     if weights is None:
-        weights = {
-            'RSI': 15,  # 趋势强度和超买超卖
-            'MA_ratio': 10,  # 价格与均线关系
-            'MACD': 15,  # 趋势方向和动量
-            'ADX': 10,  # 趋势强度
-            'BB_position': 10,  # 布林带位置
-            'WR': 10,  # 超买超卖
-            'CCI': 10,  # 趋势转折点
-            'OBV_change': 20  # 成交量与价格关系
-        }
+        weights = TECHNICAL_WEIGHTS
 
     # 标准化各指标并计算得分
     scores = {}
 
     # RSI评分 (0-100) - 50为中性，接近30为超卖，接近70为超买
-    scores['RSI'] = 100 - np.clip(abs(banking_ind['RSI'] - 50) * 2, 0, 100)
+    scores['RSI'] = 100 - np.clip(np.abs(banking_ind['RSI'] - 50) * 2, 0, 100)
 
     # MA评分 - 价格高于MA得高分
-    scores['MA_ratio'] = np.clip(banking_ind['MA_ratio'] * 100, 0, 100) if not np.isnan(
-        banking_ind['MA_ratio']) else 50
+    scores['MA_ratio'] = np.where(np.isnan(banking_ind['MA_ratio']), 50,
+                                  np.clip(banking_ind['MA_ratio'] * 100, 0, 100))
 
     # MACD评分 - MACD线高于信号线得高分
     scores['MACD'] = np.clip((banking_ind['MACD'] - banking_ind['MACD_signal']) * 5 + 50, 0, 100)
@@ -136,8 +328,8 @@ def quantization(symbol, period, days_ago, weights=None):
     scores['ADX'] = np.clip(banking_ind['ADX'] * 2, 0, 100)
 
     # 布林带评分 - 价格接近下轨得高分(看涨)，接近上轨得低分(看跌)
-    scores['BB_position'] = np.clip((1 - banking_ind['BB_position']) * 100, 0, 100) if not np.isnan(
-        banking_ind['BB_position']) else 50
+    scores['BB_position'] = np.where(np.isnan(banking_ind['BB_position']), 50,
+                                     np.clip((1 - banking_ind['BB_position']) * 100, 0, 100))
 
     # 威廉指标评分 - 接近-100为超卖，接近0为超买
     scores['WR'] = np.clip(banking_ind['WR'] * -1, 0, 100)
@@ -146,8 +338,8 @@ def quantization(symbol, period, days_ago, weights=None):
     scores['CCI'] = np.clip(50 - banking_ind['CCI'] / 4, 0, 100)
 
     # OBV评分 - OBV上升得高分
-    scores['OBV_change'] = np.clip(banking_ind['OBV_change'] * 500 + 50, 0, 100) if not np.isnan(
-        banking_ind['OBV_change']) else 50
+    scores['OBV_change'] = np.where(np.isnan(banking_ind['OBV_change']), 50,
+                                    np.clip(banking_ind['OBV_change'] * 500 + 50, 0, 100))
 
     # 计算加权总分
     total_score = sum(scores[indicator] * weight for indicator, weight in weights.items()) / sum(weights.values())
@@ -156,15 +348,20 @@ def quantization(symbol, period, days_ago, weights=None):
     ##  趋势过滤 (修正)--------------------------------------------------------------------------------------------------------#
 
     # 1. 趋势因子 - 完全线性计算
-    price = df['收盘'].iloc[-1]
-    ma20 = df['MA_20'].iloc[-1]
-    ma20_prev = df['MA_20'].iloc[-2]
-    ma20_slope = (ma20 - ma20_prev) / ma20_prev * 100
-
-    # 计算趋势因子（完全线性）
-    slope_factor = 1.0 + ma20_slope * 0.4  # 斜率影响（每1%斜率变动，因子变动0.4）
-    price_factor = 1.0 + (price - ma20) / ma20 * 3  # 价格与均线距离影响
-    trend_factor = max(0.6, min(1.4, slope_factor * price_factor))
+    price = banking_ind['收盘']
+    ma20 = banking_ind['MA_20']
+    # 全表模式中MA_20为整列广播的最新值，df['MA_20'].iloc[-2]与最新值相同；保持原评分不变
+    ma20_prev = banking_ind['MA_20']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ma20_slope = (ma20 - ma20_prev) / ma20_prev * 100
+
+        # 计算趋势因子（完全线性）
+        slope_factor = 1.0 + ma20_slope * 0.4  # 斜率影响（每1%斜率变动，因子变动0.4）
+        price_factor = 1.0 + (price - ma20) / ma20 * 3  # 价格与均线距离影响
+    # 与 max(0.6, min(1.4, x)) 相同（含NaN时的取值）
+    trend_factor = slope_factor * price_factor
+    trend_factor = np.where(trend_factor < 1.4, trend_factor, 1.4)
+    trend_factor = np.where(trend_factor > 0.6, trend_factor, 0.6)
 
     # 2. 通用平滑评分函数
     def smooth_score(value, low, high, max_score=1.0):
@@ -188,15 +385,17 @@ def quantization(symbol, period, days_ago, weights=None):
     )
 
     # 4. 量价关系验证 - 动态调整（消除二元判断）
-    price_change = (df['收盘'].iloc[-1] - df['收盘'].iloc[-2]) / df['收盘'].iloc[-2] * 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price_change = (banking_ind['收盘'] - banking_ind['前收盘']) / banking_ind['前收盘'] * 100
     volume_change = banking_ind['OBV_change']
     bb_position = scores['BB_position']
 
     # 计算价格和成交量变化的相关性（-1到1之间）
     correlation = np.sign(price_change) * np.sign(volume_change)
-    # 根据相关性和价格变动幅度动态调整因子
-    volume_factor = 1.0 + max(0, correlation * abs(price_change) * 0.2) * (bb_position / 100)
-    volume_confirm = min(1.2, volume_factor)  # 限制最大增强幅度
+    # 根据相关性和价格变动幅度动态调整因子（与 max(0, x) / min(1.2, x) 相同）
+    volume_gain = correlation * np.abs(price_change) * 0.2
+    volume_factor = 1.0 + np.where(volume_gain > 0, volume_gain, 0) * (bb_position / 100)
+    volume_confirm = np.where(volume_factor < 1.2, volume_factor, 1.2)  # 限制最大增强幅度
 
     # 5. 最终得分修正 - 增加基础指标权重
     final_score = total_score * 0.7 + total_score * 0.3 * trend_factor * volume_confirm * (0.5 + strong_buy_score)
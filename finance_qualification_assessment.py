@@ -1,9 +1,11 @@
-import pandas as pd
 import numpy as np
 import utils.trade_info as trade_info
+from utils import lazy
 
+pd = lazy.module('pandas')
 
-def _calculate_financial_metrics(symbol):
+
+def _calculate_financial_metrics(symbol, financial_data=None):
     """
     计算公司财务评估指标（基于财务报表数据）
 
@@ -17,7 +19,8 @@ def _calculate_financial_metrics(symbol):
     metrics: 包含财务指标的DataFrame
     """
 
-    financial_data = trade_info.get_company_fin_info(symbol)
+    if financial_data is None:
+        financial_data = trade_info.get_company_fin_info(symbol)
     metrics = financial_data.copy()
 
     # 1. 偿债能力指标
@@ -424,6 +427,117 @@ def calculate_financial_health_score(financial_data, industry_benchmarks=None):
     return analysis
 
 
+# 批量评分用的阈值表（与 calculate_financial_health_score 中各 score_* 函数一致）
+HEALTH_WEIGHTS = {
+    'debt_ratio': 0.05, 'debt_to_equity': 0.05, 'current_ratio': 0.05, 'quick_ratio': 0.05,
+    'cash_ratio': 0.05, 'interest_coverage': 0.05,
+    'gross_margin': 0.05, 'operating_margin': 0.05, 'net_profit_margin': 0.05,
+    'return_on_assets': 0.05, 'return_on_equity': 0.05, 'return_on_invested_capital': 0.05,
+    'asset_turnover': 0.07, 'inventory_turnover': 0.07, 'receivables_turnover': 0.06,
+    'operating_cash_flow_ratio': 0.05, 'free_cash_flow': 0.05, 'fcfe': 0.05,
+    'eps': 0.02, 'book_value_per_share': 0.02, 'cash_flow_per_share': 0.01
+}
+TIER_SCORES = np.array([90, 70, 50])  # 未命中任何档位为30
+# 越低越好：value < 阈值
+LOWER_BETTER = {
+    'debt_ratio': np.array([0.4, 0.6, 0.8]),
+    'debt_to_equity': np.array([1, 1.5, 2]),
+}
+# 越高越好：value > 阈值
+HIGHER_BETTER = {
+    'interest_coverage': np.array([5, 3, 1.5]),
+    'gross_margin': np.array([0.25, 0.15, 0.05]),
+    'operating_margin': np.array([0.25, 0.15, 0.05]),
+    'net_profit_margin': np.array([0.25, 0.15, 0.05]),
+    'return_on_assets': np.array([0.15, 0.10, 0.05]),
+    'return_on_equity': np.array([0.15, 0.10, 0.05]),
+    'return_on_invested_capital': np.array([0.15, 0.10, 0.05]),
+    'asset_turnover': np.array([1.5, 1.0, 0.5]),
+    'receivables_turnover': np.array([1.5, 1.0, 0.5]),
+    'eps': np.array([5, 2, 0]),
+    'book_value_per_share': np.array([5, 2, 0]),
+    'cash_flow_per_share': np.array([5, 2, 0]),
+}
+# 区间适中为佳：lower <= value <= upper，由内到外
+BANDS = {
+    'current_ratio': np.array([[1.5, 2.5], [1.0, 3.0], [0.5, 4.0]]),
+    'quick_ratio': np.array([[0.8, 1.2], [0.5, 1.5], [0.2, 2.0]]),
+    'cash_ratio': np.array([[0.5, 1.0], [0.3, 1.5], [0.1, 2.0]]),
+}
+INVENTORY_BANDS = np.array([[0.7, 1.3], [0.5, 1.5], [0.3, 2]])  # 乘以行业平均存货周转率
+CASH_FLOW = ['operating_cash_flow_ratio', 'free_cash_flow', 'fcfe']
+CATEGORIES = {
+    "偿债能力": ['debt_ratio', 'debt_to_equity', 'current_ratio', 'quick_ratio', 'cash_ratio', 'interest_coverage'],
+    "盈利能力": ['gross_margin', 'operating_margin', 'net_profit_margin', 'return_on_assets', 'return_on_equity',
+             'return_on_invested_capital'],
+    "运营效率": ['asset_turnover', 'inventory_turnover', 'receivables_turnover'],
+    "现金流状况": ['operating_cash_flow_ratio', 'free_cash_flow', 'fcfe'],
+    "市场价值": ['eps', 'book_value_per_share', 'cash_flow_per_share']
+}
+TREND_CUTS = np.array([85, 70, 55, 40])
+TRENDS = np.array([
+    "强烈推荐买入，财务状况极佳，投资价值高",
+    "推荐买入，财务状况良好，投资价值较高",
+    "谨慎买入，财务状况一般，存在一定风险",
+    "建议观望，财务状况较差，风险较高",
+    "不建议投资，财务状况不佳，风险很大"
+])
+
+
+def _score_metric(metric, value, inventory_avg):
+    if metric in LOWER_BETTER:
+        return np.select([value < t for t in LOWER_BETTER[metric]], TIER_SCORES, 30)
+    if metric in HIGHER_BETTER:
+        return np.select([value > t for t in HIGHER_BETTER[metric]], TIER_SCORES, 30)
+    if metric in BANDS or metric == 'inventory_turnover':
+        bands = BANDS[metric] if metric in BANDS else INVENTORY_BANDS * inventory_avg
+        return np.select([(lo <= value) & (value <= hi) for lo, hi in bands], TIER_SCORES, 30)
+    if metric in CASH_FLOW:
+        with np.errstate(invalid='ignore'):
+            return np.select([value > 0, value > -5],
+                             [80 + np.minimum(value / 10, 20), 40 + np.minimum(value / 10, 40)], 20)
+    raise KeyError(f"invalid metric: {metric}")
+
+
+def calculate_financial_health_score_batch(metrics, industry_benchmarks=None):
+    """
+    批量计算财务健康评分，结果与逐个调用 calculate_financial_health_score 一致
+
+    参数:
+    metrics (pd.DataFrame): 每行一家公司，包含 HEALTH_WEIGHTS 中的各项指标
+    industry_benchmarks (dict, optional): 行业基准值，用于比较
+
+    返回:
+    pd.DataFrame: 每行一家公司，列为'总分'、'投资趋势'、各分类得分和各指标得分（指标得分保留两位小数）
+    """
+    inventory_avg = industry_benchmarks.get('inventory_turnover') if industry_benchmarks else None
+    if inventory_avg is None:
+        inventory_avg = 5
+
+    scores = {}
+    for metric in HEALTH_WEIGHTS:
+        value = pd.to_numeric(metrics[metric], errors='coerce').to_numpy(dtype=float)
+        scores[metric] = _score_metric(metric, value, inventory_avg)
+
+    # 按与逐个计算相同的顺序累加，保证浮点结果一致
+    total_score = 0
+    for metric, weight in HEALTH_WEIGHTS.items():
+        total_score = total_score + scores[metric] * weight
+
+    result = pd.DataFrame(index=metrics.index)
+    result['总分'] = np.round(total_score, 2)
+    # 与 score >= 85 等相同：恰好等于分界的总分归入较高一档
+    result['投资趋势'] = TRENDS[np.searchsorted(-TREND_CUTS, -total_score, side='left')]
+    for category, category_metrics in CATEGORIES.items():
+        category_score = 0
+        for metric in category_metrics:
+            category_score = category_score + scores[metric] * HEALTH_WEIGHTS[metric]
+        result[category] = category_score * 100
+    for metric in HEALTH_WEIGHTS:
+        result[metric] = np.round(scores[metric], 2)
+    return result
+
+
 def generate_advice(scores, metrics):
     """根据得分生成针对性建议"""
     advice = []
@@ -478,8 +592,9 @@ def generate_advice(scores, metrics):
     return advice
 
 
-def quantization(symbol):
-    metrics = _calculate_financial_metrics(symbol)
+def quantization(symbol, financial_data=None):
+    # financial_data: get_company_fin_info result fetched by the caller (main.py fundamental stage)
+    metrics = _calculate_financial_metrics(symbol, financial_data)
     # metrics = _calculate_financial_metrics_new(symbol)
 
     # 行业基准值示例
@@ -491,3 +606,18 @@ def quantization(symbol):
     result = calculate_financial_health_score(metrics, industry_benchmarks)
     result_s = result['总分']
     return result_s
+
+
+def quantization_batch(symbol_list, financial_data_list=None):
+    # 多只股票一次评分，financial_data_list 为预取的 get_company_fin_info 结果
+    if financial_data_list is None:
+        financial_data_list = [trade_info.get_company_fin_info(symbol) for symbol in symbol_list]
+    financial_data = pd.concat(financial_data_list, ignore_index=True)
+    financial_data.index = list(symbol_list)
+    metrics = _calculate_financial_metrics(None, financial_data)
+
+    # 行业基准值示例
+    industry_benchmarks = {
+        'inventory_turnover': 5.5
+    }
+    return calculate_financial_health_score_batch(metrics, industry_benchmarks)['总分']
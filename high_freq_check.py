@@ -1,12 +1,18 @@
-import akshare as ak
-import talib as ta
 import numpy as np
-import pandas as pd
 from utils import trade_info
+from utils.spot_provider import SpotIndex
+from utils import indicators as ind
+from collections import deque
 from datetime import date, timedelta
+from utils import lazy
 
+ta = lazy.module('talib')
+pd = lazy.module('pandas')
 
-def high_freq(symbol, period, days_ago, data_spot):
+
+def high_freq(symbol, period, days_ago, data_spot, day_fraction=1.0):
+    # day_fraction: 当前时刻通常已完成的全天成交量比例（见 minute_store.MinutePanel.day_fraction），
+    # 成交量变化率用 当日累计成交量/day_fraction 与近5日比较；默认1即按全天成交量比较
 
     # today
     time = date.today()
@@ -16,19 +22,23 @@ def high_freq(symbol, period, days_ago, data_spot):
 
     # stable index/metrics
     df_period = trade_info.get_trade_info(symbol, time_ago_s, time_s)[['日期', '最高', '最低', '收盘', '成交量']]
+    # get_trade_info 已拼接当日快照行，这里只保留已收盘K线，当日行由下面的 current_row 给出（与 get_stream 一致）
+    df_period = df_period[df_period['日期'] < time]
 
-    # real time original data
-    df = data_spot[data_spot['代码'].str[2:] == symbol]
+    # real time original data (data_spot: SpotIndex, or a raw snapshot DataFrame)
+    if not isinstance(data_spot, SpotIndex):
+        data_spot = SpotIndex(data_spot)
+    df = data_spot.row(symbol)
 
     # full data
     # 3. 拼接历史数据和实时数据（形成14天完整序列）
     # 构造实时数据行（用实时字段映射到历史字段格式）
     current_row = pd.DataFrame({
         '日期': pd.Timestamp.now().strftime('%Y-%m-%d'),  # 当前日期
-        '最高': df['最高'].iloc[0],  # 实时最高价
-        '最低': df['最低'].iloc[0],  # 实时最低价
-        '收盘': df['最新价'].iloc[0],  # 用实时最新价替代收盘价
-        '成交量': df['成交量'].iloc[0]  # 实时累计成交量
+        '最高': df['最高'],  # 实时最高价
+        '最低': df['最低'],  # 实时最低价
+        '收盘': df['最新价'],  # 用实时最新价替代收盘价
+        '成交量': df['成交量']  # 实时累计成交量
     }, index=[0])
 
     # 拼接：历史13天 + 当前1天 → 共14天
@@ -46,8 +56,9 @@ def high_freq(symbol, period, days_ago, data_spot):
     full_df['ATR'] = ta.ATR(full_df['最高'], full_df['最低'], full_df['收盘'], timeperiod=period).iloc[-1]
 
     # 新增指标4：成交量变化率（基于5日平均）
-    vol_mean = full_df['成交量'].iloc[-5:].mean()  # 近5日平均成交量
-    full_df['Volume_Change_Rate'] = (full_df['成交量'].iloc[-1] - vol_mean) / vol_mean * 100 if vol_mean != 0 else np.nan
+    vol_today = _project_volume(full_df['成交量'].iloc[-1], day_fraction)
+    vol_mean = (full_df['成交量'].iloc[-5:-1].sum() + vol_today) / 5  # 近5日平均成交量
+    full_df['Volume_Change_Rate'] = (vol_today - vol_mean) / vol_mean * 100 if vol_mean != 0 else np.nan
 
     # 新增指标5：价格变化率（ROC）
     past_close = full_df['收盘'].iloc[-1]
@@ -65,3 +76,158 @@ def high_freq(symbol, period, days_ago, data_spot):
     latest_data = full_df.iloc[-1].copy() if not full_df.empty else None
 
     return latest_data
+
+
+def _project_volume(volume, day_fraction):
+    # 当日累计成交量折算为全天，比例无效（开盘前、没有分时数据）时不折算
+    if day_fraction is None or not 0 < day_fraction < 1:
+        return volume
+    return volume / day_fraction
+
+
+def high_freq_series(high, low, close, volume, period):
+    """
+    high_freq 各指标的完整时间序列（面板，每行一只股票；回测中以每日收盘作为实时行）
+
+    返回:
+    dict: 指标名 -> (股票数, 交易日) 数组
+    """
+    ma = ind.sma(close, period)
+    vol_mean = ind.sma(volume, 5)  # 近5日平均成交量（含当日）
+    nan = np.full(close.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            '收盘': close,
+            'MFI': ind.mfi(high, low, close, volume, period),
+            'BIAS': np.where(ma != 0, (close - ma) / ma * 100, nan),
+            'ATR': ind.atr(high, low, close, period),
+            'Volume_Change_Rate': np.where(vol_mean != 0, (volume - vol_mean) / vol_mean * 100, nan),
+            # 与 high_freq 一致：以最新价为基准
+            'ROC': np.where(close != 0, (close - close) / close * 100, nan),
+        }
+
+
+def high_freq_timeframe(panel, minutes, period, lookback=5):
+    """
+    high_freq 各指标在分钟周期上的时间序列（如5/15/30/60分钟），
+    成交量变化率按分时归一：与之前 lookback 个交易日同一时刻K线的平均成交量比较
+
+    参数:
+    panel (MinutePanel): 分钟K线面板（minute_store.get_store().panel）
+    minutes (int): K线周期，见 minute_store.TIMEFRAMES
+    period (int): MFI/MA/ATR 周期（按K线数）
+
+    返回:
+    dict: 指标名 -> (股票数, K线数) 数组，'time' -> 每根K线的时刻 YYYYMMDDHHMM
+    """
+    bars = panel.resample(minutes)
+    series = bars.series()
+    out = ind.by_start(lambda high, low, close, volume: high_freq_series(high, low, close, volume, period),
+                       series['close'], series['high'], series['low'], series['close'], series['volume'])
+    relative = bars.relative_volume(lookback).reshape(len(bars.symbols), -1)[:, :len(series['time'])]
+    out['Volume_Change_Rate'] = (relative - 1) * 100
+    out['time'] = series['time']
+    return out
+
+
+class HighFreqStream:
+    """
+    单只股票的流式高频指标：用已收盘日线初始化Wilder/滚动窗口状态，
+    当日K线可随实时快照反复临时更新（O(1)，不提交）；下一个交易日由 get_stream 用已收盘日线重新初始化
+
+    参数:
+    period (int): MFI/MA/ATR 周期
+    high, low, close, volume (array-like): 已收盘日线（不含当日），长度至少 period+1
+    """
+
+    def __init__(self, period, high, low, close, volume):
+        high, low, close, volume = (np.asarray(a, dtype=float) for a in (high, low, close, volume))
+        if len(close) < period + 1:
+            raise ValueError(f"已收盘K线不足: {len(close)} < {period + 1}")
+        n = period
+        self.period = n
+        # MFI：最近 n-1 个已收盘资金流
+        pos, neg = ind.money_flow(*(a[np.newaxis, -n:] for a in (high, low, close, volume)))
+        self._flows = deque(zip(pos[0], neg[0]), maxlen=n - 1)
+        self._pos_sum = float(pos[0].sum())
+        self._neg_sum = float(neg[0].sum())
+        self._tp = (high[-1] + low[-1] + close[-1]) / 3
+        # MA：最近 n-1 个收盘价
+        self._closes = deque(close[-(n - 1):], maxlen=n - 1)
+        self._close_sum = float(close[-(n - 1):].sum())
+        # ATR：上一日的Wilder均值
+        self._atr = float(ind.atr(high[np.newaxis], low[np.newaxis], close[np.newaxis], n)[0, -1])
+        self._close = close[-1]
+        # 成交量：最近4个已收盘成交量
+        self._volumes = deque(volume[-4:], maxlen=4)
+
+    @classmethod
+    def from_frame(cls, df, period):
+        return cls(period, df['最高'], df['最低'], df['收盘'], df['成交量'])
+
+    def update(self, high, low, last, volume, day_fraction=1.0):
+        """
+        用当日实时数据（最高/最低/最新价/累计成交量）临时更新，返回与 high_freq 相同字段的指标
+
+        参数:
+        day_fraction (float): 见 high_freq，只影响成交量变化率
+        """
+        n = self.period
+        tp = (high + low + last) / 3
+        flow = tp * volume
+        pos = self._pos_sum + (flow if tp > self._tp else 0.0)
+        neg = self._neg_sum + (flow if tp < self._tp else 0.0)
+        mfi = 0.0 if pos + neg < 1.0 else 100.0 * pos / (pos + neg)
+
+        ma = (self._close_sum + last) / n
+        bias = (last - ma) / ma * 100 if ma != 0 else np.nan
+
+        tr = max(high - low, abs(high - self._close), abs(low - self._close))
+        atr = (self._atr * (n - 1) + tr) / n
+
+        vol_today = _project_volume(volume, day_fraction)
+        vol_mean = (sum(self._volumes) + vol_today) / 5
+        volume_change_rate = (vol_today - vol_mean) / vol_mean * 100 if vol_mean != 0 else np.nan
+
+        # 与 high_freq 一致：以最新价为基准
+        past_close = last
+        roc = (last - past_close) / past_close * 100 if past_close != 0 else np.nan
+
+        return {
+            '最高': high, '最低': low, '收盘': last, '成交量': volume,
+            'MFI': mfi, 'BIAS': bias, 'ATR': atr, 'Volume_Change_Rate': volume_change_rate, 'ROC': roc,
+        }
+
+    def update_row(self, row, day_fraction=1.0):
+        # row: SpotIndex.row() 的实时行情
+        return self.update(row['最高'], row['最低'], row['最新价'], row['成交量'], day_fraction)
+
+
+# (symbol, period) -> (交易日, HighFreqStream)
+_streams = {}
+
+
+def get_stream(symbol, period, days_ago):
+    # 每个交易日用已收盘日线初始化一次
+    today = date.today()
+    cached = _streams.get((symbol, period))
+    if cached is not None and cached[0] == today:
+        return cached[1]
+    time_ago_s = (today - timedelta(days=days_ago)).strftime("%Y%m%d")
+    df_period = trade_info.get_trade_info(symbol, time_ago_s, today.strftime("%Y%m%d"))
+    stream = HighFreqStream.from_frame(df_period[df_period['日期'] < today], period)
+    _streams[(symbol, period)] = (today, stream)
+    return stream
+
+
+def high_freq_stream(symbol, period, days_ago, data_spot, day_fraction=1.0):
+    """
+    high_freq 的流式版本：日内多次调用只做O(1)更新
+
+    返回:
+    pd.Series: 与 high_freq 相同字段的最新指标
+    """
+    if not isinstance(data_spot, SpotIndex):
+        data_spot = SpotIndex(data_spot)
+    latest = get_stream(symbol, period, days_ago).update_row(data_spot.row(symbol), day_fraction)
+    return pd.Series({'日期': pd.Timestamp.now().strftime('%Y-%m-%d'), **latest})
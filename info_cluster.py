@@ -1,5 +1,3 @@
-import akshare as ak
-import pandas as pd
 import utils.trade_info as trade_info
 from datetime import date, timedelta
 
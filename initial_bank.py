@@ -1,23 +1,363 @@
 # initial my bank
+# portfolio ledger: positions, cost basis, FIFO lots and cash in numpy arrays indexed by symbol slot, plus a transaction log;
+# marking every position against one spot snapshot is a single vectorized gather
+import os
+from datetime import datetime
+import numpy as np
+from utils import lazy
+
+pd = lazy.module('pandas')
+
+# main.py 与 main_monitor 共用的持仓账本（熔断状态 breaker.DEFAULT_PATH 对应这一个账本）
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'bank', 'ledger.npz')
+
+LOG_DTYPE = np.dtype([
+    ('time', 'datetime64[s]'),
+    ('slot', np.int32),
+    ('qty', np.float64),  # 买入为正，卖出为负
+    ('price', np.float64),
+    ('fee', np.float64),  # 佣金+印花税
+    ('realized', np.float64),  # 卖出实现的盈亏（已扣费用）
+])
+
+
+def _grow(array, size):
+    # 容量不足时翻倍
+    if size <= len(array):
+        return array
+    grown = np.zeros(max(size, 2 * len(array)), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
 
 class Bank:
-    def __init__(self, total_m=0, symbol_num=0, symbol_code=0, symbol_m=0, profit=0):
-        self.total_m = total_m
-        self.symbol_num = symbol_num # 已有symbol
-        self.symbol_code = symbol_code # 已有code
-        self.symbol_m = symbol_m # 已投数额
-        self.profit = profit
+    """
+    持仓账本
+
+    参数:
+    total_m (float): 初始现金
+    symbol_code (list, optional): 关注的股票代码（见 symbol_code）
+    fee_rate (float): 佣金费率（买卖双向）
+    min_fee (float): 单笔最低佣金
+    tax_rate (float): 印花税率（仅卖出）
+    capacity (int): 初始股票数容量，超出后自动扩容
+    """
+
+    def __init__(self, total_m=0, symbol_code=None, fee_rate=0.00025, min_fee=5.0, tax_rate=0.0005, capacity=16):
+        self.cash = float(total_m)
+        self.fee_rate = fee_rate
+        self.min_fee = min_fee
+        self.tax_rate = tax_rate
+        # 每只股票一个槽位（买过或关注过的股票）
+        self._codes = []
+        self._slots = {}
+        self._qty = np.zeros(capacity)
+        self._cost = np.zeros(capacity)  # 剩余持仓的成本（含买入费用）
+        self._realized = np.zeros(capacity)
+        self._last = np.full(capacity, np.nan)  # 最近一次估值价格
+        # 未平仓批次（先进先出）
+        self._lot_slot = np.zeros(capacity, dtype=np.int32)
+        self._lot_qty = np.zeros(capacity)
+        self._lot_price = np.zeros(capacity)  # 每股成本（含买入费用）
+        self._lots = 0
+        self._log = np.zeros(capacity, dtype=LOG_DTYPE)
+        self._log_n = 0
+        self._watch = None
+        # 同一快照反复估值时复用代码到快照行的映射
+        self._marked = None
+        self._marked_pos = None
+        if symbol_code is not None:
+            self.symbol_code = symbol_code
+
+    # ------------------------------------------------------------ slots
+
+    def _slot(self, symbol):
+        symbol = str(symbol)
+        slot = self._slots.get(symbol)
+        if slot is None:
+            slot = self._slots[symbol] = len(self._codes)
+            self._codes.append(symbol)
+            n = len(self._codes)
+            self._qty, self._cost, self._realized = (_grow(a, n) for a in (self._qty, self._cost, self._realized))
+            if n > len(self._last):
+                last = np.full(len(self._qty), np.nan)
+                last[:len(self._last)] = self._last
+                self._last = last
+            self._marked = None
+        return slot
+
+    @property
+    def codes(self):
+        return np.array(self._codes, dtype=object)
+
+    @property
+    def qty(self):
+        return self._qty[:len(self._codes)]
+
+    @property
+    def cost(self):
+        return self._cost[:len(self._codes)]
+
+    @property
+    def last(self):
+        return self._last[:len(self._codes)]
+
+    @property
+    def realized(self):
+        return self._realized[:len(self._codes)]
+
+    # ------------------------------------------------------------ trading
+
+    def _fee(self, amount, sell):
+        fee = max(amount * self.fee_rate, self.min_fee) if amount > 0 else 0.0
+        return fee + (amount * self.tax_rate if sell else 0.0)
+
+    def _record(self, slot, qty, price, fee, realized, time):
+        self._log = _grow(self._log, self._log_n + 1)
+        self._log[self._log_n] = (np.datetime64(time or datetime.now(), 's'), slot, qty, price, fee, realized)
+        self._log_n += 1
+
+    def buy(self, symbol, qty, price, time=None):
+        """
+        买入，新增一个批次
+
+        返回:
+        float: 费用
+        """
+        if qty <= 0 or price <= 0:
+            raise ValueError(f'invalid buy {symbol}: qty={qty}, price={price}')
+        amount = qty * price
+        fee = self._fee(amount, sell=False)
+        if amount + fee > self.cash + 1e-9:
+            raise ValueError(f'insufficient cash for {symbol}: need {amount + fee:.2f}, have {self.cash:.2f}')
+        slot = self._slot(symbol)
+        self.cash -= amount + fee
+        self._qty[slot] += qty
+        self._cost[slot] += amount + fee
+        if np.isnan(self._last[slot]):
+            self._last[slot] = price
+        self._lot_slot, self._lot_qty, self._lot_price = (
+            _grow(a, self._lots + 1) for a in (self._lot_slot, self._lot_qty, self._lot_price))
+        self._lot_slot[self._lots] = slot
+        self._lot_qty[self._lots] = qty
+        self._lot_price[self._lots] = (amount + fee) / qty
+        self._lots += 1
+        self._record(slot, qty, price, fee, 0.0, time)
+        return fee
+
+    def sell(self, symbol, qty, price, time=None):
+        """
+        卖出，按先进先出冲减批次
+
+        返回:
+        float: 本次实现的盈亏（已扣佣金和印花税）
+        """
+        slot = self._slots.get(str(symbol))
+        held = self._qty[slot] if slot is not None else 0.0
+        if qty <= 0 or price <= 0 or qty > held + 1e-9:
+            raise ValueError(f'invalid sell {symbol}: qty={qty}, price={price}, held={held}')
+        amount = qty * price
+        fee = self._fee(amount, sell=True)
+        lots = np.flatnonzero((self._lot_slot[:self._lots] == slot) & (self._lot_qty[:self._lots] > 0))
+        # 先进先出：按批次顺序累计到卖出数量
+        before = np.cumsum(self._lot_qty[lots]) - self._lot_qty[lots]
+        used = np.clip(qty - before, 0, self._lot_qty[lots])
+        cost = float(used @ self._lot_price[lots])
+        self._lot_qty[lots] -= used
+        realized = amount - fee - cost
+        self.cash += amount - fee
+        self._qty[slot] -= qty
+        self._cost[slot] = max(self._cost[slot] - cost, 0.0) if self._qty[slot] > 1e-9 else 0.0
+        self._realized[slot] += realized
+        self._last[slot] = price
+        self._record(slot, -qty, price, fee, realized, time)
+        self._compact()
+        return realized
+
+    def _compact(self):
+        # 已平仓批次超过一半时清理
+        open_lots = self._lot_qty[:self._lots] > 1e-9
+        if open_lots.sum() * 2 >= self._lots:
+            return
+        keep = np.flatnonzero(open_lots)
+        for array in (self._lot_slot, self._lot_qty, self._lot_price):
+            array[:len(keep)] = array[keep]
+        self._lots = len(keep)
+
+    def lots(self, symbol=None):
+        # 未平仓批次
+        n = self._lots
+        frame = pd.DataFrame({
+            '代码': self.codes[self._lot_slot[:n]] if n else np.array([], dtype=object),
+            '数量': self._lot_qty[:n],
+            '成本价': self._lot_price[:n],
+        })
+        frame = frame[frame['数量'] > 1e-9]
+        if symbol is not None:
+            frame = frame[frame['代码'] == str(symbol)]
+        return frame.reset_index(drop=True)
+
+    def transactions(self):
+        log = self._log[:self._log_n]
+        return pd.DataFrame({
+            '时间': log['time'],
+            '代码': self.codes[log['slot']] if self._log_n else np.array([], dtype=object),
+            '数量': log['qty'],
+            '价格': log['price'],
+            '费用': log['fee'],
+            '实现盈亏': log['realized'],
+        })
+
+    # ------------------------------------------------------------ valuation
+
+    def mark(self, data_spot, column='最新价'):
+        """
+        用一个行情快照给全部股票估值（停牌或快照中缺失的股票沿用上次价格）
+
+        参数:
+        data_spot (SpotIndex): 行情快照
+
+        返回:
+        np.ndarray: 每只股票的市值，顺序与 codes 一致
+        """
+        if self._marked is not data_spot:
+            self._marked, self._marked_pos = data_spot, data_spot.positions(self._codes)
+        pos = self._marked_pos
+        price = data_spot.array(column)[pos]
+        valid = (pos >= 0) & (price > 0)
+        self.last[valid] = price[valid]
+        return self.market_value
+
+    def mark_prices(self, prices):
+        # prices: 与 codes 顺序一致的价格数组，nan 或非正数表示沿用上次价格
+        prices = np.asarray(prices, dtype=float)
+        valid = prices > 0
+        self.last[valid] = prices[valid]
+        return self.market_value
+
+    @property
+    def market_value(self):
+        return self.qty * np.nan_to_num(self.last)
+
+    @property
+    def unrealized(self):
+        return self.market_value - self.cost
+
+    @property
+    def equity(self):
+        return self.cash + float(self.market_value.sum())
+
+    @property
+    def exposure(self):
+        # 每只股票市值占总资产的比例
+        value = self.market_value
+        equity = self.cash + value.sum()
+        return value / equity if equity > 0 else np.zeros(len(self._codes))
+
+    def positions(self):
+        # 持仓汇总（只含当前持有的股票）
+        held = self.qty > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            avg = np.where(held, self.cost / self.qty, np.nan)
+        return pd.DataFrame({
+            '代码': self.codes,
+            '数量': self.qty,
+            '成本': self.cost,
+            '成本价': avg,
+            '最新价': self.last,
+            '市值': self.market_value,
+            '浮动盈亏': self.unrealized,
+            '实现盈亏': self.realized,
+            '仓位': self.exposure,
+        })[held].reset_index(drop=True)
+
+    # ------------------------------------------------------------ legacy fields
+
+    @property
+    def symbol_code(self):
+        # 关注列表（info_cluster 写入），未设置时为当前持有的股票
+        if self._watch is not None:
+            return self._watch
+        return list(self.codes[self.qty > 0])
+
+    @symbol_code.setter
+    def symbol_code(self, symbol_list):
+        self._watch = [str(symbol) for symbol in symbol_list]
+        for symbol in self._watch:
+            self._slot(symbol)
+
+    @property
+    def total_m(self):
+        return self.equity
+
+    @property
+    def symbol_num(self):
+        return int((self.qty > 0).sum())
+
+    @property
+    def symbol_m(self):
+        # 已投数额（持仓成本）
+        return float(self.cost.sum())
+
+    @property
+    def profit(self):
+        return float(self.realized.sum() + self.unrealized.sum())
 
     def __getitem__(self, item):
-        if item == 'total_m':
-            return self.symbol_m
-        elif item == 'symbol_num':
-            return self.symbol_m
-        elif item == 'symbol_code':
-            return self.symbol_code
-        elif item == 'symbol_m':
-            return self.symbol_m
-        elif item == 'profit':
-            return self.profit
-        else:
-            raise KeyError(f"invalid key: {item}")
+        if item in ('total_m', 'symbol_num', 'symbol_code', 'symbol_m', 'profit'):
+            return getattr(self, item)
+        raise KeyError(f"invalid key: {item}")
+
+    # ------------------------------------------------------------ persistence
+
+    def save(self, path=DEFAULT_PATH):
+        # .npz，数组原样保存
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(path, codes=self.codes.astype(str), qty=self.qty, cost=self.cost, realized=self.realized,
+                 last=self.last, lot_slot=self._lot_slot[:self._lots], lot_qty=self._lot_qty[:self._lots],
+                 lot_price=self._lot_price[:self._lots], log=self._log[:self._log_n],
+                 watch=np.array(self._watch if self._watch is not None else [], dtype=str),
+                 has_watch=self._watch is not None,
+                 config=np.array([self.cash, self.fee_rate, self.min_fee, self.tax_rate]))
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=False)
+        cash, fee_rate, min_fee, tax_rate = data['config']
+        bank = cls(cash, fee_rate=fee_rate, min_fee=min_fee, tax_rate=tax_rate)
+        for symbol in data['codes']:
+            bank._slot(str(symbol))
+        bank.qty[:] = data['qty']
+        bank.cost[:] = data['cost']
+        bank.realized[:] = data['realized']
+        bank.last[:] = data['last']
+        lots = len(data['lot_qty'])
+        bank._lot_slot, bank._lot_qty, bank._lot_price = (
+            _grow(a, lots) for a in (bank._lot_slot, bank._lot_qty, bank._lot_price))
+        bank._lot_slot[:lots] = data['lot_slot']
+        bank._lot_qty[:lots] = data['lot_qty']
+        bank._lot_price[:lots] = data['lot_price']
+        bank._lots = lots
+        bank._log = _grow(bank._log, len(data['log']))
+        bank._log[:len(data['log'])] = data['log']
+        bank._log_n = len(data['log'])
+        if data['has_watch']:
+            bank._watch = [str(symbol) for symbol in data['watch']]
+        return bank
+
+
+def load_bank(path=DEFAULT_PATH, total_m=None):
+    """
+    读取保存的账本
+
+    参数:
+    path (str): 账本文件
+    total_m (float, optional): 没有账本文件时用该初始现金新建，为None时返回None
+
+    返回:
+    Bank | None
+    """
+    if os.path.exists(path):
+        return Bank.load(path)
+    return None if total_m is None else Bank(total_m)
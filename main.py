@@ -8,52 +8,80 @@ import info_cluster
 import communication_to_moblie
 import datetime
 import main_high_freq
+from utils import spot_provider
+from utils import data_source
+from utils import notify
+from utils import metrics
+from utils import pipeline
+from utils import trade_info
 
 # -1.param initial
 total = 2000  # money
 days_ago = 50  # history data days
 period = 14  # fin_ind days
 num = 10
-symbol_idx = 0
-result = []
-
+fetch_workers = 8  # concurrent symbols per stage, per-host limits in utils.host_limit
+spot_ttl = 300  # seconds, one market snapshot shared by every symbol within this window
+data_mode = 'live'  # 'live', 'record' (save every akshare response under data/archive), 'replay' (offline)
+data_latency = 0.0  # replay only: simulated seconds per call, or 'recorded'
+push_server = None  # None: PushDeer, or a local stub such as utils.notify_stub.url()
+rerun = []  # stages recomputed even if today's run already finished them (with everything after), e.g. ['high_freq']
+
+select_mode = 'llm'  # 'llm': browser LLM first selection, 'screen': full-market quantitative screen
 is_test = True
 # is_test = False
 
-# 0.initialization
-my_bank = initial_bank.Bank()
 
 # 1.selection first
-symbol_list = select_symbol.select_first(num,is_test)
+def selection():
+    return select_symbol.select_first(num, is_test, select_mode)
 
 
-for symbol in symbol_list:
-    # 2.finance Qualification assessment3
-    result_fq = finance_qualification_assessment.quantization(symbol)
+# 2.finance Qualification assessment3 (statements fetched and scored per symbol)
+def fundamental(symbol, selection):
+    return finance_qualification_assessment.quantization(symbol, trade_info.get_company_fin_info(symbol))
 
-    # 3.banking quantization(1move/day)
-    result_bk = finance_info.quantization(symbol, period, days_ago)
 
-    # 4.environment quantization(3move/day) (Public Opinion and Policy)   since first selection has done those, step can be ignored
-    # result_env = env_info.quantization(symbol, is_test)
+# 3.banking quantization(1move/day)
+def technical(symbol, selection):
+    time = datetime.date.today()
+    time_ago_s = (time - datetime.timedelta(days=days_ago)).strftime("%Y%m%d")
+    trade_df = trade_info.get_trade_info(symbol, time_ago_s, time.strftime("%Y%m%d"))
+    return finance_info.quantization(symbol, period, days_ago, trade_df=trade_df)
 
-    # 5.final quantization (Industry classification, multi-ind balance) 334:stable 442:long line 235:short line
-    result.append(0.3*result_fq+0.7*result_bk)
 
-    symbol_idx = symbol_idx+1
+# 4.environment quantization(3move/day) (Public Opinion and Policy)   since first selection has done those, step can be ignored
+# result_env = env_info.quantization(symbol, is_test)
 
+# 5.final quantization (Industry classification, multi-ind balance) 334:stable 442:long line 235:short line
 # 6.selection second
-second_symbol_list, result = select_symbol.select_second(symbol_list, result)
+def selection_second(selection, fundamental, technical):
+    result = [0.3*result_fq+0.7*result_bk for result_fq, result_bk in zip(fundamental, technical)]
+    second_symbol_list, result = select_symbol.select_second(selection, result)
+    print(second_symbol_list)
+    return second_symbol_list, result
+
 
 # 6.5 high freq check
-print(second_symbol_list)
-main_high_freq.main_high_freq(second_symbol_list)
+def high_freq(symbol, selection_second):
+    return main_high_freq.high_freq_score(symbol, period=17, days_ago=days_ago)
+
+
+def high_freq_push(selection_second, high_freq):
+    main_high_freq.push_high_freq(selection_second[0], high_freq)
+
+
+# 7.info cluster (the persisted ledger shared with main_monitor, created with total on the first run)
+def cluster(selection_second):
+    bank = info_cluster.info_cluster_f(initial_bank.load_bank(total_m=total), selection_second[0], period, days_ago)
+    bank.save()
+    return bank
 
-# 7.info cluster
-my_bank = info_cluster.info_cluster_f(my_bank, second_symbol_list, period, days_ago)
 
 # 7.circuit breaker
-breaker.bank_breaking(my_bank)
+def circuit_breaker(cluster):
+    return breaker.bank_breaking(cluster)
+
 
 # 8.sell
 # by manual
@@ -62,6 +90,42 @@ breaker.bank_breaking(my_bank)
 # by manual
 
 # 10.communication
-communication_to_moblie.communication(my_bank, result)
+def communication(cluster, selection_second, circuit_breaker):
+    communication_to_moblie.communication(cluster, selection_second[1], breaker.get_breaker().can_trade())
+
+
+STAGES = [
+    pipeline.Stage('selection', selection),
+    # fundamental and technical scoring are independent and run at the same time
+    pipeline.Stage('fundamental', fundamental, ['selection'], symbols='selection'),
+    pipeline.Stage('technical', technical, ['selection'], symbols='selection'),
+    pipeline.Stage('selection_second', selection_second, ['selection', 'fundamental', 'technical']),
+    pipeline.Stage('high_freq', high_freq, ['selection_second'], symbols=lambda inputs: inputs['selection_second'][0]),
+    pipeline.Stage('high_freq_push', high_freq_push, ['selection_second', 'high_freq']),
+    pipeline.Stage('cluster', cluster, ['selection_second']),
+    pipeline.Stage('circuit_breaker', circuit_breaker, ['cluster']),
+    pipeline.Stage('communication', communication, ['cluster', 'selection_second', 'circuit_breaker']),
+]
 
+# 0.initialization
+data_source.configure(data_mode, latency=data_latency)
+if push_server:
+    notify.set_server(push_server)
+spot_provider.set_ttl(spot_ttl)
+
+# every stage output is saved under data/runs/{date}_{params}; after a failure the same command resumes
+params = {'days_ago': days_ago, 'period': period, 'num': num, 'select_mode': select_mode, 'is_test': is_test,
+          'data_mode': data_mode}
+run = pipeline.Pipeline(STAGES, pipeline.run_dir(params), symbol_workers=fetch_workers)
+try:
+    run.run(rerun=rerun)
+finally:
+    notify.flush(timeout=30)
+    print('spot snapshot cache:', spot_provider.stats())
+    print('data source:', data_source.get_source().stats())
+    print('notifications:', notify.get_dispatcher().stats())
+
+    # run report: data/metrics/run_*.json and main.prom
+    report = metrics.write(params=params)
+    print(metrics.summary(report))
 print(datetime.datetime.now(), ' done')
@@ -1,8 +1,10 @@
 import high_freq_check
 import finance_info
 import numpy as np
-import akshare as ak
-from pypushdeer import PushDeer
+from utils import spot_provider
+from utils import minute_store
+from utils import notify
+from utils import metrics
 
 def score_indicator(indicator_name, value):
     """将单个指标值转换为-1~1的分数（1=强烈看多，-1=强烈看空）"""
@@ -119,6 +121,74 @@ def calculate_investment_coefficient(historical_indicators, realtime_indicators)
         return (final_coefficient, "强烈卖出")
 
 
+GRADES = ["强烈买入", "买入", "持有", "卖出", "强烈卖出"]
+
+
+def score_indicator_array(indicator_name, value):
+    """score_indicator 的数组版本，逐元素结果相同"""
+    value = np.asarray(value, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if indicator_name == 'ADX':
+            score = value / 50
+            score = np.where(1 < score, 1, score)
+        elif indicator_name == 'MACD_hist':
+            score = np.clip(value * 10, -1, 1)
+        elif indicator_name == 'BB_position':
+            score = np.select([value < 0.3, value > 0.7], [1 - (value / 0.3), (0.7 - value) / 0.3], 0)
+        elif indicator_name == 'RSI':
+            score = np.select([value < 30, value > 70], [(30 - value) / 30, (70 - value) / 30], (value - 50) / 20)
+        elif indicator_name == 'MOM':
+            score = np.clip(value / 5, -1, 1)
+        elif indicator_name == 'ROC':
+            score = np.clip(value / 10, -1, 1)
+        elif indicator_name == 'MFI':
+            score = np.select([value < 20, value > 80], [(20 - value) / 20, (80 - value) / 20], (value - 50) / 30)
+        elif indicator_name == 'OBV_change':
+            score = np.clip(value, -1, 1)
+        elif indicator_name == 'Volume_Change_Rate':
+            roc = 6.73  # 与 score_indicator 相同
+            volume_score = np.clip(value / 200, -1, 1)
+            score = volume_score if roc > 0 else -volume_score
+        elif indicator_name == 'BIAS':
+            score = np.clip(-value / 5, -1, 1)
+        elif indicator_name == 'WR':
+            score = np.clip((value + 50) / 30, -1, 1)
+        else:
+            score = np.zeros_like(value)
+    return np.where(np.isnan(value), 0, score)
+
+
+def calculate_investment_coefficient_array(all_indicators, weights=None, cuts=(0.6, 0.2)):
+    """
+    calculate_investment_coefficient 的数组版本（回测/参数扫描用）
+    参数：all_indicators（已合并的 {指标名: 数组}）、weights（默认 INDICATOR_WEIGHTS）、cuts（强/弱分档阈值）
+    返回：(投资系数数组, 分档序号数组)，分档序号对应 GRADES
+    """
+    if weights is None:
+        weights = INDICATOR_WEIGHTS
+    strong, weak = cuts
+
+    total_score = 0
+    for indicator, weight in weights.items():
+        if indicator in all_indicators:
+            total_score = total_score + score_indicator_array(indicator, all_indicators[indicator]) * weight
+
+    # 与 max(1 - volatility_ratio * 10, 0.5) 相同（含NaN时的取值）
+    atr = np.asarray(all_indicators.get('ATR', 0.5), dtype=float)
+    price = np.asarray(all_indicators.get('收盘', 10), dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        adjust_factor = 1 - atr / price * 10
+    adjust_factor = np.where(0.5 > adjust_factor, 0.5, adjust_factor)
+    final_coefficient = total_score * adjust_factor
+
+    grade = np.select([final_coefficient >= strong,
+                       (weak <= final_coefficient) & (final_coefficient < strong),
+                       (-weak < final_coefficient) & (final_coefficient < weak),
+                       (-strong < final_coefficient) & (final_coefficient <= -weak)],
+                      [0, 1, 2, 3], 4)
+    return final_coefficient, grade
+
+
 # 指标分类及权重（可根据策略调整）
 INDICATOR_WEIGHTS = {
     # 趋势类（30%）：判断中长期方向
@@ -139,6 +209,34 @@ INDICATOR_WEIGHTS = {
     'ATR': 0.05  # ATR本身不直接看多空，用于调整其他信号权重
 }
 
+def high_freq_score(symbol, data_spot=None, period=17, days_ago=50):
+    """
+    单只股票的高频评分（main_high_freq 逐只调用，main.py 的流水线按股票保存结果）
+
+    返回:
+    tuple: (投资系数, 分档)
+    """
+    if data_spot is None:
+        data_spot = spot_provider.get_index()
+    # stable index
+    stable = finance_info.bank_cal(symbol, period, days_ago, latest_only=True)
+
+    # real time index (盘中按分时成交量分布把当日累计成交量折算为全天，没有分时数据时为1)
+    day_fraction = minute_store.day_fraction([symbol])[0]
+    df_real_time = high_freq_check.high_freq(symbol, period, days_ago, data_spot, day_fraction)
+
+    # 计算结果
+    return calculate_investment_coefficient(stable.to_dict(), df_real_time.to_dict())
+
+
+def push_high_freq(symbol_list, scores):
+    # 推送在后台发出（utils.notify），不阻塞
+    lines = ['\n'+symbol+': '+str(coefficient)+'-'+grade for symbol, (coefficient, grade) in zip(symbol_list, scores)]
+    notify.send('ding', ''.join(lines))
+    for symbol, (coefficient, grade) in zip(symbol_list, scores):
+        print(symbol+": "+f"投资系数：{coefficient:.2f}，分档结果：{grade}")
+
+
 def main_high_freq(symbol_list):
     # symbol_list = ['603163' '300750' '002997' '300724' '300870' '002466' '002460' '002008' '301162' '002353']
     days_ago = 50  # history data days
@@ -148,30 +246,16 @@ def main_high_freq(symbol_list):
     # twice/days
     # real time metrics
     # real time original data
-    data_spot = ak.stock_zh_a_spot()
-    str_result = ''
+    data_spot = spot_provider.get_index()
+    scores = []
     for symbol in symbol_list:
-        # stable index
-        df_stable = finance_info.bank_cal(symbol, period, days_ago)
-
-        # real time index
-        df_real_time = high_freq_check.high_freq(symbol, period, days_ago, data_spot)
+        with metrics.symbol(symbol):
+            scores.append(high_freq_score(symbol, data_spot, period, days_ago))
 
-        # 计算结果
-        coefficient, grade = calculate_investment_coefficient(df_stable[-1].to_dict(), df_real_time.to_dict())
-        str_result = str_result+'\n'+symbol+': '+str(coefficient)+'-'+grade
-
-    pushdeer_ding = PushDeer(pushkey="PDU36046TfIe7SgbaLY1OWrvHnyBF6mMcudbGcVaW")  # ding
-    # pushdeer_yi = PushDeer(pushkey="PDU36425TtwSeJJ8zXEfSG4lALYJPIKHsKchLhZAP")  # yi
-    #
     # message = my_bank.symbol_code
     # mess_str = ''
     # idx = 0
     # for i in message:
     #     mess_str = mess_str + '\n' + i + ' - ' + str(result[idx])
     #     idx = idx + 1
-    pushdeer_ding.send_text(text='Message', desp=str_result)
-    # pushdeer_yi.send_text(text='Message', desp=mess_str)
-
-    print(symbol+": "+f"投资系数：{coefficient:.2f}，分档结果：{grade}")
-
+    push_high_freq(symbol_list, scores)
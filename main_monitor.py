@@ -0,0 +1,224 @@
+# intraday monitoring daemon for main_high_freq: polls the spot snapshot during trading sessions,
+# keeps each symbol's daily (stable) indicators for the day and only re-scores symbols whose price or volume changed
+import asyncio
+import sys
+from datetime import datetime, time, timedelta
+import numpy as np
+import finance_info
+import high_freq_check
+import main_high_freq
+import breaker as circuit_breaker
+import initial_bank
+from utils import minute_store
+from utils import notify
+from utils import spot_provider
+from utils import trade_info
+
+# A股交易时段（开盘集合竞价 9:15-9:25，连续竞价，午间休市 11:30-13:00，收盘集合竞价 14:57-15:00）
+SESSIONS = [
+    (time(9, 15), time(9, 25), 'auction'),
+    (time(9, 25), time(9, 30), 'pre_open'),  # 竞价结束到开盘，快照不变
+    (time(9, 30), time(11, 30), 'continuous'),
+    (time(11, 30), time(13, 0), 'lunch'),
+    (time(13, 0), time(14, 57), 'continuous'),
+    (time(14, 57), time(15, 0), 'auction'),
+]
+POLLING = ('auction', 'pre_open', 'continuous')
+
+
+def session_state(now):
+    """
+    返回:
+    str: 'auction' / 'pre_open' / 'continuous' / 'lunch' / 'closed'（周末和盘前盘后）
+    """
+    if now.weekday() >= 5:
+        return 'closed'
+    t = now.time()
+    for start, end, state in SESSIONS:
+        if start <= t < end:
+            return state
+    return 'closed'
+
+
+def next_poll_time(now):
+    # 下一个需要轮询的时刻（午休后13:00，收盘后下一个工作日9:15）
+    t = now.time()
+    if now.weekday() < 5 and t < time(9, 15):
+        return datetime.combine(now.date(), time(9, 15))
+    if now.weekday() < 5 and time(11, 30) <= t < time(13, 0):
+        return datetime.combine(now.date(), time(13, 0))
+    day = now.date() + timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return datetime.combine(day, time(9, 15))
+
+
+class Monitor:
+    """
+    日内监控
+
+    参数:
+    symbol_list (list): 监控的股票代码
+    period (int): 指标周期（与 main_high_freq 一致）
+    days_ago (int): 历史数据天数
+    interval (float): 交易时段内的轮询间隔（秒）
+    recipient (str): 推送对象（utils.notify.RECIPIENTS）
+    clock (callable): 当前时间，默认 datetime.now
+    bank (initial_bank.Bank, optional): 持仓账本，给出时每个快照估值后检查熔断规则并推送触发的动作
+    breaker (breaker.Breaker, optional): 默认 breaker.get_breaker()
+    intraday (bool): 用最近几个交易日的1分钟成交量分布（utils.minute_store）把当日累计成交量折算为全天后
+        再计算成交量变化率；没有分时数据的股票按全天成交量比较
+    """
+
+    def __init__(self, symbol_list, period=17, days_ago=50, interval=60, recipient='ding', clock=datetime.now,
+                 bank=None, breaker=None, intraday=True):
+        self.symbol_list = list(symbol_list)
+        self.period = period
+        self.days_ago = days_ago
+        self.interval = interval
+        self.recipient = recipient
+        self.clock = clock
+        self.bank = bank
+        self.breaker = breaker or (circuit_breaker.get_breaker() if bank is not None else None)
+        self.intraday = intraday
+        self.day = None
+        self.curve = None  # 当日使用的分时成交量分布，(股票数, 240)
+        self.stable = {}  # 代码 -> 当日的 bank_cal 指标（dict）
+        self.grades = {}  # 代码 -> (投资系数, 分档)
+        self._last = None  # 上次快照中每只股票的 (最新价, 成交量)
+        self.polls = 0
+        self.rescored = 0
+
+    def _new_day(self, day):
+        self.day = day
+        self.stable = {}
+        self.grades = {}
+        self.curve = None
+        self._last = None
+
+    def _day_fraction(self, now):
+        # 每只股票截至 now 通常已完成的全天成交量比例，分时数据每天只读一次
+        if not self.intraday:
+            return np.ones(len(self.symbol_list))
+        if self.curve is None:
+            self.curve = minute_store.volume_curve(self.symbol_list, now)
+        done = int(minute_store.elapsed(now.hour * 100 + now.minute))
+        return self.curve[:, done - 1] if done else np.ones(len(self.symbol_list))
+
+    def _stable(self, symbol):
+        # 日线指标每天只算一次，只用已收盘K线：get_trade_info 拼接的当日行在首次轮询时（9:15 集合竞价）
+        # 还是盘前数据，会在整个交易日内固定在指标里
+        if symbol not in self.stable:
+            start = (self.day - timedelta(days=self.days_ago)).strftime('%Y%m%d')
+            trade_df = trade_info.get_trade_info(symbol, start, self.day.strftime('%Y%m%d'))
+            trade_df = trade_df[trade_df['日期'] < self.day].reset_index(drop=True)
+            self.stable[symbol] = finance_info.bank_cal(symbol, self.period, self.days_ago, latest_only=True,
+                                                        trade_df=trade_df).to_dict()
+        return self.stable[symbol]
+
+    def poll_once(self, data_spot):
+        """
+        处理一次快照：只对最新价或成交量有变化的股票重新计算
+
+        返回:
+        list: 分档发生变化的 (代码, 投资系数, 旧分档, 新分档)，当日首次评分的旧分档为None
+        """
+        now = self.clock()
+        if self.day != now.date():
+            self._new_day(now.date())
+        self.polls += 1
+
+        pos = data_spot.positions(self.symbol_list)
+        listed = pos >= 0
+        current = np.full((len(self.symbol_list), 2), np.nan)
+        current[listed, 0] = data_spot.df['最新价'].to_numpy(dtype=float)[pos[listed]]
+        current[listed, 1] = data_spot.df['成交量'].to_numpy(dtype=float)[pos[listed]]
+        if self._last is None:
+            changed = listed
+        else:
+            changed = listed & np.any(current != self._last, axis=1)
+        self._last = current
+
+        changes = []
+        fraction = self._day_fraction(now)
+        for i in np.flatnonzero(changed):
+            symbol = self.symbol_list[i]
+            try:
+                stream = high_freq_check.get_stream(symbol, self.period, self.days_ago)
+                realtime = stream.update_row(data_spot.row(symbol), fraction[i])
+                coefficient, grade = main_high_freq.calculate_investment_coefficient(self._stable(symbol), realtime)
+            except Exception as e:
+                # 单只股票失败不影响其他股票，下次轮询重试
+                print(f'{symbol}: {e}')
+                self._last[i] = np.nan
+                continue
+            self.rescored += 1
+            old = self.grades.get(symbol, (None, None))[1]
+            self.grades[symbol] = (coefficient, grade)
+            if grade != old:
+                changes.append((symbol, coefficient, old, grade))
+        return changes
+
+    def _push(self, changes):
+        lines = ['\n' + symbol + ': ' + str(coefficient) + '-' + (old + '->' if old else '') + grade
+                 for symbol, coefficient, old, grade in changes]
+        notify.send(self.recipient, ''.join(lines))
+
+    def _push_actions(self, actions):
+        lines = ['\n' + action.kind + ' ' + (action.symbol or '') + ' ' + f'{action.qty:g}' + ': ' + action.reason
+                 for action in actions]
+        notify.send(self.recipient, ''.join(lines), text='breaker')
+
+    async def _sleep_until(self, when):
+        await asyncio.sleep(max((when - self.clock()).total_seconds(), 0))
+
+    async def run(self, stop=None):
+        """
+        主循环：交易时段内按 interval 轮询，午休和收盘后休眠到下一个交易时段
+
+        参数:
+        stop (asyncio.Event, optional): 设置后退出
+        """
+        stop = stop or asyncio.Event()
+        provider = spot_provider.get_provider()
+        while not stop.is_set():
+            now = self.clock()
+            if session_state(now) not in POLLING:
+                if self.breaker is not None:
+                    # 午休/收盘后保存当日权益，重启后连续亏损天数照常累计
+                    self.breaker.save()
+                sleeper = asyncio.ensure_future(self._sleep_until(next_poll_time(now)))
+                waiter = asyncio.ensure_future(stop.wait())
+                await asyncio.wait([sleeper, waiter], return_when=asyncio.FIRST_COMPLETED)
+                sleeper.cancel()
+                waiter.cancel()
+                continue
+            started = self.clock()
+            try:
+                # 下载和计算在线程中执行，不阻塞事件循环
+                data_spot = await asyncio.to_thread(provider.get_index, True)
+                changes = await asyncio.to_thread(self.poll_once, data_spot)
+                if self.bank is not None:
+                    actions = self.breaker.check(self.bank, data_spot, self.clock())
+                    if actions:
+                        self._push_actions(actions)
+                # 熔断期间不推送买卖信号，只推送熔断动作
+                if changes and (self.breaker is None or self.breaker.can_trade(self.clock().date())):
+                    self._push(changes)
+            except Exception as e:
+                print(f'{started}: poll failed: {e}')
+            elapsed = (self.clock() - started).total_seconds()
+            try:
+                await asyncio.wait_for(stop.wait(), max(self.interval - elapsed, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self):
+        return {'polls': self.polls, 'rescored': self.rescored, 'symbols': len(self.symbol_list)}
+
+
+if __name__ == '__main__':
+    symbol_list = sys.argv[1:] or ['603163', '300750', '002997', '300724', '300870', '002466', '002460', '002008',
+                                   '301162', '002353']
+    # 有 main.py 保存的账本时同时检查熔断规则
+    asyncio.run(Monitor(symbol_list, bank=initial_bank.load_bank()).run())
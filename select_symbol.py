@@ -1,12 +1,20 @@
 # select finance: first selection(100) and quantified result for second selection(5)
+from concurrent.futures import ThreadPoolExecutor
 from utils import llm_quantization
 import utils.prompt as prompt
 import utils.llm as llm
 import numpy as np
+from utils import spot_provider
+from utils import ohlcv_store
+from utils import lazy
 
+pd = lazy.module('pandas')
 
-# 信息获取api受限，通过llm实现first select
-def select_first(num, is_test=False):
+
+# 信息获取api受限，通过llm实现first select；mode='screen' 时使用全市场量化初筛
+def select_first(num, is_test=False, mode='llm'):
+    if mode == 'screen':
+        return select_screen(num)
     if is_test is True:
         result = 'ANS 000002'
     else:
@@ -23,3 +31,84 @@ def select_second(symbol_list, symbol_quantization_result):
     result = np.array(symbol_list)[index]
     symbol_quantization_result = np.array(symbol_quantization_result)[index]
     return result, symbol_quantization_result
+
+
+def select_screen(num, data_spot=None, exchanges=('sh', 'sz', 'bj'), min_price=3, max_price=200, min_amount=1e8,
+                  momentum_days=20, min_momentum=0.0, volatility_days=20, max_volatility=0.05, max_range=0.08,
+                  refresh=True, workers=8):
+    """
+    全市场量化初筛：基于实时快照和本地日线的向量化过滤，替代llm的first select
+
+    快照中通过价格/流动性过滤的全部股票都参与排序。排序前先增量更新这些股票的本地日线（OHLCVStore.update，
+    已是最新的不联网）；日线更新到最近收盘日的股票用N日动量和波动率，仍没有最新日线的股票用当日涨跌幅和振幅
+
+    参数:
+    num (int): 返回数量
+    data_spot (SpotIndex, optional): 行情快照，默认使用 spot_provider 的共享快照
+    exchanges (tuple): 交易所范围
+    min_price, max_price (float): 最新价区间
+    min_amount (float): 最低成交额（流动性）
+    momentum_days (int): 动量回看交易日数，动量 = 最新价 / N日前收盘价 - 1
+    min_momentum (float): 最低动量
+    volatility_days (int): 波动率回看交易日数（日对数收益率标准差）
+    max_volatility (float): 最高波动率
+    max_range (float): 没有最新日线的股票的最高当日振幅（(最高-最低)/昨收）
+    refresh (bool): 是否先更新候选股票的本地日线（False 时只读本地数据）
+    workers (int): 更新日线的线程数（同一数据源的并发另由 utils.host_limit 限制）
+
+    返回:
+    list: 动量（或当日涨跌幅）降序的前 num 个6位代码，与 select_first 格式一致
+    """
+    if data_spot is None:
+        data_spot = spot_provider.get_index()
+    df = data_spot.df
+
+    def column(name):
+        return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float)
+
+    price = column('最新价')
+    amount = column('成交额')
+    # 剔除ST/退市整理和停牌（无成交或未开盘）
+    keep = ~df['名称'].astype(str).str.contains('ST|退', regex=True).to_numpy()
+    keep &= np.isin(data_spot.exchange, exchanges)
+    keep &= (column('成交量') > 0) & (column('今开') > 0)
+    keep &= (price >= min_price) & (price <= max_price) & (amount >= min_amount)
+    rows = np.flatnonzero(keep)
+    codes = data_spot.code[rows]
+
+    # 历史特征：候选股票的本地日线先增量更新，更新失败的股票下面按快照计算
+    store = ohlcv_store.get_store()
+    if refresh:
+        stale = [str(code) for code in codes[~store.fresh(list(codes))]]
+        if stale:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(_refresh_bars, stale))
+    fresh = store.fresh(list(codes))
+    if not fresh.all():
+        print(f'select_screen: {int((~fresh).sum())} of {len(codes)} symbols without fresh bars, using the day change')
+
+    # 没有最新日线：当日涨跌幅和振幅
+    with np.errstate(divide='ignore', invalid='ignore'):
+        momentum = column('涨跌幅')[rows] / 100
+        day_range = (column('最高')[rows] - column('最低')[rows]) / column('昨收')[rows]
+    ok = day_range <= max_range
+    # 有最新日线：N日动量和日收益率波动率
+    if fresh.any():
+        days = max(momentum_days, volatility_days + 1)
+        closes = store.load_field(list(codes[fresh]), days, 'close')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            momentum[fresh] = price[rows[fresh]] / closes[:, -momentum_days] - 1
+            returns = np.diff(np.log(closes[:, -(volatility_days + 1):]), axis=1)
+            ok[fresh] = np.std(returns, axis=1) <= max_volatility
+    ok &= momentum >= min_momentum
+    codes, momentum = codes[ok], momentum[ok]
+    order = np.argsort(-momentum, kind='stable')[:num]
+    return [str(code) for code in codes[order]]
+
+
+def _refresh_bars(symbol):
+    # 单只股票更新失败不影响初筛
+    try:
+        ohlcv_store.get_store().update(symbol)
+    except Exception as e:
+        print(f'{symbol}: {e}')
@@ -0,0 +1,207 @@
+# parameter sweep over the backtest: indicator weights, periods, blend and grade cut-offs, evaluated on all cores
+# the price panel is loaded once and shared with the worker processes through shared memory (works with spawn on Windows)
+import itertools
+import multiprocessing as mp
+import os
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+import backtest
+import finance_qualification_assessment
+import main_high_freq
+
+DEFAULT_OUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sweep_results.csv')
+
+# 网格搜索默认取值，每种信号只扫描它实际使用的参数（main.py / main_high_freq 现用值为 period=17、tech_period=14、
+# blend=0.3、cuts=(0.6, 0.2)）：
+# 'grade' 按投资系数分档调仓，使用 period、INDICATOR_WEIGHTS、cuts；
+# 'score' 持有 blend*基本面 + (1-blend)*技术面 最高的 top_k 只，使用 tech_period、blend（需要基本面得分）
+PARAM_GRID = {
+    'grade': {
+        'period': [14, 17, 20],
+        'cuts': [(0.6, 0.2), (0.5, 0.2), (0.6, 0.3), (0.4, 0.1)],
+    },
+    'score': {
+        'tech_period': [10, 14, 20],
+        'blend': [0.0, 0.3, 0.5, 0.7, 1.0],
+    },
+}
+
+# 工作进程内的共享数据
+_worker = {}
+
+
+def grid(space=None, weight_sets=None, signals=('grade', 'score')):
+    """
+    网格搜索的参数组合
+
+    参数:
+    space (dict, optional): 信号 -> {参数名: 取值列表}，默认 PARAM_GRID
+    weight_sets (list, optional): 'grade' 的候选 INDICATOR_WEIGHTS，默认只用现有权重
+    signals (tuple): 扫描的信号
+
+    返回:
+    list: 参数字典列表
+    """
+    space = PARAM_GRID if space is None else space
+    configs = []
+    for signal in signals:
+        params = dict(space[signal])
+        if signal == 'grade':
+            params['weights'] = weight_sets or [dict(main_high_freq.INDICATOR_WEIGHTS)]
+        keys = list(params)
+        configs.extend({'signal': signal, **dict(zip(keys, values))}
+                       for values in itertools.product(*(params[k] for k in keys)))
+    return configs
+
+
+def random_configs(n, seed=0, signal='grade', periods=range(10, 25), strong=(0.3, 0.8), weak=(0.05, 0.4),
+                   sigma=0.5, tech_periods=range(8, 25), blend=(0.0, 1.0)):
+    """
+    随机搜索的参数组合
+
+    参数:
+    n (int): 组合数
+    seed (int): 随机种子
+    signal (str): 'grade' 扫描 period、cuts 和权重；'score' 扫描 tech_period 和 blend
+    periods / tech_periods: 周期候选
+    strong / weak (tuple): 强、弱分档阈值的取值区间（弱阈值始终小于强阈值）
+    sigma (float): 权重按 exp(N(0, sigma)) 扰动后归一到原权重之和
+    blend (tuple): 基本面占比的取值区间
+
+    返回:
+    list: 参数字典列表
+    """
+    rng = np.random.default_rng(seed)
+    names = list(main_high_freq.INDICATOR_WEIGHTS)
+    base = np.array([main_high_freq.INDICATOR_WEIGHTS[k] for k in names])
+    configs = []
+    for _ in range(n):
+        if signal == 'score':
+            configs.append({
+                'signal': signal,
+                'tech_period': int(rng.choice(list(tech_periods))),
+                'blend': round(rng.uniform(*blend), 4),
+            })
+            continue
+        w = base * np.exp(rng.normal(0, sigma, len(base)))
+        w *= base.sum() / w.sum()
+        s = rng.uniform(*strong)
+        configs.append({
+            'signal': signal,
+            'period': int(rng.choice(list(periods))),
+            'cuts': (round(s, 4), round(rng.uniform(weak[0], min(weak[1], s - 0.01)), 4)),
+            'weights': dict(zip(names, np.round(w, 4).tolist())),
+        })
+    return configs
+
+
+def _share(panel):
+    # 面板数组放入共享内存，返回 (句柄列表, 工作进程重建数组用的描述)
+    handles, spec = [], {}
+    for col, values in panel.items():
+        shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[...] = values
+        handles.append(shm)
+        spec[col] = (shm.name, values.shape, values.dtype.str)
+    return handles, spec
+
+
+def _init_worker(spec, dates, options):
+    handles, panel = [], {}
+    for col, (name, shape, dtype) in spec.items():
+        shm = shared_memory.SharedMemory(name=name)
+        handles.append(shm)
+        panel[col] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    _worker.update(handles=handles, panel=panel, dates=dates, series={}, **options)
+
+
+def _series(period):
+    # 指标序列只与周期有关，同一进程内按周期复用
+    cache = _worker['series']
+    if period not in cache:
+        cache[period] = backtest.indicator_series(_worker['panel'], period)
+    return cache[period]
+
+
+def _period(config):
+    return config['period'] if config['signal'] == 'grade' else config['tech_period']
+
+
+def _evaluate(config):
+    series = _series(_period(config))
+    if config['signal'] == 'grade':
+        signals = backtest.signals_from_series(series, series, config['weights'], config['cuts'])
+    else:
+        signals = backtest.signals_from_series(series, series)
+    target = backtest.target_weights(signals, config['signal'], _worker['top_k'], _worker['fundamental'],
+                                     config.get('blend', 0.0))
+    report = backtest.evaluate(_worker['dates'], _worker['panel']['收盘'], target, _worker['cost'],
+                               first_day=_worker['first_day'])
+    report.pop('equity', None)
+    row = {k: v for k, v in config.items() if k != 'weights'}
+    if 'cuts' in config:
+        row['cuts'] = '%g/%g' % tuple(config['cuts'])
+    row.update({f'w_{k}': v for k, v in config.get('weights', {}).items()})
+    row.update({k: float(v) for k, v in report.items()})
+    return row
+
+
+def run_sweep(symbol_list, start, end, configs, processes=None, rank_by='sharpe', out=DEFAULT_OUT,
+              warmup_days=120, top_k=10, fundamental=None, cost=0.0015, fetch=True):
+    """
+    多进程参数扫描
+
+    参数:
+    symbol_list (list): 股票代码
+    start, end: 评估区间（之前 warmup_days 天用于指标预热）
+    configs (list): grid() 或 random_configs() 生成的参数组合
+    processes (int, optional): 进程数，默认为CPU核数
+    rank_by (str): 排序指标（evaluate 返回的键）
+    out (str, optional): 结果CSV路径，为None时不写文件
+    fundamental (array-like, optional): 每只股票的基本面得分，扫描 'score' 信号时必须给出
+    其余参数见 backtest.run
+
+    返回:
+    pd.DataFrame: 每个参数组合一行，按 rank_by 降序
+    """
+    if fundamental is None and any(config['signal'] == 'score' for config in configs):
+        raise ValueError("'score' configs sweep blend and need fundamental scores")
+    load_start = pd.Timestamp(str(start)) - pd.Timedelta(days=warmup_days)
+    dates, panel = backtest.load_panel(symbol_list, load_start, end, fetch=fetch)
+    options = {
+        'top_k': top_k,
+        'fundamental': None if fundamental is None else np.asarray(fundamental, dtype=float),
+        'cost': cost,
+        'first_day': start,
+    }
+    # 同周期的组合排在一起，使每个进程尽量少重算指标序列
+    configs = sorted(configs, key=_period)
+    processes = processes or os.cpu_count() or 1
+    chunksize = max(1, len(configs) // (processes * 4))
+
+    handles, spec = _share(panel)
+    try:
+        with mp.Pool(processes, initializer=_init_worker, initargs=(spec, dates, options)) as pool:
+            rows = list(pool.imap_unordered(_evaluate, configs, chunksize=chunksize))
+    finally:
+        for shm in handles:
+            shm.close()
+            shm.unlink()
+
+    results = pd.DataFrame(rows).sort_values(rank_by, ascending=False, na_position='last').reset_index(drop=True)
+    results.index.name = 'rank'
+    if out:
+        os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+        results.to_csv(out, encoding='utf-8-sig')
+    return results
+
+
+if __name__ == '__main__':
+    symbol_list = ['603163', '300750', '002997', '300724', '300870', '002466', '002460', '002008', '301162', '002353']
+    configs = grid() + random_configs(200) + random_configs(100, seed=1, signal='score')
+    # 基本面得分按当前财报计算（与 main.py 的 fundamental 阶段相同）
+    fundamental = finance_qualification_assessment.quantization_batch(symbol_list).to_numpy(dtype=float)
+    results = run_sweep(symbol_list, '20210101', pd.Timestamp.now().strftime('%Y%m%d'), configs,
+                        fundamental=fundamental)
+    print(results.head(20).to_string())
@@ -1,3 +1,2 @@
-from pypushdeer import PushDeer
-pushdeer = PushDeer(pushkey="PDU36046TfIe7SgbaLY1OWrvHnyBF6mMcudbGcVaW")
-pushdeer.send_text("hello world", desp="optional description")
\ No newline at end of file
+from utils import notify
+notify.send('ding', "optional description", text="hello world")
\ No newline at end of file
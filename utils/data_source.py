@@ -0,0 +1,225 @@
+# akshare access layer: live (default), record (live + save every response) or replay (serve saved responses offline)
+# the store, snapshot provider and statement cache fetch through here, so a recorded run can be replayed without network
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from utils import metrics
+from utils import lazy
+
+pd = lazy.module('pandas')
+
+MODES = ('live', 'record', 'replay')
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'archive')
+
+# 回放时按日期区间裁剪的接口：接口名 -> (日期列, 起始参数, 结束参数)
+RANGE_ARGS = {
+    'stock_zh_a_hist': ('日期', 'start_date', 'end_date'),
+    'stock_zh_a_hist_min_em': ('时间', 'start_date', 'end_date'),
+}
+
+
+class ReplayMiss(LookupError):
+    """回放模式下没有对应的录制结果"""
+
+
+def _key(name, kwargs):
+    raw = json.dumps([name, sorted((k, str(v)) for k, v in kwargs.items())], ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+class DataSource:
+    """
+    akshare 数据源
+
+    参数:
+    mode (str): 'live' 直接调用akshare；'record' 调用akshare并把结果存入 root；
+        'replay' 只从 root 读取，不联网
+    root (str): 录制目录，index.jsonl 记录每次调用，{接口名}/{key}.{序号}.pkl 为结果
+    latency (float | str | dict): 回放时模拟的延迟（秒）；'recorded' 使用录制时的实际耗时；
+        dict 为 接口名 -> 秒
+    """
+
+    def __init__(self, mode='live', root=DEFAULT_ROOT, latency=0.0):
+        if mode not in MODES:
+            raise ValueError(f'mode must be one of {MODES}: {mode}')
+        self.mode = mode
+        self.root = root
+        self.latency = latency
+        self.calls = {}
+        self.stale = 0  # 回放时用结束较早的录制代替的次数
+        self._ak = None
+        self._entries = {}  # key -> 按序号排列的录制记录
+        self._served = {}  # key -> 已回放次数
+        self._lock = threading.Lock()
+        if mode == 'replay':
+            self._load_index()
+        elif mode == 'record':
+            os.makedirs(root, exist_ok=True)
+
+    def _index_path(self):
+        return os.path.join(self.root, 'index.jsonl')
+
+    def _load_index(self):
+        path = self._index_path()
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                self._entries.setdefault(entry['key'], []).append(entry)
+        for entries in self._entries.values():
+            entries.sort(key=lambda e: e['seq'])
+
+    def _akshare(self):
+        if self._ak is None:
+            import akshare
+            self._ak = akshare
+        return self._ak
+
+    def call(self, name, **kwargs):
+        """
+        调用 akshare.<name>(**kwargs)
+
+        返回:
+        pd.DataFrame: 与 akshare 接口返回一致
+        """
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        start = time.perf_counter()
+        try:
+            if self.mode == 'replay':
+                result = self._replay(name, kwargs)
+            else:
+                result = getattr(self._akshare(), name)(**kwargs)
+        except Exception:
+            metrics.call('akshare', name, seconds=time.perf_counter() - start, error=True)
+            raise
+        elapsed = time.perf_counter() - start
+        metrics.call('akshare', name, metrics.nbytes(result), elapsed)
+        if self.mode == 'record':
+            self._record(name, kwargs, result, elapsed)
+        return result
+
+    def _record(self, name, kwargs, result, elapsed):
+        key = _key(name, kwargs)
+        with self._lock:
+            entries = self._entries.setdefault(key, [])
+            seq = len(entries)
+            entry = {
+                'key': key,
+                'seq': seq,
+                'name': name,
+                'kwargs': {k: str(v) for k, v in kwargs.items()},
+                'file': os.path.join(name, f'{key}.{seq}.pkl'),
+                'elapsed': elapsed,
+                'time': time.time(),
+            }
+            entries.append(entry)
+            path = os.path.join(self.root, entry['file'])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            with open(self._index_path(), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def _replay(self, name, kwargs):
+        key = _key(name, kwargs)
+        with self._lock:
+            entries = self._entries.get(key)
+            if entries:
+                # 同一调用录制了多次（如多次快照）时按录制顺序依次返回，最后一次之后重复返回最后一次
+                served = self._served.get(key, 0)
+                self._served[key] = served + 1
+                entry = entries[min(served, len(entries) - 1)]
+            else:
+                entry = self._covering(name, kwargs)
+        if entry is None:
+            raise ReplayMiss(f'no recording for {name}({kwargs}) in {self.root}')
+        self._sleep(name, entry)
+        with open(os.path.join(self.root, entry['file']), 'rb') as f:
+            result = pickle.load(f)
+        if entry['key'] != key:
+            column, start_arg, end_arg = RANGE_ARGS[name]
+            days = pd.to_datetime(result[column])
+            keep = (days >= pd.Timestamp(str(kwargs[start_arg]))) & (days <= pd.Timestamp(str(kwargs[end_arg])))
+            result = result[keep.to_numpy()].reset_index(drop=True)
+        return result
+
+    def _covering(self, name, kwargs):
+        # 日期区间不同的调用：取其余参数相同、区间覆盖请求的最后一次录制；
+        # 没有覆盖的录制时（请求区间随运行日期和时刻变化，如隔天或收盘后回放），取与请求重叠、结束最晚的录制，
+        # 即录制时能拿到的最新数据
+        if name not in RANGE_ARGS:
+            return None
+        _, start_arg, end_arg = RANGE_ARGS[name]
+        others = {k: str(v) for k, v in kwargs.items() if k not in (start_arg, end_arg)}
+        start, end = str(kwargs.get(start_arg)), str(kwargs.get(end_arg))
+        found, latest = None, None
+        for entries in self._entries.values():
+            for entry in entries:
+                args = entry['kwargs']
+                if entry['name'] != name or {k: v for k, v in args.items() if k not in (start_arg, end_arg)} != others:
+                    continue
+                first, last = args.get(start_arg, ''), args.get(end_arg, '')
+                if first <= start and last >= end:
+                    found = entry
+                elif first <= end and last >= start and (latest is None or last >= latest['kwargs'].get(end_arg, '')):
+                    latest = entry
+        if found is None and latest is not None:
+            self.stale += 1  # 调用方已持有 self._lock
+            return latest
+        return found
+
+    def _sleep(self, name, entry):
+        if self.latency == 'recorded':
+            delay = entry['elapsed']
+        elif isinstance(self.latency, dict):
+            delay = self.latency.get(name, 0.0)
+        else:
+            delay = self.latency
+        if delay:
+            time.sleep(delay)
+
+    def stats(self):
+        return {'mode': self.mode, 'calls': dict(self.calls), 'stale': self.stale}
+
+
+_source = DataSource()
+
+
+def get_source():
+    return _source
+
+
+def set_source(source):
+    global _source
+    _source = source
+
+
+def configure(mode='live', root=DEFAULT_ROOT, latency=0.0):
+    set_source(DataSource(mode, root, latency))
+    return _source
+
+
+# akshare 接口（调用时才解析当前数据源，configure 之后创建的对象同样生效）
+def stock_zh_a_hist(**kwargs):
+    return _source.call('stock_zh_a_hist', **kwargs)
+
+
+def stock_zh_a_hist_min_em(**kwargs):
+    return _source.call('stock_zh_a_hist_min_em', **kwargs)
+
+
+def stock_zh_a_spot():
+    return _source.call('stock_zh_a_spot')
+
+
+def stock_financial_report_sina(**kwargs):
+    return _source.call('stock_financial_report_sina', **kwargs)
+
+
+def stock_individual_info_em(**kwargs):
+    return _source.call('stock_individual_info_em', **kwargs)
@@ -0,0 +1,186 @@
+# on-disk cache of company statements: only the columns get_company_fin_info reads, revalidated by the latest report date
+# (outside report season an entry that already has the expected period is never re-downloaded)
+import json
+import os
+import threading
+import time
+from datetime import date
+from utils import data_source
+from utils import host_limit
+from utils import metrics
+from utils import lazy
+
+pd = lazy.module('pandas')
+
+# 报表类型 -> get_company_fin_info 使用的列
+STATEMENT_COLUMNS = {
+    '资产负债表': ['资产总计', '负债合计', '所有者权益(或股东权益)合计', '流动资产合计', '流动负债合计', '货币资金'],
+    '利润表': ['净利润', '营业收入', '财务费用'],
+    '现金流量表': ['经营活动产生的现金流量净额'],
+}
+STOCK_INFO = '个股信息'
+
+# 定期报告披露窗口（年报/一季报、半年报、三季报），窗口内缩短有效期
+REPORT_SEASONS = [((1, 15), (4, 30)), ((7, 1), (8, 31)), ((10, 1), (10, 31))]
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'fin')
+DAY = 24 * 3600
+
+
+def _json_default(value):
+    # numpy 标量
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def in_report_season(day=None):
+    day = day or date.today()
+    key = (day.month, day.day)
+    return any(start <= key <= end for start, end in REPORT_SEASONS)
+
+
+def expected_report(day=None):
+    """
+    披露截止日已过的最新报告期（一季报/年报 4月30日、半年报 8月31日、三季报 10月31日）
+
+    返回:
+    str: 'YYYYMMDD'，与报表的'报告日'格式一致
+    """
+    day = day or date.today()
+    key = (day.month, day.day)
+    if key > (10, 31):
+        return f'{day.year}0930'
+    if key > (8, 31):
+        return f'{day.year}0630'
+    if key > (4, 30):
+        return f'{day.year}0331'
+    return f'{day.year - 1}0930'
+
+
+class FinCache:
+    """
+    公司财务报表缓存，按 (股票代码, 报表类型) 存储，记录最新报告日
+
+    非披露期内已包含 expected_report() 报告期的报表不再下载；其余情况超过有效期后重新下载，
+    最新报告日未变时保留原数据，只更新校验时间
+
+    参数:
+    root (str): 缓存目录
+    ttl_days (float): 非披露期的有效期（天）
+    season_ttl_days (float): 披露期内的有效期（天）
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, ttl_days=30, season_ttl_days=1):
+        self.root = root
+        self.ttl_days = ttl_days
+        self.season_ttl_days = season_ttl_days
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0  # 重新下载后最新报告日未变的次数
+        self._lock = threading.Lock()
+
+    def _path(self, stock_code, kind):
+        return os.path.join(self.root, stock_code, f'{kind}.json')
+
+    def _fresh(self, entry):
+        today = date.today()
+        season = in_report_season(today)
+        report_date = entry.get('report_date')
+        if not season and report_date and report_date >= expected_report(today):
+            return True
+        age = time.time() - entry.get('checked', entry['fetched'])
+        ttl = self.season_ttl_days if season else self.ttl_days
+        return age < ttl * DAY
+
+    def _read(self, stock_code, kind):
+        path = self._path(stock_code, kind)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write(self, stock_code, kind, entry):
+        path = self._path(stock_code, kind)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False, default=_json_default)
+        os.replace(path + '.tmp', path)
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_statement(self, stock_code, kind, refresh=False):
+        """
+        读取报表（只含'报告日'和 STATEMENT_COLUMNS[kind] 中的列），过期时重新下载
+
+        返回:
+        pd.DataFrame: 按报告日降序，与 ak.stock_financial_report_sina 的行顺序一致
+        """
+        cached = self._read(stock_code, kind)
+        entry = None if refresh else cached
+        if entry is not None and self._fresh(entry):
+            self._count(True)
+        else:
+            self._count(False)
+            with host_limit.slot('sina'):
+                raw = data_source.stock_financial_report_sina(stock=stock_code, symbol=kind)
+            columns = ['报告日'] + [col for col in STATEMENT_COLUMNS[kind] if col in raw]
+            compact = raw[columns].astype(object).where(raw[columns].notna(), None)
+            compact['报告日'] = compact['报告日'].astype(str)
+            report_date = compact['报告日'].max() if len(compact) else None
+            if cached is not None and not refresh and report_date == cached.get('report_date') \
+                    and cached['columns'] == columns:
+                # 没有新报告：保留原数据，只记录校验时间
+                entry = cached
+                with self._lock:
+                    self.revalidated += 1
+            else:
+                entry = {
+                    'report_date': report_date,
+                    'fetched': time.time(),
+                    'columns': columns,
+                    'rows': compact.values.tolist(),
+                }
+            entry['checked'] = time.time()
+            self._write(stock_code, kind, entry)
+        return pd.DataFrame(entry['rows'], columns=entry['columns'])
+
+    def get_stock_info(self, stock_code, refresh=False):
+        # ak.stock_individual_info_em 结果（item/value 两列）
+        entry = None if refresh else self._read(stock_code, STOCK_INFO)
+        if entry is not None and self._fresh(entry):
+            self._count(True)
+        else:
+            self._count(False)
+            with host_limit.slot('em'):
+                raw = data_source.stock_individual_info_em(symbol=stock_code)
+            entry = {
+                'fetched': time.time(),
+                'columns': list(raw.columns),
+                'rows': raw.astype(object).where(raw.notna(), None).values.tolist(),
+            }
+            self._write(stock_code, STOCK_INFO, entry)
+        return pd.DataFrame(entry['rows'], columns=entry['columns'])
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'revalidated': self.revalidated}
+
+
+_cache = FinCache()
+
+
+def get_cache():
+    return _cache
+
+
+def set_cache(cache):
+    global _cache
+    _cache = cache
+
+
+metrics.register_cache('fin', lambda: _cache.stats())
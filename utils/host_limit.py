@@ -0,0 +1,30 @@
+# per-host concurrency limits shared by every akshare fetch path (sina / eastmoney)
+import threading
+from contextlib import contextmanager
+
+LIMITS = {
+    'sina': 4,  # stock_zh_a_spot, stock_financial_report_sina
+    'em': 4,  # stock_zh_a_hist, stock_zh_a_hist_min_em, stock_individual_info_em
+}
+_slots = {}
+_lock = threading.Lock()
+
+
+def set_limit(host, limit):
+    with _lock:
+        LIMITS[host] = limit
+        _slots.pop(host, None)
+
+
+def _slot(host):
+    with _lock:
+        if host not in _slots:
+            _slots[host] = threading.BoundedSemaphore(LIMITS.get(host, 4))
+        return _slots[host]
+
+
+@contextmanager
+def slot(host):
+    sem = _slot(host)
+    with sem:
+        yield
@@ -0,0 +1,253 @@
+# numpy technical indicators over 2-D (symbols x days) arrays, computed along the time axis
+# seeding and recursions follow TA-Lib (default compatibility, no unstable period) so values match ta.*
+# inputs must not contain NaN; rows listed later than others are handled by the caller (see finance_info.fin_ind_panel)
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _is_zero(x):
+    # TA_IS_ZERO
+    return (x > -0.00000001) & (x < 0.00000001)
+
+
+def _empty(x):
+    return np.full(np.shape(x), np.nan)
+
+
+def _div(num, den, fill=0.0):
+    out = np.full(np.broadcast(num, den).shape, fill, dtype=float)
+    np.divide(num, den, out=out, where=den != 0)
+    return out
+
+
+def by_start(func, ref, *arrays):
+    """
+    按 ref 每行首个有效值的位置分组，组内对去掉左侧NaN的子面板调用 func(*arrays)，结果放回原位置
+
+    参数:
+    func (callable): 返回 {名称: (行数, 交易日) 数组}
+    ref (np.ndarray): 用于判断上市起点的面板（通常为收盘价）
+
+    返回:
+    dict: 名称 -> 与 ref 同形状的数组，未上市部分为NaN
+    """
+    valid = ~np.isnan(ref)
+    starts = np.where(valid.any(axis=1), valid.argmax(axis=1), ref.shape[1])
+    out = {}
+    for start in np.unique(starts):
+        if start >= ref.shape[1]:
+            continue
+        rows = np.flatnonzero(starts == start)
+        part = func(*(a[rows, start:] for a in arrays))
+        for name, values in part.items():
+            if name not in out:
+                out[name] = np.full(ref.shape, np.nan)
+            out[name][rows, start:] = values
+    return out
+
+
+def sma(x, n):
+    out = _empty(x)
+    if x.shape[1] >= n:
+        out[:, n - 1:] = sliding_window_view(x, n, axis=1).mean(axis=-1)
+    return out
+
+
+def rolling_max(x, n):
+    out = _empty(x)
+    if x.shape[1] >= n:
+        out[:, n - 1:] = sliding_window_view(x, n, axis=1).max(axis=-1)
+    return out
+
+
+def rolling_min(x, n):
+    out = _empty(x)
+    if x.shape[1] >= n:
+        out[:, n - 1:] = sliding_window_view(x, n, axis=1).min(axis=-1)
+    return out
+
+
+def ema(x, n, first=None):
+    """EMA，k=2/(n+1)，以 x[first-n+1:first+1] 的均值作为 first 处的初值（默认 first=n-1）"""
+    out = _empty(x)
+    first = n - 1 if first is None else first
+    if x.shape[1] <= first:
+        return out
+    k = 2.0 / (n + 1)
+    prev = x[:, first - n + 1:first + 1].mean(axis=1)
+    out[:, first] = prev
+    for t in range(first + 1, x.shape[1]):
+        prev = (x[:, t] - prev) * k + prev
+        out[:, t] = prev
+    return out
+
+
+def mom(x, n):
+    out = _empty(x)
+    if x.shape[1] > n:
+        out[:, n:] = x[:, n:] - x[:, :-n]
+    return out
+
+
+def rsi(close, n):
+    out = _empty(close)
+    if close.shape[1] <= n:
+        return out
+    d = np.diff(close, axis=1)
+    gain = np.where(d > 0, d, 0.0)
+    loss = np.where(d < 0, -d, 0.0)
+    g = gain[:, :n].sum(axis=1) / n
+    l = loss[:, :n].sum(axis=1) / n
+    s = g + l
+    out[:, n] = np.where(_is_zero(s), 0.0, 100.0 * _div(g, s))
+    for t in range(n + 1, close.shape[1]):
+        g = (g * (n - 1) + gain[:, t - 1]) / n
+        l = (l * (n - 1) + loss[:, t - 1]) / n
+        s = g + l
+        out[:, t] = np.where(_is_zero(s), 0.0, 100.0 * _div(g, s))
+    return out
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """与 ta.MACD 一致：快慢线都在 slow-1 处以各自周期的均值起算，信号线在 slow+signal-2 处起算"""
+    line_out, signal_out = _empty(close), _empty(close)
+    first = slow - 1
+    lookback = slow - 1 + signal - 1
+    if close.shape[1] <= lookback:
+        return line_out, signal_out, _empty(close)
+    line = ema(close, fast, first) - ema(close, slow, first)
+    signal_line = _empty(close)
+    signal_line[:, first:] = ema(line[:, first:], signal)
+    line_out[:, lookback:] = line[:, lookback:]
+    signal_out[:, lookback:] = signal_line[:, lookback:]
+    return line_out, signal_out, line_out - signal_out
+
+
+def true_range(high, low, close):
+    # 第0列无前收盘，为NaN
+    tr = _empty(close)
+    prev_close = close[:, :-1]
+    tr[:, 1:] = np.maximum.reduce([high[:, 1:] - low[:, 1:],
+                                   np.abs(high[:, 1:] - prev_close),
+                                   np.abs(low[:, 1:] - prev_close)])
+    return tr
+
+
+def atr(high, low, close, n):
+    out = _empty(close)
+    if close.shape[1] <= n:
+        return out
+    tr = true_range(high, low, close)
+    prev = tr[:, 1:n + 1].mean(axis=1)
+    out[:, n] = prev
+    for t in range(n + 1, close.shape[1]):
+        prev = (prev * (n - 1) + tr[:, t]) / n
+        out[:, t] = prev
+    return out
+
+
+def directional_movement(high, low):
+    # 第 j 列对应 t=j+1 的 +DM/-DM
+    up = high[:, 1:] - high[:, :-1]
+    down = low[:, :-1] - low[:, 1:]
+    plus_dm = np.where((up > 0) & (up > down), up, 0.0)
+    minus_dm = np.where((down > 0) & (up < down), down, 0.0)
+    return plus_dm, minus_dm
+
+
+def _dx(plus_dm, minus_dm, tr):
+    valid = ~_is_zero(tr)
+    plus_di = 100.0 * _div(plus_dm, tr)
+    minus_di = 100.0 * _div(minus_dm, tr)
+    s = plus_di + minus_di
+    valid &= ~_is_zero(s)
+    return 100.0 * _div(np.abs(minus_di - plus_di), s), valid
+
+
+def adx(high, low, close, n):
+    out = _empty(close)
+    T = close.shape[1]
+    if T <= 2 * n - 1:
+        return out
+    plus_dm, minus_dm = directional_movement(high, low)
+    tr = true_range(high, low, close)[:, 1:]
+    p = plus_dm[:, :n - 1].sum(axis=1)
+    m = minus_dm[:, :n - 1].sum(axis=1)
+    r = tr[:, :n - 1].sum(axis=1)
+    sum_dx = np.zeros(close.shape[0])
+    for j in range(n - 1, 2 * n - 1):
+        p = p - p / n + plus_dm[:, j]
+        m = m - m / n + minus_dm[:, j]
+        r = r - r / n + tr[:, j]
+        dx, valid = _dx(p, m, r)
+        sum_dx += np.where(valid, dx, 0.0)
+    value = sum_dx / n
+    out[:, 2 * n - 1] = value
+    for t in range(2 * n, T):
+        j = t - 1
+        p = p - p / n + plus_dm[:, j]
+        m = m - m / n + minus_dm[:, j]
+        r = r - r / n + tr[:, j]
+        dx, valid = _dx(p, m, r)
+        value = np.where(valid, (value * (n - 1) + dx) / n, value)
+        out[:, t] = value
+    return out
+
+
+def bbands(close, n, nbdevup=2, nbdevdn=2):
+    middle = sma(close, n)
+    mean2 = sma(close * close, n) - middle * middle
+    std = np.where(mean2 < 0.00000001, 0.0, np.sqrt(np.abs(mean2)))
+    return middle + std * nbdevup, middle, middle - std * nbdevdn
+
+
+def willr(high, low, close, n):
+    hh = rolling_max(high, n)
+    ll = rolling_min(low, n)
+    diff = (hh - ll) / -100.0
+    out = np.where(diff != 0, _div(hh - close, diff), 0.0)
+    out[np.isnan(hh)] = np.nan
+    return out
+
+
+def cci(high, low, close, n):
+    out = _empty(close)
+    T = close.shape[1]
+    if T < n:
+        return out
+    tp = (high + low + close) / 3
+    L = T - n + 1
+    avg = sliding_window_view(tp, n, axis=1).mean(axis=-1)
+    dev = np.zeros_like(avg)
+    for k in range(n):
+        dev += np.abs(tp[:, k:k + L] - avg)
+    diff = tp[:, n - 1:] - avg
+    ok = (diff != 0) & (dev != 0)
+    out[:, n - 1:] = np.where(ok, _div(diff, 0.015 * (dev / n)), 0.0)
+    return out
+
+
+def obv(close, volume):
+    step = np.where(close[:, 1:] > close[:, :-1], volume[:, 1:],
+                    np.where(close[:, 1:] < close[:, :-1], -volume[:, 1:], 0.0))
+    return np.concatenate([volume[:, :1], step], axis=1).cumsum(axis=1)
+
+
+def money_flow(high, low, close, volume):
+    # 第 j 列对应 t=j+1 的正/负资金流
+    tp = (high + low + close) / 3
+    change = tp[:, 1:] - tp[:, :-1]
+    flow = tp[:, 1:] * volume[:, 1:]
+    return np.where(change > 0, flow, 0.0), np.where(change < 0, flow, 0.0)
+
+
+def mfi(high, low, close, volume, n):
+    out = _empty(close)
+    if close.shape[1] <= n:
+        return out
+    pos, neg = money_flow(high, low, close, volume)
+    pos_sum = sliding_window_view(pos, n, axis=1).sum(axis=-1)
+    neg_sum = sliding_window_view(neg, n, axis=1).sum(axis=-1)
+    total = pos_sum + neg_sum
+    out[:, n:] = np.where(total < 1.0, 0.0, 100.0 * _div(pos_sum, total))
+    return out
@@ -0,0 +1,45 @@
+# deferred imports for heavy dependencies (akshare, talib, selenium, pypushdeer, pandas): the real module is imported on
+# first attribute access, so test, replay and scoring-only runs never pay for the code paths they do not use
+import importlib
+import sys
+
+
+class LazyModule:
+    """
+    模块占位：第一次访问属性时导入
+
+    参数:
+    name (str): 模块名，如 'talib'、'selenium.webdriver.common.by'
+    """
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            module = self.__dict__['_module'] = importlib.import_module(self.__dict__['_name'])
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def module(name):
+    # 已导入的模块直接返回
+    return sys.modules.get(name) or LazyModule(name)
+
+
+def loaded(name):
+    return name in sys.modules
@@ -1,14 +1,350 @@
-from selenium import webdriver
-from selenium.webdriver.edge.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from concurrent.futures import Future
+import atexit
+import hashlib
+import json
 import os
+import queue
 import subprocess
+import threading
+import time
+from datetime import date
+from utils import metrics
+from utils import lazy
 
+# selenium 在第一次连接浏览器时才导入（缓存命中和测试运行不加载）
+webdriver = lazy.module('selenium.webdriver')
+edge_options = lazy.module('selenium.webdriver.edge.options')
+by = lazy.module('selenium.webdriver.common.by')
+keys = lazy.module('selenium.webdriver.common.keys')
+ui = lazy.module('selenium.webdriver.support.ui')
+EC = lazy.module('selenium.webdriver.support.expected_conditions')
+exceptions = lazy.module('selenium.common.exceptions')
+
+CHAT_URL = "https://www.doubao.com/chat/"
+DEBUGGER_ADDRESS = "localhost:9222"  # edge_start.bat
+INPUT_XPATH = '//textarea[contains(@placeholder, "发消息")]'
+PROMPT_PREFIX = "以ANS作为回答的开头，以空格分离回答信息,"
+# 回答段落（以ANS开头）
+ANSWER_XPATH = ('//div[contains(@class, "auto-hide-last-sibling-br paragraph-JOTKXA paragraph-element br-paragraph-space")'
+                ' and contains(text(), "ANS")]')
+# 生成中的停止按钮 / 生成结束后出现的重新生成按钮
+STOP_XPATH = '//*[contains(@data-testid, "stop") or contains(@aria-label, "停止") or contains(text(), "停止生成")]'
+REGENERATE_XPATH = ('//*[contains(@data-testid, "regenerate") or contains(@aria-label, "重新生成")'
+                    ' or contains(text(), "重新生成")]')
+
+DEADLINE = 180  # 单次回答最长等待（秒）
+POLL = 1.0  # 轮询间隔（秒）
+STABLE = 3.0  # 回答文本保持不变的时长（秒），与停止/重新生成按钮一起判断回答结束
+TABS = 3  # 会话池同时使用的标签页数
+
+CACHE_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'llm')
+
+
+def _cache_path(prompt, day=None):
+    day = (day or date.today()).strftime('%Y%m%d')
+    key = hashlib.sha1(prompt.encode('utf-8')).hexdigest()
+    return os.path.join(CACHE_ROOT, day, f'{key}.json')
+
+
+def cached_answer(prompt, day=None):
+    # 当天已回答过的相同prompt，无缓存时返回None
+    path = _cache_path(prompt, day)
+    metrics.cache('llm', os.path.exists(path))
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['answer']
+
+
+def _save_answer(prompt, answer):
+    path = _cache_path(prompt)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'prompt': prompt, 'answer': answer, 'time': time.time()}, f, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+def _answer_text(driver):
+    # 页面上最后一个ANS段落的文本（生成中会被替换，元素失效时按未出现处理）
+    try:
+        elements = driver.find_elements(by.By.XPATH, ANSWER_XPATH)
+        return elements[-1].text if elements else None
+    except exceptions.StaleElementReferenceException:
+        return None
+
+
+def _finished(driver):
+    if driver.find_elements(by.By.XPATH, REGENERATE_XPATH):
+        return True
+    return not driver.find_elements(by.By.XPATH, STOP_XPATH)
+
+
+def _send(driver, prompt, timeout=10):
+    # 等待输入框出现后发送
+    input_box = ui.WebDriverWait(driver, timeout).until(EC.visibility_of_element_located((by.By.XPATH, INPUT_XPATH)))
+    input_box.send_keys(PROMPT_PREFIX + prompt)
+    input_box.send_keys(keys.Keys.ENTER)
+
+
+class _Progress:
+    # 单个回答的生成进度：ANS段落文本在 stable 秒内不再变化，且停止按钮消失或重新生成按钮出现即为完成
+
+    def __init__(self, deadline=DEADLINE, stable=STABLE):
+        self.started = time.monotonic()
+        self.end = self.started + deadline
+        self.deadline = deadline
+        self.stable = stable
+        self.last = None
+        self.since = None
+
+    def check(self, driver):
+        """
+        返回:
+        str | None: 完成时为回答文本，未完成为None；超过 deadline 时返回已生成的部分，尚无回答则抛出 TimeoutException
+        """
+        text = _answer_text(driver)
+        now = time.monotonic()
+        if text != self.last:
+            self.last, self.since = text, now
+        elif text and now - self.since >= self.stable and _finished(driver):
+            return text
+        if now >= self.end:
+            if self.last:
+                return self.last
+            raise exceptions.TimeoutException(f'no answer within {self.deadline}s')
+        return None
+
+
+def wait_answer(driver, deadline=DEADLINE, poll=POLL, stable=STABLE):
+    # 在当前标签页轮询直到回答生成结束
+    progress = _Progress(deadline, stable)
+    while True:
+        answer = progress.check(driver)
+        if answer is not None:
+            return answer
+        time.sleep(poll)
+
+
+def edge_driver(debugger_address=DEBUGGER_ADDRESS):
+    # 连接 edge_start.bat 启动的浏览器（远程调试端口，沿用已登录的账号）
+    options = edge_options.Options()
+    options.add_experimental_option("debuggerAddress", debugger_address)
+    return webdriver.Edge(options=options)
+
+
+class _Job:
+    def __init__(self, prompt, deadline):
+        self.prompt = prompt
+        self.deadline = deadline
+        self.future = Future()
+        self.attempts = 0
+
+
+class _Tab:
+    def __init__(self, handle):
+        self.handle = handle
+        self.job = None
+        self.progress = None
+
+
+class SessionPool:
+    """
+    常驻的浏览器会话：连接一次浏览器并保持多个已打开的对话标签页，prompt 排队后分配到空闲标签页，
+    各标签页的回答同时生成，由一个后台线程轮流检查；浏览器断开时自动重连并重发未完成的 prompt
+
+    参数:
+    url (str): 对话页面（测试时可指向 utils.llm_stub 的本地页面）
+    tabs (int): 同时使用的标签页数
+    driver_factory (callable): 返回已连接的 WebDriver，默认为 edge_driver
+    poll (float): 轮询间隔（秒）
+    stable (float): 见 STABLE
+    retries (int): 浏览器断开时每个 prompt 的最多重发次数
+    reconnect_delay (float): 重连前的等待（秒）
+    """
+
+    def __init__(self, url=CHAT_URL, tabs=TABS, driver_factory=None, poll=POLL, stable=STABLE, retries=2,
+                 reconnect_delay=5.0):
+        self.url = url
+        self.tabs = tabs
+        self.driver_factory = driver_factory or edge_driver
+        self.poll = poll
+        self.stable = stable
+        self.retries = retries
+        self.reconnect_delay = reconnect_delay
+        self.driver = None
+        self.reconnects = 0
+        self._failures = 0  # 连续连接失败次数
+        self._tabs = []
+        self._queue = queue.Queue()
+        self._closed = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, prompt, deadline=DEADLINE):
+        # 返回 concurrent.futures.Future，结果为回答文本
+        job = _Job(prompt, deadline)
+        self._queue.put(job)
+        self._start()
+        return job.future
+
+    def ask(self, prompt, deadline=DEADLINE):
+        return self.submit(prompt, deadline).result()
+
+    def map(self, prompts, deadline=DEADLINE):
+        # 一次提交多个 prompt，总耗时接近最慢的一个回答（标签页数足够时）
+        futures = [self.submit(prompt, deadline) for prompt in prompts]
+        return [f.result() for f in futures]
+
+    def close(self):
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._fail_queued(RuntimeError('session pool closed'))
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._closed.clear()
+                self._thread = threading.Thread(target=self._run, name='llm-session-pool', daemon=True)
+                self._thread.start()
+
+    # ------------------------------------------------------------ worker thread
+
+    def _connect(self):
+        self.driver = self.driver_factory()
+        handles = [self.driver.current_window_handle]
+        for _ in range(self.tabs - 1):
+            self.driver.switch_to.new_window('tab')
+            handles.append(self.driver.current_window_handle)
+        for handle in handles:
+            self.driver.switch_to.window(handle)
+            self.driver.get(self.url)
+        self._tabs = [_Tab(handle) for handle in handles]
+
+    def _disconnect(self):
+        if self.driver is None:
+            return
+        try:
+            # 关闭额外打开的标签页，保留浏览器和第一个标签页
+            for tab in self._tabs[1:]:
+                self.driver.switch_to.window(tab.handle)
+                self.driver.close()
+            self.driver.quit()
+        except exceptions.WebDriverException:
+            pass
+        self.driver = None
+        self._tabs = []
+
+    def _assign(self):
+        for tab in self._tabs:
+            if tab.job is not None:
+                continue
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            job.attempts += 1
+            tab.job, tab.progress = job, _Progress(job.deadline, self.stable)
+            self.driver.switch_to.window(tab.handle)
+            _send(self.driver, job.prompt)
+
+    def _check(self):
+        for tab in self._tabs:
+            if tab.job is None:
+                continue
+            self.driver.switch_to.window(tab.handle)
+            try:
+                answer = tab.progress.check(self.driver)
+            except exceptions.TimeoutException as e:
+                metrics.call('llm', 'chat', seconds=time.monotonic() - tab.progress.started, error=True)
+                tab.job.future.set_exception(e)
+                answer = None
+                tab.job = None
+            if answer is not None:
+                metrics.call('llm', 'chat', len((tab.job.prompt + answer).encode('utf-8')),
+                             time.monotonic() - tab.progress.started)
+                tab.job.future.set_result(answer)
+                tab.job = None
+            if tab.job is None:
+                # 新开对话，供下一个 prompt 使用
+                self.driver.get(self.url)
+
+    def _requeue(self, error):
+        # 浏览器断开：未完成的 prompt 重新排队，超过重发次数的返回异常
+        for tab in self._tabs:
+            job = tab.job
+            if job is None:
+                continue
+            if job.attempts > self.retries:
+                job.future.set_exception(error)
+            else:
+                self._queue.put(job)
+            tab.job = None
+
+    def _fail_queued(self, error):
+        while not self._queue.empty():
+            self._queue.get_nowait().future.set_exception(error)
+        self._failures = 0
+
+    def _busy(self):
+        return any(tab.job is not None for tab in self._tabs)
+
+    def _run(self):
+        while not self._closed.is_set():
+            if self.driver is None and self._queue.empty():
+                self._closed.wait(self.poll)
+                continue
+            try:
+                if self.driver is None:
+                    self._connect()
+                    self._failures = 0
+                self._assign()
+                if self._busy():
+                    self._check()
+                self._closed.wait(self.poll)
+            except exceptions.WebDriverException as e:
+                if not self._tabs:
+                    self._failures += 1
+                self._requeue(e)
+                self._disconnect()
+                self.reconnects += 1
+                if self._failures > self.retries:
+                    # 浏览器一直连不上：排队中的 prompt 直接返回异常
+                    self._fail_queued(e)
+                self._closed.wait(self.reconnect_delay)
+        self._requeue(RuntimeError('session pool closed'))
+        self._disconnect()
+
+    def stats(self):
+        return {'tabs': len(self._tabs), 'queued': self._queue.qsize(), 'reconnects': self.reconnects}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SessionPool()
+            atexit.register(_pool.close)
+        return _pool
+
+
+def set_pool(pool):
+    global _pool
+    with _pool_lock:
+        _pool = pool
+
+
+def llm_ans(prompt, deadline=DEADLINE, use_cache=True):
+    # use_cache: 同一天内相同prompt直接返回缓存的回答（data/llm/日期/）
+    if use_cache:
+        answer = cached_answer(prompt)
+        if answer is not None:
+            return answer
 
-def llm_ans(prompt):
     # first start
     # driver = webdriver.Edge()
     # # driver = webdriver.Chrome()
@@ -20,44 +356,36 @@ def llm_ans(prompt):
     # bat_path = os.getcwd()+"/edge_start.bat"
     # subprocess.Popen(bat_path, creationflags=subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP)
     # os.system(os.getcwd()+"/edge_start.bat")
-    edge_options = Options()
-    edge_options.add_experimental_option("debuggerAddress", "localhost:9222")
-    driver = webdriver.Edge(options=edge_options)
-
-    driver.get("https://www.doubao.com/chat/")
-
-
-    # 等待输入框出现（最多5秒）
-    input_box = WebDriverWait(driver, 5).until(
-        EC.visibility_of_element_located((By.XPATH, '//textarea[contains(@placeholder, "发消息")]'))
-    )
 
     # input_box = WebDriverWait(driver, 10).until(
     #     EC.visibility_of_element_located((By.XPATH, '//*[@type="text" and contains(@placeholder, "尽管问")]'))
     # )
 
-    input_box.send_keys("以ANS作为回答的开头，以空格分离回答信息,"+prompt)
-    input_box.send_keys(Keys.ENTER)
-
-    # 等待回答加载完成（根据实际情况调整等待时间）
-    import time
-    time.sleep(100)
-
-    # answer_element = WebDriverWait(driver, 1).until(
-    #     EC.presence_of_element_located((By.XPATH, '//div[contains(@class, "ai-reply")]'))
-    # )
-
-    # div_element = driver.find_element(By.XPATH, '//div[contains(text(), "25")]')
-    div_element = driver.find_element( By.XPATH,
-    '//div[contains(@class, "auto-hide-last-sibling-br paragraph-JOTKXA paragraph-element br-paragraph-space") and contains(text(), "ANS")]')
-
+    # 常驻会话：浏览器只连接一次，标签页保持打开（不再每次重新连接和加载页面）
+    answer = get_pool().ask(prompt, deadline)
+    print(answer)
 
-    # div_element = driver.find_element(By.XPATH, '//div[contains(text(), "Kimi")]')
+    if use_cache:
+        _save_answer(prompt, answer)
+    return answer
 
-    answer = div_element.text
-    print(answer)
 
-    # 关闭浏览器
-    driver.quit()
+def llm_ans_many(prompts, deadline=DEADLINE, use_cache=True):
+    """
+    多个 prompt 同时在不同标签页中提问
 
-    return answer
\ No newline at end of file
+    返回:
+    list: 与 prompts 顺序一致的回答，超时或失败的 prompt 为None（不影响其他 prompt 的回答）
+    """
+    answers = [cached_answer(p) if use_cache else None for p in prompts]
+    missing = [i for i, answer in enumerate(answers) if answer is None]
+    futures = {i: get_pool().submit(prompts[i], deadline) for i in missing}
+    for i, future in futures.items():
+        try:
+            answers[i] = future.result()
+        except Exception as e:
+            print(f'llm: {e!r}')
+            continue
+        if use_cache:
+            _save_answer(prompts[i], answers[i])
+    return answers
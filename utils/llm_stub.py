@@ -0,0 +1,110 @@
+# local stand-in for the chat page: same input box / answer paragraph / stop and regenerate controls as the real site
+# answers stream in over a few seconds, so utils.llm completion detection and the session pool can be tried without an account
+# usage: python -m utils.llm_stub [port]  then  llm.set_pool(llm.SessionPool(url='http://localhost:8765/?delay=5'))
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PORT = 8765
+
+PAGE = """<!DOCTYPE html>
+<html lang="zh">
+<head><meta charset="utf-8"><title>llm stub</title></head>
+<body>
+<div id="log"></div>
+<textarea placeholder="发消息..." id="box" rows="3" cols="80"></textarea>
+<script>
+const params = new URLSearchParams(location.search);
+const delay = parseFloat(params.get('delay') || '3');  // 回答生成耗时（秒）
+const box = document.getElementById('box');
+const log = document.getElementById('log');
+
+function score(text) {
+  let h = 7;
+  for (const ch of text) h = (h * 31 + ch.codePointAt(0)) % 100003;
+  return 40 + h % 61;
+}
+
+// prompt 中有6位代码时回答 "代码:分数"，否则回答三个分数
+function answerFor(prompt) {
+  const codes = [...new Set(prompt.match(/\\d{6}/g) || [])];
+  const parts = codes.length ? codes.map(c => c + ':' + score(c)) : [score(prompt), score(prompt + '1'), score(prompt + '2')];
+  return ['ANS'].concat(parts).join(' ');
+}
+
+function button(testid, text) {
+  const b = document.createElement('button');
+  b.dataset.testid = testid;
+  b.textContent = text;
+  document.body.appendChild(b);
+  return b;
+}
+
+function ask(prompt) {
+  document.querySelectorAll('[data-testid="regenerate-button"]').forEach(b => b.remove());
+  const stop = button('stop-button', '停止生成');
+  const p = document.createElement('div');
+  p.className = 'auto-hide-last-sibling-br paragraph-JOTKXA paragraph-element br-paragraph-space';
+  log.appendChild(p);
+  const words = answerFor(prompt).split(' ');
+  let i = 0;
+  const timer = setInterval(() => {
+    i += 1;
+    p.textContent = words.slice(0, i).join(' ');
+    if (i >= words.length) {
+      clearInterval(timer);
+      stop.remove();
+      button('regenerate-button', '重新生成');
+    }
+  }, delay * 1000 / words.length);
+}
+
+box.addEventListener('keydown', e => {
+  if (e.key === 'Enter') {
+    e.preventDefault();
+    ask(box.value);
+    box.value = '';
+  }
+});
+</script>
+</body>
+</html>
+"""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = PAGE.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=PORT, background=True):
+    """
+    启动本地对话页面
+
+    返回:
+    ThreadingHTTPServer: background=True 时在后台线程运行，用 shutdown() 停止
+    """
+    server = ThreadingHTTPServer(('localhost', port), _Handler)
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    else:
+        server.serve_forever()
+    return server
+
+
+def url(port=PORT, delay=3):
+    return f'http://localhost:{port}/?delay={delay}'
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else PORT
+    print('llm stub page:', url(port))
+    serve(port, background=False)
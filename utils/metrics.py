@@ -0,0 +1,266 @@
+# run instrumentation for main.py: wall/CPU time per stage and per symbol, network calls and bytes per endpoint,
+# cache hit rates and peak memory, written as a JSON run report plus a Prometheus text-format file
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'metrics')
+PROM_FILE = 'main.prom'  # node_exporter textfile collector 读取 *.prom
+PREFIX = 'qt'
+
+
+def peak_memory():
+    """
+    进程内存峰值
+
+    返回:
+    int | None: 字节数，无法获取时为None
+    """
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 为KB，macOS 为字节
+        return peak if sys.platform == 'darwin' else peak * 1024
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, 'peak_wset', info.rss)  # Windows
+
+
+def nbytes(result):
+    # 接口返回数据的大小（DataFrame 按解码后的内存计算，近似下载量）
+    if hasattr(result, 'memory_usage'):
+        return int(result.memory_usage(index=True, deep=True).sum())
+    if isinstance(result, (bytes, str)):
+        return len(result)
+    return 0
+
+
+class Metrics:
+    """
+    一次运行的计时和计数，各模块通过本模块的函数记录，线程安全
+    """
+
+    def __init__(self):
+        self.started = datetime.now()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self.stages = []  # [{'name', 'wall', 'cpu', 'peak_memory'}]，按开始顺序
+        self.symbols = {}  # 阶段 -> 代码 -> {'wall', 'cpu'}
+        self.network = {}  # (分组, 接口) -> {'calls', 'bytes', 'seconds', 'errors'}
+        self.caches = {}  # 名称 -> {'hits', 'misses'}
+        self._active = []  # 正在运行的阶段名
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        # 阶段的CPU时间为整个进程的（包括阶段内的线程池）
+        record = {'name': name, 'wall': None, 'cpu': None, 'peak_memory': None}
+        with self._lock:
+            self.stages.append(record)
+            self._active.append(name)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall'] = time.perf_counter() - wall
+            record['cpu'] = time.process_time() - cpu
+            record['peak_memory'] = peak_memory()
+            with self._lock:
+                self._active.remove(name)
+
+    @contextmanager
+    def symbol(self, symbol, stage=None):
+        # 单只股票的耗时，CPU时间为当前线程的；stage 默认为最内层正在运行的阶段
+        with self._lock:
+            stage = stage or (self._active[-1] if self._active else '')
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+            with self._lock:
+                record = self.symbols.setdefault(stage, {}).setdefault(symbol, {'wall': 0.0, 'cpu': 0.0})
+                record['wall'] += wall
+                record['cpu'] += cpu
+
+    def call(self, group, endpoint, nbytes=0, seconds=0.0, error=False):
+        with self._lock:
+            record = self.network.setdefault((group, endpoint), {'calls': 0, 'bytes': 0, 'seconds': 0.0, 'errors': 0})
+            record['calls'] += 1
+            record['bytes'] += nbytes
+            record['seconds'] += seconds
+            record['errors'] += int(error)
+
+    def cache(self, name, hit):
+        with self._lock:
+            record = self.caches.setdefault(name, {'hits': 0, 'misses': 0})
+            record['hits' if hit else 'misses'] += 1
+
+    def report(self, params=None):
+        """
+        返回:
+        dict: 运行报告；share 为占整个运行墙钟时间的比例（并发的网络请求之和可能超过1）
+        """
+        wall = time.perf_counter() - self._wall
+        with self._lock:
+            caches = {name: dict(record) for name, record in self.caches.items()}
+            for name, stats in _cache_sources.items():
+                counts = stats()
+                caches[name] = {'hits': counts['hits'], 'misses': counts['misses']}
+            for record in caches.values():
+                total = record['hits'] + record['misses']
+                record['hit_rate'] = record['hits'] / total if total else None
+            network = {}
+            for (group, endpoint), record in sorted(self.network.items()):
+                network.setdefault(group, {})[endpoint] = dict(record, share=record['seconds'] / wall if wall else None)
+            return {
+                'started': self.started.isoformat(timespec='seconds'),
+                'finished': datetime.now().isoformat(timespec='seconds'),
+                'params': params or {},
+                'wall': wall,
+                'cpu': time.process_time() - self._cpu,
+                'peak_memory': peak_memory(),
+                'stages': [dict(record, share=record['wall'] / wall if wall and record['wall'] is not None else None)
+                           for record in self.stages],
+                'symbols': {stage: {symbol: dict(record) for symbol, record in symbols.items()}
+                            for stage, symbols in self.symbols.items()},
+                'network': network,
+                'caches': caches,
+            }
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus(report):
+    """
+    运行报告转为 Prometheus 文本格式
+
+    返回:
+    str: 每个指标带 HELP/TYPE 说明
+    """
+    metrics = {}  # 名称 -> (类型, 说明, [(标签, 值)])
+
+    def add(name, kind, help, labels, value):
+        if value is None:
+            return
+        metrics.setdefault(f'{PREFIX}_{name}', (kind, help, []))[2].append((labels, value))
+
+    add('run_wall_seconds', 'gauge', 'Wall time of the last run', {}, report['wall'])
+    add('run_cpu_seconds', 'gauge', 'CPU time of the last run', {}, report['cpu'])
+    add('run_peak_memory_bytes', 'gauge', 'Peak resident memory of the last run', {}, report['peak_memory'])
+    for record in report['stages']:
+        labels = {'stage': record['name']}
+        add('stage_wall_seconds', 'gauge', 'Wall time per pipeline stage', labels, record['wall'])
+        add('stage_cpu_seconds', 'gauge', 'Process CPU time per pipeline stage', labels, record['cpu'])
+    for stage, symbols in report['symbols'].items():
+        for symbol, record in symbols.items():
+            labels = {'stage': stage, 'symbol': symbol}
+            add('symbol_wall_seconds', 'gauge', 'Wall time per symbol and stage', labels, record['wall'])
+            add('symbol_cpu_seconds', 'gauge', 'Thread CPU time per symbol and stage', labels, record['cpu'])
+    for group, endpoints in report['network'].items():
+        for endpoint, record in endpoints.items():
+            labels = {'group': group, 'endpoint': endpoint}
+            add('network_calls', 'gauge', 'Network calls per endpoint', labels, record['calls'])
+            add('network_errors', 'gauge', 'Failed network calls per endpoint', labels, record['errors'])
+            add('network_bytes', 'gauge', 'Bytes received per endpoint', labels, record['bytes'])
+            add('network_seconds', 'gauge', 'Time spent in calls per endpoint', labels, record['seconds'])
+    for name, record in report['caches'].items():
+        labels = {'cache': name}
+        add('cache_hits', 'gauge', 'Cache hits', labels, record['hits'])
+        add('cache_misses', 'gauge', 'Cache misses', labels, record['misses'])
+        add('cache_hit_ratio', 'gauge', 'Cache hit ratio', labels, record['hit_rate'])
+
+    lines = []
+    for name, (kind, help, samples) in metrics.items():
+        lines.append(f'# HELP {name} {help}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in samples:
+            text = ','.join(f'{k}="{_label(v)}"' for k, v in labels.items())
+            value = value if isinstance(value, int) else f'{value:.9g}'
+            lines.append(f'{name}{{{text}}} {value}' if text else f'{name} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def _write(path, text):
+    # 先写临时文件再替换，采集程序不会读到写了一半的文件
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(path + '.tmp', path)
+
+
+_metrics = Metrics()
+_cache_sources = {}  # 名称 -> 返回 {'hits', 'misses'} 的函数（已有计数的缓存在生成报告时读取）
+
+
+def get_metrics():
+    return _metrics
+
+
+def reset():
+    global _metrics
+    _metrics = Metrics()
+    return _metrics
+
+
+def register_cache(name, stats):
+    _cache_sources[name] = stats
+
+
+def stage(name):
+    return _metrics.stage(name)
+
+
+def symbol(symbol, stage=None):
+    return _metrics.symbol(symbol, stage)
+
+
+def call(group, endpoint, nbytes=0, seconds=0.0, error=False):
+    _metrics.call(group, endpoint, nbytes, seconds, error)
+
+
+def cache(name, hit):
+    _metrics.cache(name, hit)
+
+
+def write(root=DEFAULT_ROOT, params=None):
+    """
+    写出运行报告：run_{时间}.json 和 main.prom（每次运行覆盖）
+
+    返回:
+    dict: 运行报告
+    """
+    report = _metrics.report(params)
+    os.makedirs(root, exist_ok=True)
+    name = 'run_' + _metrics.started.strftime('%Y%m%d_%H%M%S') + '.json'
+    _write(os.path.join(root, name), json.dumps(report, ensure_ascii=False, indent=2, default=str))
+    _write(os.path.join(root, PROM_FILE), prometheus(report))
+    return report
+
+
+def summary(report, top=5):
+    # 终端输出：耗时最多的阶段和接口
+    lines = [f"run {report['wall']:.1f}s wall, {report['cpu']:.1f}s cpu, peak memory "
+             f"{(report['peak_memory'] or 0) / 2 ** 20:.0f} MB"]
+    for record in sorted((r for r in report['stages'] if r['wall'] is not None), key=lambda r: -r['wall'])[:top]:
+        lines.append(f"  stage {record['name']}: {record['wall']:.2f}s ({record['share']:.0%})")
+    endpoints = [(group, endpoint, record) for group, items in report['network'].items()
+                 for endpoint, record in items.items()]
+    for group, endpoint, record in sorted(endpoints, key=lambda e: -e[2]['seconds'])[:top]:
+        lines.append(f"  {group}.{endpoint}: {record['calls']} calls, {record['bytes'] / 2 ** 10:.0f} KB, "
+                     f"{record['seconds']:.2f}s ({record['share']:.0%})")
+    for name, record in report['caches'].items():
+        if record['hit_rate'] is not None:
+            lines.append(f"  cache {name}: {record['hit_rate']:.0%} of {record['hits'] + record['misses']}")
+    return '\n'.join(lines)
@@ -0,0 +1,430 @@
+# local 1-minute bar store and multi-timeframe panels: minute bars are saved per symbol as compact .npy records,
+# a watchlist is loaded as dense (symbols, days, 240) float32 arrays and resampled to 5/15/30/60-minute bars by reshaping
+import os
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+from utils import data_source
+from utils import host_limit
+from utils import lazy
+
+pd = lazy.module('pandas')
+
+# 存储字段 -> akshare 分时行情列名
+COLUMNS = {
+    'time': '时间',
+    'open': '开盘',
+    'close': '收盘',
+    'high': '最高',
+    'low': '最低',
+    'volume': '成交量',
+    'amount': '成交额',
+}
+# time: YYYYMMDDHHMM（K线结束时刻，与 akshare 一致）
+DTYPE = np.dtype([('time', 'i8'), ('open', 'f4'), ('close', 'f4'), ('high', 'f4'), ('low', 'f4'),
+                  ('volume', 'f8'), ('amount', 'f8')])
+FIELDS = ('open', 'high', 'low', 'close', 'volume', 'amount')
+MINUTES = 240  # 每个交易日的1分钟K线数：9:31-11:30、13:01-15:00
+TIMEFRAMES = (1, 5, 15, 30, 60)  # 240 和每个半日的 120 都能整除，K线不跨午休
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'minute')
+
+
+def slot(hhmm):
+    """
+    K线时刻 HHMM -> 当日第几根1分钟K线（0-239）
+
+    9:30 的开盘集合竞价并入第一根，非交易时间为 -1
+    """
+    hhmm = np.asarray(hhmm, dtype=np.int64)
+    minute = hhmm // 100 * 60 + hhmm % 100
+    morning = (minute >= 9 * 60 + 30) & (minute <= 11 * 60 + 30)
+    afternoon = (minute >= 13 * 60 + 1) & (minute <= 15 * 60)
+    return np.where(morning, np.maximum(minute - (9 * 60 + 31), 0),
+                    np.where(afternoon, minute - (13 * 60 + 1) + MINUTES // 2, -1))
+
+
+def slot_time(index):
+    # slot 的逆运算：第 index 根1分钟K线的结束时刻 HHMM
+    index = np.asarray(index, dtype=np.int64)
+    minute = np.where(index < MINUTES // 2, 9 * 60 + 31 + index, 13 * 60 + 1 + index - MINUTES // 2)
+    return minute // 60 * 100 + minute % 60
+
+
+def elapsed(hhmm):
+    """
+    当日截至 HHMM 已经走完的1分钟K线数（0-240），午休期间为120
+    """
+    hhmm = np.asarray(hhmm, dtype=np.int64)
+    minute = hhmm // 100 * 60 + hhmm % 100
+    return np.clip(minute - (9 * 60 + 30), 0, MINUTES // 2) + np.clip(minute - 13 * 60, 0, MINUTES // 2)
+
+
+def _stamp(moment):
+    return int(moment.strftime('%Y%m%d%H%M'))
+
+
+def _from_stamp(stamp):
+    return datetime.strptime(str(stamp), '%Y%m%d%H%M')
+
+
+def last_closed(now=None):
+    """
+    now 时最后一根已走完的1分钟K线的时刻 YYYYMMDDHHMM（未考虑节假日）
+    """
+    now = now or datetime.now()
+    done = int(elapsed(now.hour * 100 + now.minute))
+    day = now
+    if done == 0:
+        day = now - timedelta(days=1)
+        while day.weekday() >= 5:
+            day -= timedelta(days=1)
+        done = MINUTES
+    return int(day.strftime('%Y%m%d')) * 10000 + int(slot_time(done - 1))
+
+
+class MinuteStore:
+    """
+    本地1分钟K线存储
+
+    参数:
+    root (str): 存储目录，每个代码一个 {symbol}.npy
+    adjust (str): 复权方式，与 ak.stock_zh_a_hist_min_em 一致（默认不复权）
+    history_days (int): 首次下载的回看天数（东方财富只保留最近约5个交易日的1分钟数据）
+    fetch (callable): 分时行情获取函数，默认为 data_source.stock_zh_a_hist_min_em
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, adjust='', history_days=7, fetch=None):
+        self.root = root
+        self.adjust = adjust
+        self.history_days = history_days
+        self.fetch = fetch if fetch is not None else data_source.stock_zh_a_hist_min_em
+        self.fetch_calls = 0
+        self.fetched_rows = 0
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, symbol):
+        with self._locks_lock:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def _path(self, symbol):
+        return os.path.join(self.root, f'{symbol}.npy')
+
+    def bars(self, symbol):
+        # 只读本地数据，不联网
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=DTYPE)
+        return np.load(path, mmap_mode='r')
+
+    def _save(self, symbol, bars):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(symbol)
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, np.ascontiguousarray(bars, dtype=DTYPE))
+        os.replace(path + '.tmp', path)
+
+    def _download(self, symbol, start, end):
+        self.fetch_calls += 1
+        with host_limit.slot('em'):
+            df = self.fetch(symbol=symbol, start_date=start.strftime('%Y-%m-%d %H:%M:%S'),
+                            end_date=end.strftime('%Y-%m-%d %H:%M:%S'), period='1', adjust=self.adjust)
+        bars = np.zeros(0 if df is None else len(df), dtype=DTYPE)
+        if len(bars) == 0:
+            return bars
+        bars['time'] = pd.to_datetime(df['时间']).dt.strftime('%Y%m%d%H%M').astype(np.int64).to_numpy()
+        for name, col in list(COLUMNS.items())[1:]:
+            bars[name] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float) if col in df else np.nan
+        self.fetched_rows += len(bars)
+        return _fold_auction(bars)
+
+    def update(self, symbol, now=None):
+        """
+        增量更新本地数据：只下载最后一根已存K线之后、已走完的K线
+
+        返回:
+        np.ndarray: 更新后的全部1分钟K线（结构化数组）
+        """
+        now = now or datetime.now()
+        with self._lock(symbol):
+            bars = self.bars(symbol)
+            cutoff = last_closed(now)
+            if len(bars) and bars['time'][-1] >= cutoff:
+                return bars
+            if len(bars):
+                start = _from_stamp(int(bars['time'][-1])) + timedelta(minutes=1)
+            else:
+                start = (now - timedelta(days=self.history_days)).replace(hour=9, minute=0, second=0, microsecond=0)
+            newer = self._download(symbol, start, _from_stamp(cutoff))
+            last = bars['time'][-1] if len(bars) else 0
+            newer = newer[(newer['time'] > last) & (newer['time'] <= cutoff)]
+            if len(newer) == 0:
+                return bars
+            bars = np.concatenate([bars, newer])
+            self._save(symbol, bars)
+            return self.bars(symbol)
+
+    def panel(self, symbols, days=5, now=None, update=True, fields=FIELDS):
+        """
+        读取一组股票最近 days 个交易日的1分钟K线面板
+
+        参数:
+        symbols (list): 股票代码
+        days (int): 交易日数
+        now (datetime, optional): 更新截止时间，默认当前时间
+        update (bool): 是否先增量更新（False 时只读本地数据）
+        fields (tuple): 读取的字段，开高低收必须包含；每个字段占 股票数*交易日数*240*4 字节
+
+        返回:
+        MinutePanel: 1分钟周期的面板
+        """
+        symbols = [str(symbol) for symbol in symbols]
+        records = [self.update(symbol, now) if update else self.bars(symbol) for symbol in symbols]
+        stored = [np.unique(bars['time'] // 10000) for bars in records if len(bars)]
+        trading_days = np.unique(np.concatenate(stored))[-days:] if stored else np.empty(0, dtype=np.int64)
+
+        data = {field: np.full((len(symbols), len(trading_days), MINUTES), np.nan, dtype=np.float32)
+                for field in fields}
+        for i, bars in enumerate(records):
+            if len(bars) == 0 or len(trading_days) == 0:
+                continue
+            bars = bars[bars['time'] // 10000 >= trading_days[0]]
+            day = np.searchsorted(trading_days, bars['time'] // 10000)
+            index = slot(bars['time'] % 10000)
+            keep = index >= 0
+            for field in fields:
+                data[field][i, day[keep], index[keep]] = bars[field][keep]
+        return MinutePanel(symbols, trading_days, data)
+
+    def stats(self):
+        return {'fetch_calls': self.fetch_calls, 'fetched_rows': self.fetched_rows}
+
+
+def _fold_auction(bars):
+    # 9:30 的集合竞价K线并入 9:31
+    hhmm = bars['time'] % 10000
+    auction = np.flatnonzero(hhmm == 930)
+    auction = auction[(auction + 1 < len(bars))]
+    auction = auction[bars['time'][auction + 1] == bars['time'][auction] + 1]
+    if len(auction) == 0:
+        return bars
+    bars = bars.copy()
+    nxt = auction + 1
+    bars['open'][nxt] = bars['open'][auction]
+    bars['high'][nxt] = np.fmax(bars['high'][nxt], bars['high'][auction])
+    bars['low'][nxt] = np.fmin(bars['low'][nxt], bars['low'][auction])
+    bars['volume'][nxt] += bars['volume'][auction]
+    bars['amount'][nxt] += bars['amount'][auction]
+    return np.delete(bars, auction)
+
+
+class MinutePanel:
+    """
+    一组股票的分钟K线面板，每个字段一个 (股票数, 交易日数, 每日K线数) 的 float32 数组，缺失为NaN
+
+    参数:
+    symbols (list): 股票代码
+    days (np.ndarray): 交易日 YYYYMMDD
+    data (dict): 字段 -> 数组
+    minutes (int): K线周期（分钟）
+    """
+
+    def __init__(self, symbols, days, data, minutes=1):
+        self.symbols = list(symbols)
+        self.days = np.asarray(days, dtype=np.int64)
+        self.data = data
+        self.minutes = minutes
+
+    def __getitem__(self, field):
+        return self.data[field]
+
+    @property
+    def per_day(self):
+        return MINUTES // self.minutes
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.data.values())
+
+    def times(self):
+        # 每根K线的结束时刻 YYYYMMDDHHMM，(交易日数, 每日K线数)
+        ends = slot_time(np.arange(self.minutes - 1, MINUTES, self.minutes))
+        return self.days[:, np.newaxis] * 10000 + ends[np.newaxis, :]
+
+    def resample(self, minutes):
+        """
+        合成更大周期的K线：开盘取首个有效值，收盘取最后一个有效值，最高/最低取极值，成交量/成交额求和
+
+        参数:
+        minutes (int): 目标周期，必须是当前周期的整数倍且整除240（见 TIMEFRAMES）
+
+        返回:
+        MinutePanel: 新周期的面板
+        """
+        if minutes == self.minutes:
+            return self
+        if minutes % self.minutes or MINUTES % minutes:
+            raise ValueError(f'cannot resample {self.minutes}-minute bars to {minutes} minutes')
+        k = minutes // self.minutes
+        shape = (len(self.symbols), len(self.days), MINUTES // minutes, k)
+        block = {field: array.reshape(shape) for field, array in self.data.items()}
+        valid = ~np.isnan(block['close'])
+        traded = valid.any(axis=-1)
+        first = valid.argmax(axis=-1)[..., np.newaxis]
+        last = (k - 1 - valid[..., ::-1].argmax(axis=-1))[..., np.newaxis]
+        nan = np.float32(np.nan)
+        data = {
+            'open': np.where(traded, np.take_along_axis(block['open'], first, axis=-1)[..., 0], nan),
+            'close': np.where(traded, np.take_along_axis(block['close'], last, axis=-1)[..., 0], nan),
+            'high': np.fmax.reduce(block['high'], axis=-1),
+            'low': np.fmin.reduce(block['low'], axis=-1),
+        }
+        for field in ('volume', 'amount'):
+            if field in block:
+                data[field] = np.where(traded, np.nansum(block[field], axis=-1, dtype=np.float64), nan).astype(np.float32)
+        return MinutePanel(self.symbols, self.days, data, minutes)
+
+    def series(self):
+        """
+        展开为连续时间轴的 (股票数, K线数) float64 面板，可直接用于 utils.indicators：
+        停牌或缺失的K线用前一收盘价补平（成交量为0），最后一根有数据的K线之后（当日未来时段）截掉，
+        首根K线之前保留NaN（见 indicators.by_start）
+
+        返回:
+        dict: 字段 -> 数组，'time' -> 每根K线的时刻 YYYYMMDDHHMM
+        """
+        n = len(self.symbols)
+        flat = {field: array.reshape(n, -1).astype(float) for field, array in self.data.items()}
+        times = self.times().ravel()
+        close = flat['close']
+        valid = ~np.isnan(close)
+        present = np.flatnonzero(valid.any(axis=0))
+        end = present[-1] + 1 if len(present) else 0
+        flat = {field: array[:, :end] for field, array in flat.items()}
+        close, valid = flat['close'], valid[:, :end]
+
+        # 前值填充
+        index = np.maximum.accumulate(np.where(valid, np.arange(end), 0), axis=1)
+        filled = np.take_along_axis(close, index, axis=1)
+        gap = ~valid & np.logical_or.accumulate(valid, axis=1)
+        for field in ('open', 'high', 'low', 'close'):
+            flat[field] = np.where(gap, filled, flat[field])
+        for field in ('volume', 'amount'):
+            if field in flat:
+                flat[field] = np.where(gap, 0.0, flat[field])
+        flat['time'] = times[:end]
+        return flat
+
+    def volume_curve(self, lookback=5, before=None):
+        """
+        分时成交量分布：最近 lookback 个完整交易日中，每根K线结束时已成交量占全天成交量的平均比例
+
+        参数:
+        lookback (int): 交易日数
+        before (int, optional): 只使用该日期（YYYYMMDD）之前的交易日，默认今天
+
+        返回:
+        np.ndarray: (股票数, 每日K线数)，单调不减，最后一列为1；没有完整交易日的股票使用其他股票的中位数
+        """
+        before = before or int(datetime.now().strftime('%Y%m%d'))
+        days = np.flatnonzero(self.days < before)[-lookback:]
+        volume = self['volume'][:, days].astype(float)
+        total = volume.sum(axis=-1)
+        complete = ~np.isnan(total) & (total > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            share = np.cumsum(volume, axis=-1) / total[..., np.newaxis]
+        count = complete.sum(axis=1)
+        curve = np.full((len(self.symbols), self.per_day), np.nan)
+        has = count > 0
+        curve[has] = np.where(complete[..., np.newaxis], share, 0.0).sum(axis=1)[has] / count[has, np.newaxis]
+        if has.any():
+            curve[~has] = np.median(curve[has], axis=0)
+        else:
+            curve[:] = np.arange(1, self.per_day + 1) / self.per_day
+        return curve
+
+    def day_fraction(self, hhmm, lookback=5, before=None):
+        """
+        截至 HHMM 通常已完成的全天成交量比例（按 volume_curve），用于把当日累计成交量折算为全天
+
+        返回:
+        np.ndarray: (股票数,)，开盘前为NaN
+        """
+        done = int(elapsed(hhmm)) // self.minutes
+        if done == 0:
+            return np.full(len(self.symbols), np.nan)
+        return self.volume_curve(lookback, before)[:, done - 1]
+
+    def relative_volume(self, lookback=5):
+        """
+        按分时归一的成交量：每根K线的成交量 / 之前 lookback 个交易日同一时刻K线的平均成交量
+
+        返回:
+        np.ndarray: (股票数, 交易日数, 每日K线数)，之前的交易日同一时刻都缺失时为NaN
+        """
+        volume = self['volume'].astype(float)
+        valid = ~np.isnan(volume)
+        zero = np.zeros_like(volume[:, :1])
+        total = np.concatenate([zero, np.cumsum(np.where(valid, volume, 0.0), axis=1)], axis=1)
+        count = np.concatenate([zero, np.cumsum(valid, axis=1)], axis=1)
+        day = np.arange(len(self.days))
+        start = np.maximum(day - lookback, 0)
+        past = total[:, day] - total[:, start]
+        past_count = count[:, day] - count[:, start]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(past_count > 0, past / past_count, np.nan)
+            return np.where(mean > 0, volume / mean, np.nan)
+
+
+def volume_curve(symbols, now=None, lookback=5):
+    """
+    用本地存储（get_store）读取一组股票的分时成交量分布，见 MinutePanel.volume_curve
+
+    参数:
+    symbols (list): 股票代码
+    now (datetime, optional): 当前时间，只使用今天之前的交易日，默认当前时间
+    lookback (int): 交易日数
+
+    返回:
+    np.ndarray: (股票数, 240)；没有分时数据的股票（或获取失败时全部股票）整行为1，即按全天成交量比较
+    """
+    now = now or datetime.now()
+    curve = np.ones((len(symbols), MINUTES))
+    try:
+        panel = get_store().panel(symbols, days=lookback + 1, now=now)
+    except Exception as e:
+        print(f'minute bars: {e}')
+        return curve
+    before = int(now.strftime('%Y%m%d'))
+    volume = panel['volume'][:, np.flatnonzero(panel.days < before)[-lookback:]]
+    has = np.nansum(volume, axis=(1, 2)) > 0
+    if has.any():
+        curve[has] = panel.volume_curve(lookback, before)[has]
+    return curve
+
+
+def day_fraction(symbols, now=None, lookback=5):
+    """
+    截至 now 每只股票通常已完成的全天成交量比例（high_freq_check.high_freq 的 day_fraction）
+
+    返回:
+    np.ndarray: (股票数,)；开盘前、收盘后或没有分时数据时为1
+    """
+    now = now or datetime.now()
+    done = int(elapsed(now.hour * 100 + now.minute))
+    if done == 0:
+        return np.ones(len(symbols))
+    return volume_curve(symbols, now, lookback)[:, done - 1]
+
+
+_store = MinuteStore()
+
+
+def get_store():
+    return _store
+
+
+def set_store(store):
+    global _store
+    _store = store
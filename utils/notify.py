@@ -0,0 +1,190 @@
+# background PushDeer dispatcher: send() only enqueues, messages to the same recipient within a short window go out as one digest
+# one client and one keep-alive HTTP session for the whole run, failed pushes are retried with backoff, pending messages flush at exit
+import atexit
+import queue
+import threading
+import time
+from utils import metrics
+from utils import lazy
+
+# requests / pypushdeer 在第一次推送时才导入
+requests = lazy.module('requests')
+pypushdeer = lazy.module('pypushdeer')
+
+SERVER = "https://api2.pushdeer.com"
+RECIPIENTS = {
+    'ding': "PDU36046TfIe7SgbaLY1OWrvHnyBF6mMcudbGcVaW",
+    'yi': "PDU36425TtwSeJJ8zXEfSG4lALYJPIKHsKchLhZAP",
+}
+WINDOW = 2.0  # 合并窗口（秒）
+DIGEST_SEPARATOR = '\n\n'
+
+
+def _session_client(server, timeout=10):
+    # 复用同一个 requests.Session（keep-alive），替代 PushDeer 每次新建连接
+    class SessionPushDeer(pypushdeer.PushDeer):
+        def _send_push_request(self, desp, key, server, text, type):
+            start = time.perf_counter()
+            try:
+                response = self.session.get(server + self.endpoint, params={
+                    "pushkey": key,
+                    "text": text,
+                    "type": type,
+                    "desp": desp,
+                }, timeout=self.timeout)
+                response.raise_for_status()
+            except requests.RequestException:
+                metrics.call('pushdeer', self.endpoint.strip('/'), seconds=time.perf_counter() - start, error=True)
+                raise
+            metrics.call('pushdeer', self.endpoint.strip('/'), len(response.content), time.perf_counter() - start)
+            return response.json()
+
+    client = SessionPushDeer(server=server)
+    client.session = requests.Session()
+    client.timeout = timeout
+    return client
+
+
+class _Flush:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+class Dispatcher:
+    """
+    推送队列
+
+    参数:
+    server (str): PushDeer 服务地址（可指向 utils.notify_stub 的本地服务）
+    window (float): 同一接收人在该时间内的多条消息合并为一条
+    retries (int): 失败重试次数
+    backoff (float): 首次重试前的等待（秒），之后每次翻倍
+    """
+
+    def __init__(self, server=SERVER, window=WINDOW, retries=3, backoff=1.0):
+        self.server = server
+        self.window = window
+        self.retries = retries
+        self.backoff = backoff
+        self.client = None  # 后台线程第一次推送时创建
+        self.sent = 0
+        self.failed = 0
+        self.merged = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def send(self, recipient, desp, text='Message'):
+        # recipient: RECIPIENTS 中的名字或 pushkey；立即返回，不等待推送
+        pushkey = RECIPIENTS.get(recipient, recipient)
+        self._start()
+        self._queue.put((pushkey, text, desp))
+
+    def flush(self, timeout=None):
+        # 等待已提交的消息全部发出（不等合并窗口）
+        if self._thread is None:
+            return True
+        item = _Flush()
+        self._queue.put(item)
+        return item.done.wait(timeout)
+
+    def close(self, timeout=30):
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='pushdeer-dispatcher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        pending = {}  # pushkey -> [(text, desp)]
+        due = {}  # pushkey -> 发送时间
+        while True:
+            timeout = max(min(due.values()) - time.monotonic(), 0) if due else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP or isinstance(item, _Flush):
+                for pushkey in list(pending):
+                    self._deliver(pushkey, pending.pop(pushkey))
+                due.clear()
+                if item is _STOP:
+                    return
+                item.done.set()
+                continue
+            if item is not None:
+                pushkey, text, desp = item
+                pending.setdefault(pushkey, []).append((text, desp))
+                due.setdefault(pushkey, time.monotonic() + self.window)
+            now = time.monotonic()
+            for pushkey in [k for k, t in due.items() if t <= now]:
+                del due[pushkey]
+                self._deliver(pushkey, pending.pop(pushkey))
+
+    def _deliver(self, pushkey, messages):
+        if self.client is None:
+            self.client = _session_client(self.server)
+        text = messages[0][0] if len(messages) == 1 else f'{messages[0][0]} ({len(messages)})'
+        desp = DIGEST_SEPARATOR.join(str(desp) for _, desp in messages)
+        self.merged += len(messages) - 1
+        for attempt in range(self.retries + 1):
+            try:
+                if self.client.send_text(text, desp=desp, pushkey=pushkey):
+                    self.sent += 1
+                    return
+                error = 'rejected'
+            except (requests.RequestException, ValueError, KeyError) as e:
+                error = e
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2 ** attempt)
+        self.failed += 1
+        print(f'pushdeer: message not delivered after {self.retries + 1} attempts: {error}')
+
+    def stats(self):
+        return {'sent': self.sent, 'failed': self.failed, 'merged': self.merged, 'queued': self._queue.qsize()}
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def _close():
+    if _dispatcher is not None:
+        _dispatcher.close()
+
+
+def get_dispatcher():
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = Dispatcher()
+            atexit.register(_close)
+        return _dispatcher
+
+
+def set_server(server):
+    # 切换推送服务（如本地 notify_stub），已排队的消息先发出
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is not None:
+            _dispatcher.close()
+        else:
+            atexit.register(_close)
+        _dispatcher = Dispatcher(server=server)
+
+
+def send(recipient, desp, text='Message'):
+    get_dispatcher().send(recipient, desp, text)
+
+
+def flush(timeout=None):
+    return get_dispatcher().flush(timeout)
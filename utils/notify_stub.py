@@ -0,0 +1,71 @@
+# local stand-in for the PushDeer push API: records and prints every message instead of sending it to a phone
+# usage: python -m utils.notify_stub [port]  then  notify.set_server('http://localhost:8766')
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PORT = 8766
+
+received = []  # 收到的消息 {'pushkey', 'text', 'type', 'desp'}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive，与 notify 的连接复用一致
+    fail = 0  # 测试重试：接下来的 fail 个请求返回500
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/message/push':
+            self._reply(404, {'code': 404, 'error': 'not found'})
+            return
+        if _Handler.fail > 0:
+            _Handler.fail -= 1
+            self._reply(500, {'code': 500, 'error': 'stub failure'})
+            return
+        message = {k: v[0] for k, v in parse_qs(url.query).items()}
+        received.append(message)
+        print(f"[pushdeer stub] {message.get('pushkey', '')[:8]}... {message.get('text')}\n{message.get('desp', '')}")
+        result = json.dumps({'counts': 1, 'logs': [], 'success': 'ok'})
+        self._reply(200, {'code': 0, 'content': {'result': [result]}})
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=PORT, background=True):
+    """
+    启动本地推送服务
+
+    返回:
+    ThreadingHTTPServer: background=True 时在后台线程运行，用 shutdown() 停止
+    """
+    server = ThreadingHTTPServer(('localhost', port), _Handler)
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    else:
+        server.serve_forever()
+    return server
+
+
+def fail_next(count):
+    _Handler.fail = count
+
+
+def url(port=PORT):
+    return f'http://localhost:{port}'
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else PORT
+    print('pushdeer stub:', url(port))
+    serve(port, background=False)
@@ -0,0 +1,227 @@
+# local daily bar store: one memory-mapped .npy per symbol, only bars newer than the last stored date are fetched
+import json
+import os
+import threading
+from datetime import date, datetime, timedelta
+import numpy as np
+from utils import data_source
+from utils import host_limit
+from utils import lazy
+
+pd = lazy.module('pandas')
+
+# 存储字段 -> akshare 历史行情列名
+COLUMNS = {
+    'date': '日期',
+    'open': '开盘',
+    'close': '收盘',
+    'high': '最高',
+    'low': '最低',
+    'volume': '成交量',
+    'amount': '成交额',
+    'turnover': '换手率',
+}
+DTYPE = np.dtype([('date', 'i4')] + [(name, 'f8') for name in list(COLUMNS)[1:]])
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'ohlcv')
+MARKET_CLOSE = (15, 30)  # 收盘后当日K线才落盘
+
+
+def _to_int(day):
+    # date / 'YYYYMMDD' / 'YYYY-MM-DD' -> 20250719
+    if isinstance(day, (int, np.integer)):
+        return int(day)
+    if isinstance(day, (date, datetime)):
+        return int(day.strftime('%Y%m%d'))
+    return int(str(day).replace('-', '')[:8])
+
+
+def _to_date(day_int):
+    return date(day_int // 10000, day_int // 100 % 100, day_int % 100)
+
+
+class OHLCVStore:
+    """
+    本地日线存储，get_trade_info 的数据来源
+
+    参数:
+    root (str): 存储目录，每个代码一个 {symbol}.npy 和 {symbol}.json
+    adjust (str): 复权方式，与 ak.stock_zh_a_hist 一致
+    history_days (int): 首次下载的回看天数，便于MACD等指标预热
+    fetch (callable): 历史行情获取函数，默认为 data_source.stock_zh_a_hist（live/record/replay 见 utils.data_source）
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, adjust='qfq', history_days=800, fetch=None):
+        self.root = root
+        self.adjust = adjust
+        self.history_days = history_days
+        self.fetch = fetch if fetch is not None else data_source.stock_zh_a_hist
+        self.fetch_calls = 0
+        self.fetched_rows = 0
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, symbol):
+        with self._locks_lock:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def _path(self, symbol, ext):
+        return os.path.join(self.root, f'{symbol}.{ext}')
+
+    @staticmethod
+    def cutoff(now=None):
+        # 最近一个已收盘的日期（未考虑节假日，节假日只会多一次空请求）
+        now = now or datetime.now()
+        day = now.date()
+        if (now.hour, now.minute) < MARKET_CLOSE:
+            day = day - timedelta(days=1)
+        return _to_int(day)
+
+    def bars(self, symbol):
+        # 只读本地数据，不联网
+        path = self._path(symbol, 'npy')
+        if not os.path.exists(path):
+            return np.empty(0, dtype=DTYPE)
+        return np.load(path, mmap_mode='r')
+
+    def load_field(self, symbols, days, field='close'):
+        """
+        读取多只股票最近 days 根已存K线的某一字段（不联网）
+
+        返回:
+        np.ndarray: (股票数, days)，右对齐，无本地数据或数据不足处为NaN
+        """
+        out = np.full((len(symbols), days), np.nan)
+        for i, symbol in enumerate(symbols):
+            values = self.bars(symbol)[field][-days:]
+            out[i, days - len(values):] = values
+        return out
+
+    def fresh(self, symbols, cutoff=None):
+        """
+        本地日线是否已更新到 cutoff（默认最近一个已收盘日，见 cutoff()），不联网
+
+        返回:
+        np.ndarray: 与 symbols 顺序一致的 bool 数组
+        """
+        cutoff = cutoff or self.cutoff()
+        out = np.zeros(len(symbols), dtype=bool)
+        for i, symbol in enumerate(symbols):
+            meta_path = self._path(symbol, 'json')
+            if os.path.exists(meta_path):
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    out[i] = json.load(f).get('checked', 0) >= cutoff
+        return out
+
+    def load(self, symbol):
+        path = self._path(symbol, 'npy')
+        if not os.path.exists(path):
+            return np.empty(0, dtype=DTYPE), {}
+        meta_path = self._path(symbol, 'json')
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        return np.load(path, mmap_mode='r'), meta
+
+    def _save(self, symbol, bars, meta):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(symbol, 'npy')
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, np.ascontiguousarray(bars, dtype=DTYPE))
+        os.replace(path + '.tmp', path)
+        with open(self._path(symbol, 'json') + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(self._path(symbol, 'json') + '.tmp', self._path(symbol, 'json'))
+
+    def _download(self, symbol, start, end):
+        self.fetch_calls += 1
+        with host_limit.slot('em'):
+            df = self.fetch(symbol=symbol, period='daily', start_date=str(start), end_date=str(end), adjust=self.adjust)
+        bars = np.zeros(0 if df is None else len(df), dtype=DTYPE)
+        if len(bars) == 0:
+            return bars
+        bars['date'] = pd.to_datetime(df['日期']).dt.strftime('%Y%m%d').astype(np.int32).to_numpy()
+        for name, col in list(COLUMNS.items())[1:]:
+            bars[name] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float) if col in df else np.nan
+        self.fetched_rows += len(bars)
+        return bars
+
+    def update(self, symbol, start=None):
+        """
+        增量更新本地数据：只下载最后一根已存K线之后的数据
+
+        参数:
+        symbol (str): 股票代码
+        start: 需要覆盖的最早日期，早于已存数据时向前补齐
+
+        返回:
+        np.ndarray: 更新后的全部已收盘日线（结构化数组）
+        """
+        with self._lock(symbol):
+            cutoff = self.cutoff()
+            bars, meta = self.load(symbol)
+            first = _to_int(start) if start is not None else None
+            default_first = _to_int(_to_date(cutoff) - timedelta(days=self.history_days))
+            first = default_first if first is None else min(first, default_first)
+            changed = False
+
+            if len(bars) == 0:
+                bars = self._download(symbol, first, cutoff)
+                meta = {'start': first}
+                changed = True
+            else:
+                # 向前补齐更长的回看窗口
+                if first < meta.get('start', int(bars['date'][0])):
+                    older = self._download(symbol, first, int(bars['date'][0]))
+                    bars = np.concatenate([older[older['date'] < bars['date'][0]], bars])
+                    meta['start'] = first
+                    changed = True
+                # 向后增量，多取最后一根已存K线用于复权校验
+                if meta.get('checked', 0) < cutoff:
+                    last = int(bars['date'][-1])
+                    newer = self._download(symbol, last, cutoff)
+                    overlap = newer[newer['date'] == last]
+                    if len(overlap) and not np.isclose(overlap['close'][0], bars['close'][-1]):
+                        # 除权除息后前复权价格整体变化，重新下载全部区间
+                        bars = self._download(symbol, meta.get('start', int(bars['date'][0])), cutoff)
+                    else:
+                        bars = np.concatenate([bars, newer[newer['date'] > last]])
+                    changed = True
+
+            if changed:
+                meta['checked'] = cutoff
+                meta['adjust'] = self.adjust
+                self._save(symbol, bars, meta)
+            return bars
+
+    def read(self, symbol, start_time, end_time):
+        """
+        读取 [start_time, end_time] 区间的日线，列名与 ak.stock_zh_a_hist 一致
+
+        返回:
+        pd.DataFrame: 包含['日期', '开盘', '收盘', '最高', '最低', '成交量', '成交额', '换手率']列
+        """
+        bars = self.update(symbol, start_time)
+        dates = bars['date']
+        lo = np.searchsorted(dates, _to_int(start_time), side='left')
+        hi = np.searchsorted(dates, _to_int(end_time), side='right')
+        window = bars[lo:hi]
+        df = pd.DataFrame({col: window[name] for name, col in COLUMNS.items()})
+        df['日期'] = [_to_date(int(d)) for d in window['date']]
+        return df
+
+    def stats(self):
+        return {'fetch_calls': self.fetch_calls, 'fetched_rows': self.fetched_rows}
+
+
+_store = OHLCVStore()
+
+
+def get_store():
+    return _store
+
+
+def set_store(store):
+    global _store
+    _store = store
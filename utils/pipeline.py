@@ -0,0 +1,224 @@
+# checkpointed stage runner for main.py: named stages with declared inputs, every output persisted to a run directory
+# keyed by date and parameters, so a rerun skips finished stages and finished symbols; independent stages run in parallel
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date
+from utils import metrics
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'runs')
+
+
+def run_dir(params, day=None, root=DEFAULT_ROOT):
+    """
+    运行目录：同一天、同一组参数的运行共用一个目录（断点续跑）
+
+    参数:
+    params (dict): 影响结果的参数
+    day (date, optional): 默认今天
+
+    返回:
+    str: root/{日期}_{参数哈希}
+    """
+    day = (day or date.today()).strftime('%Y%m%d')
+    raw = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    path = os.path.join(root, f"{day}_{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:8]}")
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, 'params.json'), 'w', encoding='utf-8') as f:
+        f.write(raw)
+    return path
+
+
+class Stage:
+    """
+    流水线中的一个阶段，输出名即阶段名
+
+    参数:
+    name (str): 阶段名
+    func (callable): func(**inputs)；逐只股票执行时为 func(symbol, **inputs)
+    inputs (tuple): 依赖的阶段名，其输出按名字传给 func
+    symbols (str | callable, optional): 逐只股票执行：股票列表所在的输入名，或 inputs -> 股票列表；
+        输出为与股票列表顺序一致的 list，每只股票完成后单独保存
+    """
+
+    def __init__(self, name, func, inputs=(), symbols=None):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.symbols = symbols
+
+    def symbol_list(self, inputs):
+        if callable(self.symbols):
+            return [str(s) for s in self.symbols(inputs)]
+        return [str(s) for s in inputs[self.symbols]]
+
+
+def _dump(path, value):
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + '.tmp', path)
+
+
+def _load(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+class Pipeline:
+    """
+    按依赖关系执行各阶段，已完成的阶段（和逐只股票阶段中已完成的股票）直接读取保存的结果
+
+    参数:
+    stages (list): Stage 列表
+    root (str): 运行目录（见 run_dir）
+    workers (int): 同时执行的阶段数
+    symbol_workers (int): 逐只股票阶段内同时处理的股票数
+    """
+
+    def __init__(self, stages, root, workers=2, symbol_workers=8):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            missing = [name for name in stage.inputs if name not in self.stages]
+            if missing:
+                raise ValueError(f'stage {stage.name}: unknown inputs {missing}')
+        self.root = root
+        self.workers = workers
+        self.symbol_workers = symbol_workers
+        self._outputs = {}
+
+    def _path(self, name, symbol=None):
+        if symbol is None:
+            return os.path.join(self.root, f'{name}.pkl')
+        return os.path.join(self.root, name, f'{symbol}.pkl')
+
+    def done(self, name):
+        return os.path.exists(self._path(name))
+
+    def downstream(self, names):
+        # names 及所有依赖它们的阶段
+        result = set(names)
+        changed = True
+        while changed:
+            changed = False
+            for stage in self.stages.values():
+                if stage.name not in result and result.intersection(stage.inputs):
+                    result.add(stage.name)
+                    changed = True
+        return result
+
+    def invalidate(self, names):
+        """删除 names 及其下游阶段的保存结果，下次运行时重新计算"""
+        for name in self.downstream(names):
+            self._outputs.pop(name, None)
+            if os.path.exists(self._path(name)):
+                os.remove(self._path(name))
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    def output(self, name):
+        if name not in self._outputs:
+            self._outputs[name] = _load(self._path(name))
+        return self._outputs[name]
+
+    def _execute(self, stage):
+        inputs = {name: self.output(name) for name in stage.inputs}
+        with metrics.stage(stage.name):
+            if stage.symbols is None:
+                value = stage.func(**inputs)
+            else:
+                value = self._execute_symbols(stage, inputs)
+        _dump(self._path(stage.name), value)
+        self._outputs[stage.name] = value
+        return value
+
+    def _execute_symbols(self, stage, inputs):
+        symbol_list = stage.symbol_list(inputs)
+        os.makedirs(os.path.join(self.root, stage.name), exist_ok=True)
+        results = {}
+        todo = []
+        for symbol in symbol_list:
+            path = self._path(stage.name, symbol)
+            metrics.cache('checkpoint', os.path.exists(path))
+            if os.path.exists(path):
+                results[symbol] = _load(path)
+            else:
+                todo.append(symbol)
+
+        def one(symbol):
+            with metrics.symbol(symbol, stage.name):
+                value = stage.func(symbol, **inputs)
+            _dump(self._path(stage.name, symbol), value)
+            return value
+
+        # 单只股票失败时其余股票照常完成并保存，整个阶段最后报错，重跑时只处理失败的股票
+        errors = []
+        with ThreadPoolExecutor(max_workers=max(min(self.symbol_workers, len(todo)), 1)) as pool:
+            futures = {pool.submit(one, symbol): symbol for symbol in todo}
+            for future, symbol in futures.items():
+                try:
+                    results[symbol] = future.result()
+                except Exception as e:
+                    errors.append((symbol, e))
+        if errors:
+            symbol, error = errors[0]
+            raise RuntimeError(f'stage {stage.name}: {len(errors)} of {len(symbol_list)} symbols failed '
+                               f'(first {symbol}: {error!r})') from error
+        print(f'{stage.name}: {len(symbol_list) - len(todo)} of {len(symbol_list)} symbols from checkpoint')
+        return [results[symbol] for symbol in symbol_list]
+
+    def _needed(self, targets):
+        needed = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.stages[name].inputs)
+        return needed
+
+    def run(self, targets=None, rerun=()):
+        """
+        执行到 targets（默认全部阶段）
+
+        参数:
+        targets (list, optional): 需要的阶段，只执行它们及其依赖
+        rerun (list): 即使已完成也重新计算的阶段（连同下游）
+
+        返回:
+        dict: 阶段名 -> 输出
+        """
+        if rerun:
+            self.invalidate(rerun)
+        needed = self._needed(targets or list(self.stages))
+        finished = set()
+        for name in needed:
+            complete = self.done(name)
+            metrics.cache('checkpoint', complete)
+            if complete:
+                print(f'{name}: from checkpoint')
+                finished.add(name)
+
+        running = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                if error is None:
+                    for name in sorted(needed - finished - set(running.values())):
+                        if finished.issuperset(self.stages[name].inputs):
+                            running[pool.submit(self._execute, self.stages[name])] = name
+                if not running:
+                    break
+                completed, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    name = running.pop(future)
+                    try:
+                        future.result()
+                        finished.add(name)
+                    except Exception as e:
+                        # 已在执行的阶段继续完成并保存，不再启动新阶段
+                        error = error or e
+        if error is not None:
+            raise error
+        return {name: self.output(name) for name in needed}
@@ -0,0 +1,151 @@
+# shared real-time snapshot: one ak.stock_zh_a_spot() download per ttl for the whole run
+import threading
+import time
+import numpy as np
+from utils import data_source
+from utils import host_limit
+from utils import metrics
+
+
+class SpotIndex:
+    """
+    按代码索引的行情快照，每个快照只构建一次
+
+    参数:
+    spot_df (pd.DataFrame): ak.stock_zh_a_spot() 结果，'代码'列形如 'sh600000'
+    """
+
+    def __init__(self, spot_df):
+        self.source = spot_df
+        self.df = spot_df.reset_index(drop=True)
+        full_code = self.df['代码'].astype(str)
+        self.exchange = full_code.str[:2].to_numpy()  # sh / sz / bj
+        self.code = full_code.str[2:].to_numpy()
+        self._pos = dict(zip(self.code, range(len(self.code))))
+        self._arrays = {}
+
+    def __len__(self):
+        return len(self.code)
+
+    def __contains__(self, symbol):
+        return symbol in self._pos
+
+    def position(self, symbol):
+        return self._pos[symbol]
+
+    def row(self, symbol):
+        # O(1) 单个代码查询，返回 pd.Series
+        return self.df.iloc[self._pos[symbol]]
+
+    def value(self, symbol, column):
+        return self.df[column].iat[self._pos[symbol]]
+
+    def array(self, column):
+        # 数值列的 float 数组，每个快照只转换一次
+        values = self._arrays.get(column)
+        if values is None:
+            values = self._arrays[column] = self.df[column].to_numpy(dtype=float)
+        return values
+
+    def positions(self, symbols):
+        # 缺失代码返回 -1
+        get = self._pos.get
+        return np.fromiter((get(s, -1) for s in symbols), dtype=np.int64, count=len(symbols))
+
+    def take(self, symbols, columns=None):
+        """
+        批量取出多个代码的行情，顺序与 symbols 一致，缺失代码被跳过
+
+        返回:
+        pd.DataFrame: 以6位代码为索引，附加'交易所'列
+        """
+        pos = self.positions(symbols)
+        pos = pos[pos >= 0]
+        frame = self.df.iloc[pos] if columns is None else self.df[columns].iloc[pos]
+        frame = frame.set_axis(self.code[pos], axis=0)
+        return frame.assign(交易所=self.exchange[pos])
+
+
+class SpotProvider:
+    """
+    全市场实时行情快照缓存
+
+    参数:
+    ttl (float): 快照有效期（秒），超时后下次读取重新下载
+    fetch (callable): 快照获取函数，默认为 data_source.stock_zh_a_spot
+    """
+
+    def __init__(self, ttl=300, fetch=None):
+        self.ttl = ttl
+        self.fetch = fetch if fetch is not None else data_source.stock_zh_a_spot
+        self.hits = 0
+        self.misses = 0
+        self._data = None
+        self._index = None
+        self._fetch_time = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, refresh=False):
+        with self._lock:
+            now = time.monotonic()
+            if not refresh and self._data is not None and now - self._fetch_time < self.ttl:
+                self.hits += 1
+                return self._data
+            self.misses += 1
+            with host_limit.slot('sina'):
+                self._data = self.fetch()
+            self._fetch_time = time.monotonic()
+            return self._data
+
+    def get_index(self, refresh=False):
+        data = self.get(refresh)
+        with self._lock:
+            if self._index is None or self._index.source is not data:
+                self._index = SpotIndex(data)
+            return self._index
+
+    def age(self):
+        # 距上次下载的秒数，未下载时为None
+        if self._data is None:
+            return None
+        return time.monotonic() - self._fetch_time
+
+    def invalidate(self):
+        with self._lock:
+            self._data = None
+            self._index = None
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'ttl': self.ttl}
+
+
+# default provider used by trade_info / high_freq / main_high_freq
+_provider = SpotProvider()
+
+
+def get_provider():
+    return _provider
+
+
+def set_provider(provider):
+    global _provider
+    _provider = provider
+
+
+def set_ttl(ttl):
+    _provider.ttl = ttl
+
+
+def get_spot(refresh=False):
+    return _provider.get(refresh)
+
+
+def get_index(refresh=False):
+    return _provider.get_index(refresh)
+
+
+def stats():
+    return _provider.stats()
+
+
+metrics.register_cache('spot', stats)
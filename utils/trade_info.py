@@ -1,36 +1,41 @@
-import akshare as ak
-import pandas as pd
+from utils import spot_provider
+from utils import ohlcv_store
+from utils import fin_cache
+from utils import lazy
+
+pd = lazy.module('pandas')
 
 def get_trade_info(symbol,start_time,end_time):  # 股市信息
     # stock_info_a_code_name = ak.stock_info_a_code_name()
     # print(stock_info_a_code_name.head())
 
-    # history data
-    stock_zh_a_hist_df = ak.stock_zh_a_hist(symbol=symbol, period="daily",
-                                             start_date=str(start_time), end_date=str(end_time), adjust="qfq")
+    # history data (local store, only bars newer than the last stored date are downloaded)
+    stock_zh_a_hist_df = ohlcv_store.get_store().read(symbol, start_time, end_time)[
+        ["日期", "开盘", "收盘", "最高", "最低", "成交量", "成交额"]]
 
     # latest data
-    spot_df = ak.stock_zh_a_spot()
-    latest_data = spot_df[spot_df["代码"].str[2:] == symbol].iloc[0]
+    latest_data = spot_provider.get_index().row(symbol)
 
-    # update
+    # update: today's bar is replaced by the real-time snapshot
+    today = pd.Timestamp.now().date()
     new_row = pd.DataFrame({
-        "日期": pd.Timestamp.now().strftime("%Y-%m-%d"),
-        "开盘价": latest_data["今开"],
-        "最高价": latest_data["最高"],
-        "最低价": latest_data["最低"],
-        "收盘价": latest_data["最新价"],
+        "日期": today,
+        "开盘": latest_data["今开"],
+        "最高": latest_data["最高"],
+        "最低": latest_data["最低"],
+        "收盘": latest_data["最新价"],
         "成交量": latest_data["成交量"],
+        "成交额": latest_data["成交额"],
         # 其他字段按需补充
     }, index=[0])
 
-    stock_zh_a_hist_df_new = pd.concat([stock_zh_a_hist_df.iloc[:-1], new_row], ignore_index=True)
+    stock_zh_a_hist_df_new = pd.concat([stock_zh_a_hist_df[stock_zh_a_hist_df["日期"] < today], new_row], ignore_index=True)
 
     return stock_zh_a_hist_df_new
 
 
 
-def get_company_fin_info(stock_code: str, year: str = "2025") -> pd.DataFrame:
+def get_company_fin_info(stock_code: str, year: str = "2025") -> "pd.DataFrame":
     """
     获取公司财务数据，包含指定列。
 
@@ -50,12 +55,14 @@ def get_company_fin_info(stock_code: str, year: str = "2025") -> pd.DataFrame:
     financial_data = pd.DataFrame(columns=columns, index=[0])
 
     try:
+        # 报表来自本地缓存（utils.fin_cache），过期或披露期内才重新下载
+        statements = fin_cache.get_cache()
         # 获取资产负债表
-        balance_sheet = ak.stock_financial_report_sina(stock=stock_code, symbol="资产负债表")
+        balance_sheet = statements.get_statement(stock_code, "资产负债表")
         # 获取利润表
-        income_statement = ak.stock_financial_report_sina(stock=stock_code, symbol="利润表")
+        income_statement = statements.get_statement(stock_code, "利润表")
         # 获取现金流量表
-        cash_flow = ak.stock_financial_report_sina(stock=stock_code, symbol="现金流量表")
+        cash_flow = statements.get_statement(stock_code, "现金流量表")
 
         # 获取最近一年的数据（假设最新报告为指定年份）
         balance_sheet = balance_sheet[balance_sheet['报告日'].str.contains(year)]
@@ -84,7 +91,7 @@ def get_company_fin_info(stock_code: str, year: str = "2025") -> pd.DataFrame:
             financial_data['operating_cash_flow'] = cash_flow.get('经营活动产生的现金流量净额', pd.Series([None])).iloc[0]
 
         # 获取总股本（流通股本或总股本）
-        stock_info = ak.stock_individual_info_em(symbol=stock_code)
+        stock_info = statements.get_stock_info(stock_code)
         financial_data['shares_outstanding'] = stock_info.get('总股本', pd.Series([None])).iloc[0]
 
         # 数据清洗：将缺失值替换为 None 或 0（根据需求）